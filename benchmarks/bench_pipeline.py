@@ -0,0 +1,162 @@
+"""
+Benchmark for the unmarshal -> filter -> FIT pipeline on synthetic data.
+
+Times each stage separately at several record counts (best of --repeat runs)
+and measures its peak memory with tracemalloc in a separate run, so the
+tracing overhead does not distort the timings:
+
+- unmarshal_fitness_data: health API data_list items -> WeightRecord
+- unmarshal_scale_data:   legacy eco/scale/getData items -> WeightRecord
+- apply_filter:           synthetic.BENCH_FILTER on the fitness records
+- create_weight_fit_file: the filtered records written to a temporary FIT file
+
+With --baseline the results are compared to a saved run and the script exits
+with an error if a stage got slower (or used more memory) than the baseline by
+more than --tolerance. Timings depend on the machine: record the baseline on
+the machine that runs the comparison (--save-baseline).
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 1000 10000 100000] [--repeat 3]
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline_pipeline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline_pipeline.json [--tolerance 0.3]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import BENCH_FILTER, fitness_items, scale_items
+from xiaomi.client import unmarshal_fitness_data, unmarshal_scale_data
+from garmin.filter import apply_filter
+from garmin.fit_generator import create_weight_fit_file
+
+STAGES = ("unmarshal_fitness_data", "unmarshal_scale_data", "apply_filter", "create_weight_fit_file")
+
+
+def stage_calls(size, output_dir):
+    """Build the inputs for one size and return {stage: zero-argument callable}."""
+    fitness = fitness_items(size)
+    scale = scale_items(size)
+    records = unmarshal_fitness_data(fitness)
+    filtered = apply_filter(records, BENCH_FILTER)
+    fit_path = Path(output_dir) / f"bench_{size}.fit"
+    return {
+        "unmarshal_fitness_data": lambda: unmarshal_fitness_data(fitness),
+        "unmarshal_scale_data": lambda: unmarshal_scale_data(scale),
+        "apply_filter": lambda: apply_filter(records, BENCH_FILTER),
+        "create_weight_fit_file": lambda: create_weight_fit_file(filtered, fit_path),
+    }
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func):
+    """Peak memory allocated while func runs, in KiB (the result is kept alive until the end)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def run(sizes, repeat):
+    """Returns {size: {stage: {"seconds": ..., "peak_kib": ...}}} (sizes as strings, for JSON)."""
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size in sizes:
+            calls = stage_calls(size, output_dir)
+            results[str(size)] = {
+                stage: {
+                    "seconds": round(best_time(calls[stage], repeat), 6),
+                    "peak_kib": round(peak_memory(calls[stage]), 1),
+                }
+                for stage in STAGES
+            }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every stage that regressed compared to the baseline."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if not previous:
+                continue
+            for metric in ("seconds", "peak_kib"):
+                if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(
+                        f"{stage} @ {size}: {metric} {current[metric]} > baseline {previous[metric]} "
+                        f"(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="unmarshal -> filter -> FIT pipeline benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Record counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Compare against this baseline file and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed slowdown / memory growth over the baseline (0.3 = 30%%)")
+    parser.add_argument("--save-baseline", type=Path, default=None,
+                        help="Write the results to this baseline file")
+    args = parser.parse_args()
+
+    # apply_filter and the FIT writer log every call at INFO
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run(args.sizes, max(1, args.repeat))
+
+    print(f"{'size':>8} {'stage':<24} {'time':>12} {'per record':>12} {'peak memory':>14}")
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            print(
+                f"{size:>8} {stage:<24} {result['seconds'] * 1000:>10.2f}ms "
+                f"{result['seconds'] / int(size) * 1e6:>10.2f}us {result['peak_kib']:>11.1f}KiB")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "results": results,
+        }, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            raise SystemExit(
+                f"\nRegressions over {args.baseline} (tolerance {args.tolerance:.0%}):\n  "
+                + "\n  ".join(regressions))
+        print(f"\nNo regressions over {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark for the RC4-drop1024 cipher used by XiaomiClient.request().
+
+Compares the original per-byte implementation with the pure-Python fallback
+and the cryptography (OpenSSL) path, after checking all three produce the same
+output.
+
+Usage:
+    python benchmarks/bench_rc4.py [--sizes 1024 65536 1048576] [--repeat 3]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from xiaomi.rc4 import ARC4, rc4_drop1024, rc4_drop1024_py
+
+
+def reference_rc4_drop1024(key, data):
+    """The original XiaomiClient._rc4_encrypt loop"""
+    S = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + S[i] + key[i % len(key)]) % 256
+        S[i], S[j] = S[j], S[i]
+
+    i = j = 0
+    for _ in range(1024):
+        i = (i + 1) % 256
+        j = (j + S[i]) % 256
+        S[i], S[j] = S[j], S[i]
+
+    out = []
+    for char in data:
+        i = (i + 1) % 256
+        j = (j + S[i]) % 256
+        S[i], S[j] = S[j], S[i]
+        out.append(char ^ S[(S[i] + S[j]) % 256])
+    return bytes(out)
+
+
+def best_of(func, key, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(key, data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RC4-drop1024 benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 64 * 1024, 1024 * 1024],
+                        help="Payload sizes in bytes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    key = hashlib.sha256(b"ssecurity" + os.urandom(12)).digest()
+    implementations = [
+        ("reference", reference_rc4_drop1024),
+        ("python", rc4_drop1024_py),
+    ]
+    if ARC4 is not None:
+        implementations.append(("cryptography", rc4_drop1024))
+    else:
+        print("cryptography ARC4 unavailable, rc4_drop1024 uses the pure-Python path")
+
+    print(f"{'size':>10} " + " ".join(f"{name:>14}" for name, _ in implementations) + f" {'speed-up':>10}")
+    for size in args.sizes:
+        data = os.urandom(size)
+        expected = reference_rc4_drop1024(key, data)
+        for name, func in implementations:
+            if func(key, data) != expected:
+                raise SystemExit(f"{name} output differs from the reference for {size} bytes")
+
+        timings = [best_of(func, key, data, args.repeat) for _, func in implementations]
+        print(
+            f"{size:>10} "
+            + " ".join(f"{t * 1000:>12.3f}ms" for t in timings)
+            + f" {timings[0] / timings[-1]:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
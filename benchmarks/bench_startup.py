@@ -0,0 +1,87 @@
+"""
+Startup benchmark for the CLI entry point, based on `python -X importtime`.
+
+Imports src/main.py in a fresh interpreter several times, reports the best
+cumulative import time and the slowest top-level imports, and fails if a module
+that should only be loaded on demand (garth, fit_tool, curlify, ...) was
+imported at startup or if the import time exceeds --max-ms.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 10] [--max-ms 400]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+# Loaded only when a Garmin login, a fit_tool FIT build or debug logging happens
+LAZY_MODULES = ("garth", "fit_tool", "curlify", "pydantic", "core.sync_service")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module="main"):
+    """
+    Import `module` in a new interpreter with -X importtime.
+
+    Returns:
+        (times, children): {module name: (self us, cumulative us)} for every
+        module loaded, and {module name: cumulative us} of the modules that
+        `module` imported directly.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    # Lines are printed when an import finishes, so a module's direct imports
+    # are the one-level-deeper lines right before it.
+    times, pending, children = {}, {}, {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        times[name] = (int(self_us), int(cumulative_us))
+        if len(indent) // 2 == 0:
+            if name == module:
+                children = pending
+            pending = {}
+        elif len(indent) // 2 == 1:
+            pending[name] = int(cumulative_us)
+    return times, children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup (import time) benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs (best is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of main to show")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Exit with an error if importing main takes longer than this")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(max(1, args.repeat))]
+    best, children = min(runs, key=lambda run: run[0]["main"][1])
+    total_ms = best["main"][1] / 1000
+
+    print(f"import main: {total_ms:.1f}ms (best of {len(runs)})\n")
+    for name, cumulative_us in sorted(children.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms  {name}")
+
+    eager = [name for name in LAZY_MODULES if name in best]
+    if eager:
+        raise SystemExit(f"\nLoaded at startup but expected on demand only: {', '.join(eager)}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        raise SystemExit(f"\nStartup import time {total_ms:.1f}ms exceeds --max-ms {args.max_ms}")
+
+
+if __name__ == "__main__":
+    main()
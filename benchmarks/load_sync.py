@@ -0,0 +1,143 @@
+"""
+End-to-end load test of SyncOrchestrator against the local mock servers.
+
+Starts the mock Xiaomi and Garmin APIs (benchmarks/mock_servers), writes a
+users.json with N synthetic accounts into a temporary data directory and runs
+SyncOrchestrator.sync_users over them, then reports throughput, chunk results,
+per-stage timings and the requests the servers saw. Every round after the
+first is an incremental sync, so --rounds 2 also measures the no-new-data path.
+
+Garmin logs in through garth's SSO flow, which is not mocked: the harness
+replaces GarminClient's login with a fixed bearer token, so only the uploads
+go over HTTP to the mock server. Xiaomi token login, paging and decryption run
+unmodified.
+
+Usage:
+    python benchmarks/load_sync.py [--users 20] [--records 2000] [--workers 4]
+        [--latency 0.02] [--error-rate 0.01] [--throttle-rate 0.01] [--rounds 2]
+"""
+
+import argparse
+import base64
+import json
+import logging
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_servers import Behavior, GarminMockServer, MOCK_SSECURITY, XiaomiMockServer
+from core import sync_service
+from core.sync_service import SyncOrchestrator
+from garmin.client import GarminClient
+from xiaomi.client import XiaomiClientBase
+
+
+class MockLoginGarminClient(GarminClient):
+    """GarminClient that skips the garth SSO login and uploads with a fixed token."""
+
+    def _login_impl(self, mfa_provider):
+        self._client.oauth2_token = f"Bearer mock-{self.email}"
+        return True
+
+
+def write_config(data_dir: Path, users: int) -> Path:
+    config = {
+        "users": [
+            {
+                "username": f"user{i}",
+                "password": "",
+                "token": {
+                    "userId": str(i),
+                    "passToken": f"pass-{i}",
+                    "ssecurity": base64.b64encode(MOCK_SSECURITY).decode(),
+                },
+                "garmin": {"email": f"user{i}@example.com", "password": "mock", "domain": "COM"},
+            }
+            for i in range(1, users + 1)
+        ],
+        "settings": {"data_dir": str(data_dir)},
+    }
+    config_path = data_dir / "users.json"
+    config_path.write_text(json.dumps(config, indent=2))
+    return config_path
+
+
+def report(round_no, results, seconds, xiaomi, garmin):
+    records = sum(r.total_records for r in results)
+    chunks = sum(r.uploaded_chunks + r.duplicate_chunks + r.failed_chunks for r in results)
+    print(f"\nRound {round_no}: {len(results)} users in {seconds:.2f}s "
+          f"({len(results) / seconds:.1f} users/s, {records / seconds:.0f} records/s)")
+    print(f"  succeeded: {sum(r.success for r in results)}/{len(results)}, records fetched: {records}, "
+          f"retries: {sum(r.retries for r in results)}")
+    print(f"  chunks: {chunks} (uploaded {sum(r.uploaded_chunks for r in results)}, "
+          f"duplicate {sum(r.duplicate_chunks for r in results)}, "
+          f"failed {sum(r.failed_chunks for r in results)})")
+
+    stages = defaultdict(lambda: [0, 0.0])
+    for result in results:
+        for name, stage in result.timings.items():
+            stages[name][0] += stage["count"]
+            stages[name][1] += stage["seconds"]
+    for name, (count, total) in stages.items():
+        print(f"  {name:<14} {count:>6} x {total / count * 1000:>8.2f}ms avg, {total:>8.2f}s total")
+
+    for server in (xiaomi, garmin):
+        counts = ", ".join(f"{endpoint} {status}: {n}" for (endpoint, status), n in sorted(server.requests.items()))
+        print(f"  {type(server).__name__}: {counts}")
+        server.requests.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync load test against local mock servers")
+    parser.add_argument("--users", type=int, default=20, help="Synthetic accounts")
+    parser.add_argument("--records", type=int, default=2000, help="Weight records per account")
+    parser.add_argument("--page-size", type=int, default=200, help="Records per Xiaomi page")
+    parser.add_argument("--workers", type=int, default=4, help="Users synced in parallel")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Records per FIT upload")
+    parser.add_argument("--rounds", type=int, default=2, help="Sync rounds (later rounds are incremental)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Base latency of both servers (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Random extra latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--xiaomi-rate", type=float, default=0, help="Xiaomi requests/s limit (0 = unlimited)")
+    parser.add_argument("--garmin-rate", type=float, default=0, help="Garmin uploads/s limit (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the injected latency/errors")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Load garth up front, otherwise its import time lands in the first
+    # garmin_login of every worker
+    import garth.http  # noqa: F401
+
+    def behavior(offset):
+        return Behavior(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, retry_after=1, seed=args.seed + offset)
+
+    with XiaomiMockServer(args.records, args.page_size, behavior(0)) as xiaomi, \
+            GarminMockServer(behavior=behavior(1)) as garmin, \
+            tempfile.TemporaryDirectory() as tmp:
+        XiaomiClientBase.ACCOUNT_URL = XiaomiClientBase.API_URL = xiaomi.url
+        GarminClient.CONNECTAPI_URL = garmin.url
+        sync_service.GarminClient = MockLoginGarminClient
+
+        orchestrator = SyncOrchestrator(str(write_config(Path(tmp), args.users)))
+        orchestrator.configure_limits(
+            xiaomi_concurrency=args.workers, garmin_concurrency=args.workers,
+            xiaomi_rate=args.xiaomi_rate, garmin_rate=args.garmin_rate)
+
+        print(f"{args.users} users x {args.records} records, {args.workers} workers, "
+              f"latency {args.latency}+{args.jitter}s, errors {args.error_rate:.0%}, "
+              f"throttled {args.throttle_rate:.0%}")
+        for round_no in range(1, args.rounds + 1):
+            started = time.perf_counter()
+            results = orchestrator.sync_users(max_workers=args.workers, chunk_size=args.chunk_size)
+            report(round_no, results, time.perf_counter() - started, xiaomi, garmin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Local stand-ins for the Xiaomi health and Garmin upload APIs.
+
+Implement only the endpoints the clients call, with configurable latency and
+error rates, so the sync can be load-tested without touching real accounts:
+
+- XiaomiMockServer: /pass/serviceLogin, /app/v1/data/get_fitness_data_by_time
+  (RC4-encrypted, next_key paging) and /app/v1/eco/api_proxy (eco/scale/getData)
+- GarminMockServer: /upload-service/upload (201/202, 409 for a payload already
+  uploaded by the same account, 429 with Retry-After when throttled)
+
+Point the clients at them with XiaomiClientBase.ACCOUNT_URL / API_URL and
+GarminClient.CONNECTAPI_URL (or the XIAOMI_ACCOUNT_URL, XIAOMI_API_URL and
+GARMIN_CONNECTAPI_URL environment variables). See benchmarks/load_sync.py.
+"""
+
+from .base import Behavior, MockServer
+from .garmin_api import GarminMockServer
+from .xiaomi_api import MOCK_SSECURITY, XiaomiMockServer
+
+__all__ = ["Behavior", "MockServer", "GarminMockServer", "XiaomiMockServer", "MOCK_SSECURITY"]
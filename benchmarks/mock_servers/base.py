@@ -0,0 +1,138 @@
+"""
+Shared plumbing of the mock servers: a threaded HTTP server on a background
+thread, simulated latency and injected errors, and request counters.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class Behavior:
+    """
+    Simulated server behavior.
+
+    Args:
+        latency: Base delay added to every response, in seconds.
+        jitter: Extra random delay of up to this many seconds.
+        error_rate: Fraction of API requests answered with 503.
+        throttle_rate: Fraction of API requests answered with 429 + Retry-After.
+        retry_after: Retry-After value (seconds) sent with 429 responses.
+        seed: Seed of the random generator (None for a random one).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._rng.uniform(0, self.jitter)
+            time.sleep(self.latency + extra)
+
+    def injected_error(self) -> Optional[int]:
+        """503 or 429 if this request should fail, else None."""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return 503
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler with helpers shared by the mock APIs (HTTP/1.1, keep-alive)."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this every response
+    # waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    @property
+    def mock(self) -> "MockServer":
+        return self.server.mock
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send(self, status: int, body: bytes = b"", content_type: str = "application/json",
+             headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def fail_if_injected(self, endpoint: str) -> bool:
+        """Apply latency, then answer with an injected error if one is due (returns True)."""
+        self.mock.behavior.delay()
+        status = self.mock.behavior.injected_error()
+        if status is None:
+            return False
+        self.mock.count(endpoint, status)
+        headers = {"Retry-After": str(self.mock.behavior.retry_after)} if status == 429 else None
+        self.send(status, b'{"error": "injected"}', headers=headers)
+        return True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer:
+    """
+    Runs `handler_class` on a background thread.
+
+    Use as a context manager, or call start() / stop(). `url` is the base URL
+    once started; `requests` counts responses by (endpoint, status).
+    """
+
+    handler_class = MockHandler
+
+    def __init__(self, behavior: Optional[Behavior] = None, host: str = "127.0.0.1", port: int = 0):
+        self.behavior = behavior or Behavior()
+        self.address: Tuple[str, int] = (host, port)
+        self.requests: Counter = Counter()
+        self._counter_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint: str, status: int):
+        with self._counter_lock:
+            self.requests[(endpoint, status)] += 1
+
+    def start(self) -> "MockServer":
+        self._server = ThreadingHTTPServer(self.address, self.handler_class)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
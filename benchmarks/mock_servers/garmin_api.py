@@ -0,0 +1,91 @@
+"""
+Mock Garmin Connect upload API.
+
+Accepts multipart FIT uploads on /upload-service/upload. A payload that the
+same account (Authorization header) has already uploaded is answered with 409,
+like Garmin's duplicate detection; injected errors return 503 or 429.
+"""
+
+import email.parser
+import email.policy
+import hashlib
+import json
+import threading
+from typing import Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from .base import Behavior, MockHandler, MockServer
+
+UPLOAD_PATH = "/upload-service/upload"
+
+
+def _multipart_files(content_type: str, body: bytes):
+    """Yield (filename, content) of the file parts of a multipart/form-data body."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    for part in message.iter_parts():
+        filename = part.get_filename()
+        if filename:
+            yield filename, part.get_payload(decode=True)
+
+
+class _GarminHandler(MockHandler):
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self.read_body()
+        if path != UPLOAD_PATH:
+            self.send(404)
+            return
+        if self.fail_if_injected(path):
+            return
+
+        authorization = self.headers.get("Authorization")
+        files = list(_multipart_files(self.headers.get("Content-Type", ""), body))
+        if not authorization:
+            status, result = 401, {"error": "missing Authorization"}
+        elif not files:
+            status, result = 400, {"error": "no file part"}
+        else:
+            filename, content = files[0]
+            if self.mock.record_upload(authorization, content):
+                status = self.mock.created_status
+                result = {"detailedImportResult": {"fileName": filename, "fileSize": len(content)}}
+            else:
+                status = 409
+                result = {"detailedImportResult": {"fileName": filename, "failures": [
+                    {"messages": [{"code": 202, "content": "Duplicate Activity."}]}]}}
+
+        self.mock.count(path, status)
+        self.send(status, json.dumps(result).encode())
+
+
+class GarminMockServer(MockServer):
+    """
+    Args:
+        created_status: Status of an accepted upload (Garmin answers 201 or 202).
+        behavior: Latency / injected errors of the upload endpoint.
+    """
+
+    handler_class = _GarminHandler
+
+    def __init__(self, created_status: int = 202, behavior: Optional[Behavior] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        super().__init__(behavior, host, port)
+        self.created_status = created_status
+        self._uploaded: Set[Tuple[str, str]] = set()
+        self._uploaded_lock = threading.Lock()
+
+    def record_upload(self, account: str, content: bytes) -> bool:
+        """Remember an upload; False if the account already uploaded the same payload."""
+        key = (account, hashlib.sha1(content).hexdigest())
+        with self._uploaded_lock:
+            if key in self._uploaded:
+                return False
+            self._uploaded.add(key)
+            return True
+
+    @property
+    def uploads(self) -> int:
+        with self._uploaded_lock:
+            return len(self._uploaded)
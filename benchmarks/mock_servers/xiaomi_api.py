@@ -0,0 +1,150 @@
+"""
+Mock Xiaomi account + health API.
+
+Every account gets the same MOCK_SSECURITY from serviceLogin, so the server can
+derive the signed nonce of any request from its `_nonce` field, decrypt the
+parameters and encrypt the response exactly like the real API. The weight
+history of an account is generated by benchmarks/synthetic.py, seeded by its
+userId cookie.
+"""
+
+import base64
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import fitness_items, scale_items
+from xiaomi.rc4 import rc4_drop1024
+
+from .base import Behavior, MockHandler, MockServer
+
+MOCK_SSECURITY = hashlib.sha256(b"weight-sync mock ssecurity").digest()[:16]
+
+FITNESS_API = "/app/v1/data/get_fitness_data_by_time"
+MODEL_API = "/app/v1/eco/api_proxy"
+# Page size of eco/scale/getData (XiaomiClientBase.MODEL_PAGE_SIZE)
+MODEL_PAGE_SIZE = 20
+
+
+class _XiaomiHandler(MockHandler):
+
+    def _cookies(self) -> Dict[str, str]:
+        cookies = {}
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name:
+                cookies[name] = value
+        return cookies
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/pass/serviceLogin":
+            self._service_login()
+        elif path == "/sts":
+            # The client only reads the Date header (time offset) from here
+            self.mock.count(path, 200)
+            self.send(200, b"ok", content_type="text/plain")
+        else:
+            self.send(404)
+
+    def _service_login(self):
+        self.mock.behavior.delay()
+        cookies = self._cookies()
+        user_id, pass_token = cookies.get("userId"), cookies.get("passToken")
+        if not user_id or not pass_token:
+            data = {"code": 70016, "desc": "missing passToken"}
+        else:
+            data = {
+                "code": 0,
+                "userId": user_id,
+                "passToken": pass_token,
+                "ssecurity": base64.b64encode(MOCK_SSECURITY).decode(),
+                "location": f"{self.mock.url}/sts?userId={user_id}",
+            }
+        self.mock.count("/pass/serviceLogin", 200)
+        self.send(200, b"&&&START&&&" + json.dumps(data).encode(),
+                  headers={"Set-Cookie": f"userId={user_id}; Path=/"} if user_id else None)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self.read_body()
+        if path not in (FITNESS_API, MODEL_API):
+            self.send(404)
+            return
+        if self.fail_if_injected(path):
+            return
+
+        form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        try:
+            signed_nonce = hashlib.sha256(MOCK_SSECURITY + base64.b64decode(form["_nonce"])).digest()
+            params = json.loads(rc4_drop1024(signed_nonce, base64.b64decode(form["data"])))
+        except (KeyError, ValueError):
+            self.mock.count(path, 401)
+            self.send(401, b'{"code": 401, "message": "invalid signature"}')
+            return
+
+        seed = _seed(self._cookies().get("userId"))
+        if path == FITNESS_API:
+            result = self.mock.fitness_page(seed, params)
+        else:
+            result = self.mock.model_page(seed, json.loads(params["params"]))
+
+        response = json.dumps({"code": 0, "message": "ok", "result": result}).encode()
+        self.mock.count(path, 200)
+        self.send(200, base64.b64encode(rc4_drop1024(signed_nonce, response)), content_type="text/plain")
+
+
+def _seed(user_id: Optional[str]) -> int:
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return 0
+
+
+class XiaomiMockServer(MockServer):
+    """
+    Args:
+        records: Weight records in every account's history.
+        page_size: Items per get_fitness_data_by_time page.
+        behavior: Latency / injected errors of the API endpoints.
+    """
+
+    handler_class = _XiaomiHandler
+
+    def __init__(self, records: int = 1000, page_size: int = 200,
+                 behavior: Optional[Behavior] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(behavior, host, port)
+        self.records = records
+        self.page_size = page_size
+        self._histories: Dict[int, Tuple[List[dict], List[dict]]] = {}
+        self._history_lock = threading.Lock()
+
+    def history(self, seed: int) -> Tuple[List[dict], List[dict]]:
+        """(fitness items, scale items) of an account, oldest first."""
+        with self._history_lock:
+            history = self._histories.get(seed)
+            if history is None:
+                history = self._histories[seed] = (
+                    fitness_items(self.records, seed), scale_items(self.records, seed))
+            return history
+
+    def fitness_page(self, seed: int, params: dict) -> dict:
+        start_time = params.get("start_time") or 0
+        end_time = params.get("end_time") or float("inf")
+        items = [item for item in self.history(seed)[0] if start_time <= item["time"] <= end_time]
+        offset = int(params.get("next_key") or 0)
+        page = items[offset:offset + self.page_size]
+        has_more = offset + self.page_size < len(items)
+        return {
+            "data_list": page,
+            "has_more": has_more,
+            "next_key": str(offset + self.page_size) if has_more else "",
+        }
+
+    def model_page(self, seed: int, inner: dict) -> dict:
+        # Newest first, createTime in [endTime, beginTime)
+        begin, end = inner["param"]["beginTime"], inner["param"]["endTime"]
+        items = [item for item in reversed(self.history(seed)[1]) if end <= item["createTime"] < begin]
+        return {"resp": json.dumps({"code": 0, "result": items[:MODEL_PAGE_SIZE]})}
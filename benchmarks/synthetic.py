@@ -0,0 +1,118 @@
+"""
+Synthetic Xiaomi API payloads for the benchmarks.
+
+Generates deterministic (seeded) weight histories in the two formats the
+client parses:
+
+- data_list items of the health API used by get_fitness_data_by_time()
+  (parsed by unmarshal_fitness_data)
+- items of the legacy eco/scale/getData API (parsed by unmarshal_scale_data),
+  mixing the fromSource 1/2 and 3 (bodyResData) layouts
+
+Usage as a module:
+    from synthetic import fitness_items, scale_items
+"""
+
+import json
+import random
+
+# 2024-01-01T00:00:00Z
+START_TIME = 1704067200
+# One measurement roughly every 8 hours
+INTERVAL_SECONDS = 8 * 3600
+
+# Filter used by the benchmarks: keeps most records, drops the outliers
+BENCH_FILTER = {
+    "enabled": True,
+    "conditions": [
+        {"field": "Weight", "operator": "between", "value": [50, 90]},
+        {"field": "BodyFat", "operator": "gt", "value": 0},
+    ],
+    "logic": "and",
+}
+
+
+def _measurements(count, seed):
+    """Yield (timestamp, fields) with a slowly drifting weight and some outliers."""
+    rng = random.Random(seed)
+    weight = 72.0
+    for i in range(count):
+        weight = min(95.0, max(45.0, weight + rng.uniform(-0.3, 0.3)))
+        measured = weight if rng.random() > 0.02 else weight * rng.choice((0.5, 1.6))
+        body_fat = round(rng.uniform(15, 28), 1) if rng.random() > 0.05 else 0
+        yield START_TIME + i * INTERVAL_SECONDS + rng.randint(0, 600), {
+            "weight": round(measured, 2),
+            "bmi": round(measured / 1.75 ** 2, 1),
+            "body_fat": body_fat,
+            "water": round(rng.uniform(50, 60), 1),
+            "bone": round(rng.uniform(2.5, 3.5), 2),
+            "muscle": round(rng.uniform(70, 80), 1),
+            "visceral": rng.randint(5, 12),
+            "bmr": rng.randint(1400, 1800),
+            "age": rng.randint(25, 40),
+            "score": rng.randint(60, 95),
+            "heart_rate": rng.randint(55, 85),
+            "protein": round(rng.uniform(16, 20), 1),
+        }
+
+
+def fitness_items(count, seed=0):
+    """data_list items as returned by the health API (key "weight")."""
+    items = []
+    for timestamp, m in _measurements(count, seed):
+        value = {
+            "weight": m["weight"],
+            "bmi": m["bmi"],
+            "body_fat_rate": m["body_fat"],
+            "moisture_rate": m["water"],
+            "bone_mass": m["bone"],
+            "muscle_rate": m["muscle"],
+            "visceral_fat": m["visceral"],
+            "basal_metabolism": m["bmr"],
+            "ma": m["age"],
+            "sbc": m["score"],
+            "heartRate": m["heart_rate"],
+            "protein_rate": m["protein"],
+        }
+        items.append({
+            "sid": "yunmai.scales.ms103",
+            "key": "weight",
+            "time": timestamp,
+            "value": json.dumps(value),
+            "zone_offset": 28800,
+            "update_time": timestamp + 5,
+            "zone_name": "Asia/Shanghai",
+        })
+    return items
+
+
+def scale_items(count, seed=0):
+    """Items of the legacy eco/scale/getData API, alternating fromSource 1/2 and 3."""
+    items = []
+    for i, (timestamp, m) in enumerate(_measurements(count, seed)):
+        body = {
+            "bfp": m["body_fat"],
+            "bwp": m["water"],
+            "bmc": m["bone"],
+            "ma": m["age"],
+            "smm": round(m["weight"] * m["muscle"] / 100, 2),
+            "vfl": m["visceral"],
+            "bmr": m["bmr"],
+            "sbc": m["score"],
+        }
+        from_source = (1, 2, 3)[i % 3]
+        if from_source == 3:
+            data = {
+                "weight": m["weight"],
+                "bmi": m["bmi"],
+                "heartRate": m["heart_rate"],
+                "bodyResData": json.dumps(body),
+            }
+        else:
+            data = dict(body, weight=m["weight"], bmi=m["bmi"])
+        items.append({
+            "fromSource": from_source,
+            "createTime": timestamp * 1000,
+            "data": json.dumps(data),
+        })
+    return items
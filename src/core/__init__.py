@@ -1,12 +1,26 @@
 # Core Application Layer
-from .sync_service import SyncOrchestrator, SyncProgress
-from .models import UserModel, GarminConfig
-from .config_manager import EnhancedConfigManager
-
-__all__ = [
-    'SyncOrchestrator',
-    'SyncProgress',
-    'UserModel',
-    'GarminConfig',
-    'EnhancedConfigManager',
-]
+# 子模块按需导入（PEP 562），`import core.sync_state` 等不会连带加载同步服务及其依赖
+import importlib
+
+_EXPORTS = {
+    'SyncOrchestrator': '.sync_service',
+    'SyncProgress': '.sync_service',
+    'UserModel': '.models',
+    'GarminConfig': '.models',
+    'EnhancedConfigManager': '.config_manager',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -2,26 +2,59 @@
 增强的配置管理器
 复制并扩展现有的 xiaomi.config.ConfigManager
 """
+import dataclasses
+import functools
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 import logging
 
 from .models import UserModel
+from utils.atomic_file import FileLock, atomic_write
 
 logger = logging.getLogger(__name__)
 
 
+def _synchronized(method):
+    """在实例锁内执行方法（多个同步线程可能同时写配置）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class EnhancedConfigManager:
-    """增强的配置管理器"""
+    """
+    增强的配置管理器
+
+    写入时加文件锁（GUI、定时任务和守护进程可能同时写同一个 users.json）并原子替换文件。
+    在 batch() 中的修改只标记为未保存，结束时统一写入一次；写入前文件已被其他进程修改时，
+    以磁盘内容为准，只重新应用本实例修改过的用户。
+
+    按用户名维护索引并缓存解析后的 UserModel，查找为 O(1)。get_user / get_users 返回的是
+    缓存对象，修改后需通过 update_user 保存。
+    """
 
     def __init__(self, config_file: str = "users.json"):
         self.config_file = Path(config_file)
         self.config_dir = self.config_file.parent
         self.config_dir.mkdir(parents=True, exist_ok=True)
 
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.config_file)
+        # 未写入文件的修改：整体修改（增删用户、设置等）或按用户的修改
+        self._dirty_all = False
+        self._dirty_users = set()
+        self._batch_state = threading.local()
+        # 用户名 -> users 列表下标 / 解析后的 UserModel（配置重新读取或增删用户时重建）
+        self._user_index: Optional[Dict[str, int]] = None
+        self._user_models: Dict[str, UserModel] = {}
+        self._user_list: Optional[List[UserModel]] = None
         self._config_data = self._load_config()
 
         # 读取自定义数据目录配置（如果有）
@@ -30,8 +63,38 @@ class EnhancedConfigManager:
         if self.custom_data_dir:
             logger.info(f"使用自定义数据目录: {self.custom_data_dir}")
 
+    def _file_signature(self) -> Optional[tuple]:
+        """
+        配置文件的 (inode, 修改时间, 大小)，文件不存在时返回 None
+
+        修改时间的精度可能比两次写入的间隔粗；每次原子写入都会换成新文件，inode 也会变化
+        """
+        try:
+            st = self.config_file.stat()
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _invalidate_users(self):
+        """配置数据被替换或用户增删后，丢弃索引与缓存的 UserModel"""
+        self._user_index = None
+        self._user_models = {}
+        self._user_list = None
+
+    def _index(self) -> Dict[str, int]:
+        """用户名 -> users 列表下标（重名时取第一个，与按顺序查找一致）"""
+        if self._user_index is None:
+            index = {}
+            for i, user_data in enumerate(self._config_data.get("users", [])):
+                index.setdefault(user_data.get("username"), i)
+            self._user_index = index
+        return self._user_index
+
     def _load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
+        self._invalidate_users()
+        # 先记录文件签名：读取期间文件再被修改时，下次检查仍会发现
+        self._loaded_signature = self._file_signature()
         if not self.config_file.exists():
             logger.info(f"配置文件不存在，创建新文件: {self.config_file}")
             return {"users": []}
@@ -45,33 +108,151 @@ class EnhancedConfigManager:
             logger.error(f"加载配置文件失败: {e}")
             return {"users": []}
 
-    def _save_config(self):
-        """保存配置文件"""
+    @_synchronized
+    def _save_config(self, username: Optional[str] = None):
+        """
+        保存配置文件；当前线程在 batch() 中时推迟到 batch 结束时写入
+
+        Args:
+            username: 只修改了该用户的记录时传入，写入前文件被外部修改时只合并该用户
+        """
+        if username is None:
+            self._dirty_all = True
+        else:
+            self._dirty_users.add(username)
+        if not getattr(self._batch_state, "depth", 0):
+            self.flush()
+
+    @_synchronized
+    def flush(self) -> bool:
+        """
+        写入未保存的修改（持有文件锁，先写临时文件再替换）
+
+        Returns:
+            bool: 是否写入了文件
+        """
+        if not self._dirty_all and not self._dirty_users:
+            return False
+
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self._config_data, f, indent=4, ensure_ascii=False)
-            logger.info(f"配置已保存到: {self.config_file}")
+            with self._file_lock:
+                if not self._dirty_all and self.has_changed_on_disk():
+                    self._merge_from_disk()
+                atomic_write(
+                    self.config_file,
+                    json.dumps(self._config_data, indent=4, ensure_ascii=False))
+                self._loaded_signature = self._file_signature()
         except Exception as e:
             logger.error(f"保存配置文件失败: {e}")
             raise
 
+        self._dirty_all = False
+        self._dirty_users.clear()
+        logger.info(f"配置已保存到: {self.config_file}")
+        return True
+
+    def _merge_from_disk(self):
+        """以磁盘上的配置为准，重新应用本实例修改过的用户（调用方持有文件锁）"""
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                disk_data = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取磁盘上的配置失败，使用内存中的配置覆盖: {e}")
+            return
+
+        changed = {
+            u.get("username"): u for u in self._config_data.get("users", [])
+            if u.get("username") in self._dirty_users
+        }
+        users = disk_data.setdefault("users", [])
+        for i, user_data in enumerate(users):
+            name = user_data.get("username")
+            if name in changed:
+                users[i] = changed.pop(name)
+        for name in changed:
+            logger.warning(f"用户 {name} 已从配置文件中删除，放弃对其的修改")
+
+        self._config_data = disk_data
+        self._invalidate_users()
+        logger.info("配置文件已被其他进程修改，已合并后保存")
+
+    @contextmanager
+    def batch(self):
+        """
+        合并写入：with 块内（当前线程）的修改在块结束时统一写入一次，可嵌套
+
+        写入失败时只记录日志，修改保留在内存中，下次保存时重试。
+        """
+        depth = getattr(self._batch_state, "depth", 0)
+        self._batch_state.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._batch_state.depth = depth
+            if depth == 0:
+                try:
+                    self.flush()
+                except Exception:
+                    pass
+
+    def has_changed_on_disk(self) -> bool:
+        """配置文件在本实例最后一次读取/保存之后是否被外部修改"""
+        return self._file_signature() != self._loaded_signature
+
+    @_synchronized
+    def reload_if_changed(self) -> bool:
+        """
+        配置文件被外部修改时重新读取（守护模式使用）
+
+        Returns:
+            bool: 是否重新读取了配置
+        """
+        if not self.has_changed_on_disk():
+            return False
+
+        if self._dirty_all or self._dirty_users:
+            # 先把未保存的修改与磁盘上的配置合并写入，避免丢失
+            self.flush()
+        else:
+            self._config_data = self._load_config()
+        data_dir = self._config_data.get("settings", {}).get("data_dir")
+        if data_dir != self.custom_data_dir:
+            logger.warning(f"数据目录配置已修改为 {data_dir}，重启后生效")
+        return True
+
+    @_synchronized
     def get_users(self) -> List[UserModel]:
         """获取所有用户"""
-        users_data = self._config_data.get("users", [])
-        return [UserModel.from_dict(u) for u in users_data]
+        if self._user_list is None:
+            self._user_list = [
+                self._user_at(i, u) for i, u in enumerate(self._config_data.get("users", []))
+            ]
+        return list(self._user_list)
 
+    @_synchronized
     def get_user(self, username: str) -> Optional[UserModel]:
         """获取指定用户"""
-        for user_data in self._config_data.get("users", []):
-            if user_data.get("username") == username:
-                return UserModel.from_dict(user_data)
-        return None
-
+        i = self._index().get(username)
+        if i is None:
+            return None
+        return self._user_at(i, self._config_data["users"][i])
+
+    def _user_at(self, i: int, user_data: Dict[str, Any]) -> UserModel:
+        """users[i] 的 UserModel（重名用户只缓存第一个）"""
+        username = user_data.get("username")
+        if self._index().get(username) != i:
+            return UserModel.from_dict(user_data)
+        user = self._user_models.get(username)
+        if user is None:
+            user = self._user_models[username] = UserModel.from_dict(user_data)
+        return user
+
+    @_synchronized
     def add_user(self, user: UserModel) -> bool:
         """添加用户"""
         try:
             # 检查用户是否已存在
-            if self.get_user(user.username):
+            if user.username in self._index():
                 logger.warning(f"用户已存在: {user.username}")
                 return False
 
@@ -84,6 +265,7 @@ class EnhancedConfigManager:
                 self._config_data["users"] = []
 
             self._config_data["users"].append(user.to_dict())
+            self._invalidate_users()
             self._save_config()
             logger.info(f"成功添加用户: {user.username}")
             return True
@@ -91,32 +273,34 @@ class EnhancedConfigManager:
             logger.error(f"添加用户失败: {e}")
             return False
 
+    @_synchronized
     def update_user(self, user: UserModel) -> bool:
         """更新用户"""
         try:
-            users = self._config_data.get("users", [])
-            for i, u in enumerate(users):
-                if u.get("username") == user.username:
-                    users[i] = user.to_dict()
-                    self._config_data["users"] = users
-                    self._save_config()
-                    logger.info(f"成功更新用户: {user.username}")
-                    return True
-
-            logger.warning(f"用户不存在: {user.username}")
-            return False
+            i = self._index().get(user.username)
+            if i is None:
+                logger.warning(f"用户不存在: {user.username}")
+                return False
+
+            self._config_data["users"][i] = user.to_dict()
+            self._user_models[user.username] = user
+            self._user_list = None
+            self._save_config(user.username)
+            logger.info(f"成功更新用户: {user.username}")
+            return True
         except Exception as e:
             logger.error(f"更新用户失败: {e}")
             return False
 
+    @_synchronized
     def add_or_update_user(self, user: UserModel) -> bool:
         """添加或更新用户"""
-        existing = self.get_user(user.username)
-        if existing:
+        if user.username in self._index():
             return self.update_user(user)
         else:
             return self.add_user(user)
 
+    @_synchronized
     def delete_user(self, username: str) -> bool:
         """删除用户"""
         try:
@@ -131,6 +315,7 @@ class EnhancedConfigManager:
                 return False
 
             self._config_data["users"] = users
+            self._invalidate_users()
             self._save_config()
             logger.info(f"成功删除用户: {username}")
             return True
@@ -138,6 +323,7 @@ class EnhancedConfigManager:
             logger.error(f"删除用户失败: {e}")
             return False
 
+    @_synchronized
     def update_user_token(self, username: str, token_data: Dict[str, Any]) -> bool:
         """更新用户 Token"""
         try:
@@ -146,19 +332,24 @@ class EnhancedConfigManager:
                 logger.warning(f"用户不存在: {username}")
                 return False
 
-            # 更新 Token
             from .models import TokenData
-            user.token = TokenData(
+            token = TokenData(
                 userId=token_data.get("userId", ""),
                 passToken=token_data.get("passToken", ""),
                 ssecurity=token_data.get("ssecurity", "")
             )
+            if user.token and all(str(getattr(user.token, f)) == str(getattr(token, f))
+                                  for f in ("userId", "passToken", "ssecurity")):
+                # Token 未变化时不重写配置文件（登录接口返回的 userId 是整数）
+                return True
 
-            return self.update_user(user)
+            # 更新 Token（缓存的 UserModel 可能被其他线程持有，替换而不是原地修改）
+            return self.update_user(dataclasses.replace(user, token=token))
         except Exception as e:
             logger.error(f"更新 Token 失败: {e}")
             return False
 
+    @_synchronized
     def update_last_sync(self, username: str, timestamp: Optional[str] = None) -> bool:
         """更新最后同步时间"""
         try:
@@ -167,7 +358,8 @@ class EnhancedConfigManager:
                 logger.warning(f"用户不存在: {username}")
                 return False
 
-            user.last_sync = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            user = dataclasses.replace(
+                user, last_sync=timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
             return self.update_user(user)
         except Exception as e:
             logger.error(f"更新最后同步时间失败: {e}")
@@ -177,6 +369,7 @@ class EnhancedConfigManager:
         """获取同步历史（如果存在）"""
         return self._config_data.get("sync_history", [])
 
+    @_synchronized
     def add_sync_history(self, record: Dict[str, Any]) -> bool:
         """添加同步历史记录"""
         try:
@@ -196,6 +389,7 @@ class EnhancedConfigManager:
             logger.error(f"添加同步历史失败: {e}")
             return False
 
+    @_synchronized
     def set_custom_data_dir(self, data_dir: str) -> bool:
         """
         设置自定义数据目录
@@ -224,6 +418,7 @@ class EnhancedConfigManager:
         """获取自定义数据目录"""
         return self.custom_data_dir
 
+    @_synchronized
     def reset_data_dir(self) -> bool:
         """
         重置为默认数据目录
@@ -33,6 +33,7 @@ class UserModel:
     garmin: Optional[GarminConfig] = None
     created_at: Optional[str] = None
     last_sync: Optional[str] = None
+    sync_interval: Optional[float] = None  # 守护模式下的同步间隔（分钟），None 使用全局设置
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -64,6 +65,9 @@ class UserModel:
         if self.last_sync:
             result["last_sync"] = self.last_sync
 
+        if self.sync_interval:
+            result["sync_interval"] = self.sync_interval
+
         return result
 
     @classmethod
@@ -95,7 +99,8 @@ class UserModel:
             token=token,
             garmin=garmin,
             created_at=data.get("created_at"),
-            last_sync=data.get("last_sync")
+            last_sync=data.get("last_sync"),
+            sync_interval=data.get("sync_interval")
         )
 
 
@@ -129,9 +134,14 @@ class SyncResult:
     username: str
     success: bool
     total_records: int = 0
+    stored_records: int = 0  # 新增或变更后写入本地存储的记录数
+    pending_records: int = 0  # 需要上传的记录数
     uploaded_chunks: int = 0
     failed_chunks: int = 0
     duplicate_chunks: int = 0
     failed_details: List[Dict[str, Any]] = field(default_factory=list)
     error_message: Optional[str] = None
+    retries: int = 0  # 小米请求重试次数
+    duration: float = 0.0  # 同步总耗时（秒）
+    timings: Dict[str, Dict[str, float]] = field(default_factory=dict)  # 各阶段耗时，见 utils.timing
     timestamp: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
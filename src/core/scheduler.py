@@ -0,0 +1,170 @@
+"""
+守护模式调度器
+在常驻进程内按用户各自的间隔定时同步，代替 cron 每次重新启动进程、重新登录
+"""
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .models import SyncProgress, SyncResult, UserModel
+from .sync_service import SyncOrchestrator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MINUTES = 24 * 60
+DEFAULT_JITTER_MINUTES = 10
+# 同步失败后的重试间隔上限（分钟）
+FAILURE_RETRY_MINUTES = 30
+# 检查 users.json 是否被修改的间隔（秒）
+CONFIG_POLL_SECONDS = 30
+
+
+class SyncScheduler:
+    """
+    守护模式调度器
+
+    每个用户按自己的 sync_interval（分钟，未配置时使用 interval）定时同步，每次排期再加上
+    0~jitter 分钟的随机延迟，避免所有用户同时请求。运行期间保持小米/Garmin 客户端的登录
+    状态，users.json 只在修改时间变化时重新读取。
+
+    Args:
+        orchestrator: 同步编排器
+        interval: 默认同步间隔（分钟）
+        jitter: 随机延迟上限（分钟）
+        max_workers: 同时同步的用户数
+        chunk_size: 分块大小
+        archive_fit: 是否将生成的 FIT 文件另存到输出目录
+        progress_callback: 进度回调（在工作线程中调用）
+        result_callback: 每轮同步结束后的回调 result_callback(results)
+        poll_interval: 检查配置文件的间隔（秒）
+        clock: 单调时钟（测试时可替换）
+    """
+
+    def __init__(
+        self,
+        orchestrator: SyncOrchestrator,
+        interval: float = DEFAULT_INTERVAL_MINUTES,
+        jitter: float = DEFAULT_JITTER_MINUTES,
+        max_workers: int = 1,
+        chunk_size: int = 500,
+        archive_fit: bool = False,
+        progress_callback: Optional[Callable[[SyncProgress], None]] = None,
+        result_callback: Optional[Callable[[List[SyncResult]], None]] = None,
+        poll_interval: float = CONFIG_POLL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.orchestrator = orchestrator
+        self.interval = interval
+        self.jitter = max(0.0, jitter)
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.archive_fit = archive_fit
+        self.progress_callback = progress_callback
+        self.result_callback = result_callback
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._stop = threading.Event()
+        self._users: Optional[Dict[str, UserModel]] = None
+        self._next_run: Dict[str, float] = {}
+
+    def interval_of(self, user: UserModel) -> float:
+        """用户的同步间隔（秒）"""
+        return float(user.sync_interval or self.interval) * 60
+
+    def next_run(self, username: str) -> Optional[float]:
+        """用户下次同步的时间（clock 时间），未排期时返回 None"""
+        return self._next_run.get(username)
+
+    def _refresh_users(self):
+        """按当前配置增删用户排期：新用户立即同步，已删除的用户丢弃会话"""
+        users = {u.username: u for u in self.orchestrator.list_users() if u.username}
+        for username in list(self._next_run):
+            if username not in users:
+                del self._next_run[username]
+                self.orchestrator.drop_sessions(username)
+                logger.info(f"用户 {username} 已从配置中移除，停止定时同步")
+        now = self._clock()
+        for username in users:
+            if username not in self._next_run:
+                self._next_run[username] = now
+        self._users = users
+
+    def run_pending(self) -> List[SyncResult]:
+        """
+        检查配置变化并同步所有到期的用户
+
+        Returns:
+            List[SyncResult]: 本轮的同步结果（没有到期用户时为空）
+        """
+        if self._users is None:
+            self._refresh_users()
+        elif self.orchestrator.config_mgr.reload_if_changed():
+            logger.info("检测到配置文件已修改，已重新读取")
+            self._refresh_users()
+
+        now = self._clock()
+        due = [name for name, at in self._next_run.items() if at <= now]
+        if not due:
+            return []
+
+        results = self.orchestrator.sync_users(
+            due,
+            max_workers=self.max_workers,
+            chunk_size=self.chunk_size,
+            progress_callback=self.progress_callback,
+            archive_fit=self.archive_fit
+        )
+
+        # 同步时可能更新了配置（Token、最后同步时间），排期使用最新的用户设置
+        self._users = {u.username: u for u in self.orchestrator.list_users() if u.username}
+        finished = self._clock()
+        for result in results:
+            user = self._users.get(result.username)
+            if user is None:
+                self._next_run.pop(result.username, None)
+                continue
+            delay = self.interval_of(user)
+            if not result.success:
+                # 失败时丢弃会话，下次重新登录，并提前重试
+                self.orchestrator.drop_sessions(result.username)
+                delay = min(delay, FAILURE_RETRY_MINUTES * 60)
+            self._next_run[result.username] = finished + delay + random.uniform(0, self.jitter * 60)
+            logger.info(f"用户 {result.username} 下次同步将在 {delay / 60:.0f} 分钟后（另加随机延迟）")
+
+        if self.result_callback:
+            self.result_callback(results)
+        return results
+
+    def seconds_until_next(self) -> Optional[float]:
+        """距离最近一次到期同步的秒数，没有用户时返回 None"""
+        if not self._next_run:
+            return None
+        return max(0.0, min(self._next_run.values()) - self._clock())
+
+    def run_forever(self):
+        """持续运行，直到 stop() 被调用"""
+        self._stop.clear()
+        self.orchestrator.keep_sessions_warm()
+        logger.info(
+            f"守护模式已启动：默认间隔 {self.interval} 分钟，随机延迟 0~{self.jitter} 分钟")
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.run_pending()
+                    wait = self.seconds_until_next()
+                except Exception as e:
+                    logger.exception(f"定时同步异常: {e}")
+                    wait = None
+
+                wait = self.poll_interval if wait is None else min(wait, self.poll_interval)
+                self._stop.wait(wait)
+        finally:
+            self.orchestrator.keep_sessions_warm(False)
+            logger.info("守护模式已停止")
+
+    def stop(self):
+        """停止调度（可在信号处理函数或其他线程中调用）"""
+        self._stop.set()
+        self.orchestrator.stop_sync()
@@ -0,0 +1,173 @@
+"""
+单用户同步流水线
+获取 → 生成 FIT → 上传 三个阶段并行执行，阶段之间使用有界队列，内存占用与历史数据量无关
+"""
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FitChunk:
+    """生成阶段的输出：一个待上传的批次"""
+    index: int
+    records: List[Dict[str, Any]]
+    fit: Any = None  # build_fit 的返回值，None 表示生成失败
+    error: Optional[str] = None
+
+
+class SyncPipeline:
+    """
+    同步流水线
+
+    - 获取线程：逐页拉取数据，经 select 筛选后按 chunk_size 组成批次
+    - 生成线程：为每个批次生成 FIT
+    - 调用方（上传阶段）：通过 next_chunk() 依次取出生成好的批次
+
+    因此第 N 批上传时，第 N+1 批已在生成、后续页面已在获取。
+
+    Args:
+        fetch_pages: 返回逐页体重记录的可迭代对象
+        select: 对每页记录进行筛选（过滤规则、上传台账），返回需要上传的记录
+        build_fit: build_fit(index, records) 生成 FIT，返回值原样交给上传阶段
+        chunk_size: 每个批次的记录数
+        queue_size: 阶段之间队列的容量
+        on_page: 每页获取完成后的回调（如写入本地存储）
+    """
+
+    DONE = object()
+
+    def __init__(
+        self,
+        fetch_pages: Callable[[], Iterable[List[Dict[str, Any]]]],
+        select: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        build_fit: Callable[[int, List[Dict[str, Any]]], Any],
+        chunk_size: int = 500,
+        queue_size: int = 2,
+        on_page: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ):
+        self._fetch_pages = fetch_pages
+        self._select = select
+        self._build_fit = build_fit
+        self._on_page = on_page
+        self.chunk_size = chunk_size
+
+        self._chunk_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._output_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        # 获取阶段统计（仅由获取线程写入）
+        self.pages = 0
+        self.fetched_records = 0
+        self.pending_records = 0
+        self.latest_record: Optional[Dict[str, Any]] = None
+        self.fetch_done = False
+        self.error: Optional[BaseException] = None
+
+    def start(self):
+        """启动获取与生成线程"""
+        for target, name in ((self._fetch_worker, "fetch"), (self._generate_worker, "generate")):
+            thread = threading.Thread(target=target, name=f"sync-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """停止流水线并等待线程退出"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def next_chunk(self, timeout: float = 0.5):
+        """
+        取出下一个生成好的批次
+
+        Returns:
+            FitChunk；全部完成时返回 SyncPipeline.DONE；超时返回 None
+        """
+        try:
+            return self._output_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _put(self, q: "queue.Queue", item) -> bool:
+        """放入队列，停止时放弃"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: "queue.Queue"):
+        """从队列取出，停止时返回 None"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return None
+
+    def _fetch_worker(self):
+        buffer: List[Dict[str, Any]] = []
+        try:
+            for page in self._fetch_pages():
+                if self._stop.is_set():
+                    return
+
+                self.pages += 1
+                self.fetched_records += len(page)
+                for record in page:
+                    ts = record.get('Timestamp')
+                    if ts is not None and (
+                        self.latest_record is None or ts > self.latest_record['Timestamp']
+                    ):
+                        self.latest_record = record
+
+                if self._on_page:
+                    self._on_page(page)
+
+                selected = self._select(page)
+                self.pending_records += len(selected)
+                buffer.extend(selected)
+
+                while len(buffer) >= self.chunk_size:
+                    chunk, buffer = buffer[:self.chunk_size], buffer[self.chunk_size:]
+                    if not self._put(self._chunk_queue, chunk):
+                        return
+
+            if buffer:
+                self._put(self._chunk_queue, buffer)
+        except Exception as e:
+            # 获取失败时不再提交剩余不足一批的记录
+            logger.exception(f"获取数据失败: {e}")
+            self.error = e
+        finally:
+            self.fetch_done = True
+            self._put(self._chunk_queue, self.DONE)
+
+    def _generate_worker(self):
+        index = 0
+        while True:
+            chunk = self._get(self._chunk_queue)
+            if chunk is None:
+                return
+            if chunk is self.DONE:
+                self._put(self._output_queue, self.DONE)
+                return
+
+            index += 1
+            try:
+                fit = self._build_fit(index, chunk)
+                error = None if fit is not None else "Failed to generate FIT file"
+            except Exception as e:
+                logger.exception(f"生成 FIT 失败: {e}")
+                fit, error = None, str(e)
+
+            if not self._put(self._output_queue, FitChunk(index, chunk, fit, error)):
+                return
@@ -4,11 +4,18 @@
 """
 import logging
 import datetime
-from typing import Generator, Optional, List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Generator, Iterable, Optional, List, Dict, Any
 from pathlib import Path
 
 from .models import SyncProgress, SyncResult, UserModel
 from .config_manager import EnhancedConfigManager
+from .sync_state import SyncStateManager
+from .weight_store import WeightStore
+from .upload_ledger import UploadLedger
+from .sync_pipeline import SyncPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +23,26 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from xiaomi.client import XiaomiClient, unmarshal_fitness_data
-from garmin.client import GarminClient
-from garmin.fit_generator import create_weight_fit_file
-from utils.paths import get_session_dir, get_output_dir
+from xiaomi.client import (
+    XiaomiClient, XiaomiAPIError, XiaomiRequestError, is_retryable_error, unmarshal_fitness_data
+)
+from xiaomi.session import XiaomiSessionCache
+from garmin.client import (
+    GarminClient, DEFAULT_UPLOAD_POOL_SIZE, configure_upload_pool, get_upload_connection_stats
+)
+from garmin.fit_generator import build_weight_fit_bytes
+from garmin.filter import compile_filter
+from utils.paths import (
+    get_session_dir, get_output_dir, get_sync_state_file, get_weight_db_file, get_xiaomi_session_dir
+)
+from utils.rate_limit import ServiceLimiter, DEFAULT_XIAOMI_RATE, DEFAULT_GARMIN_RATE
+from utils.timing import StageTimer
+from utils.metrics import (
+    TOKEN_REFRESH_FAILURES, RECORDS_FETCHED, RECORDS_PENDING, CHUNKS, record_sync_run
+)
+
+# 守护模式下复用小米会话的时长（秒），超时后重新用 Token 登录
+DEFAULT_XIAOMI_SESSION_TTL = 6 * 3600
 
 
 class SyncOrchestrator:
@@ -34,8 +57,122 @@ class SyncOrchestrator:
         """
         self.config_path = config_path
         self.config_mgr = EnhancedConfigManager(config_path)
+        self.state_mgr = self._create_state_manager()
+        self.weight_store = self._create_weight_store()
+        self.upload_ledger = UploadLedger(self.weight_store.db_file)
+        self.xiaomi_sessions = self._create_xiaomi_sessions()
         self._should_stop = False
 
+        # 已登录客户端缓存（守护模式启用，见 keep_sessions_warm）
+        self._warm_sessions: Optional[Dict[tuple, tuple]] = None
+        self._warm_lock = threading.Lock()
+        self._xiaomi_session_ttl = DEFAULT_XIAOMI_SESSION_TTL
+
+        # 各服务共享的限流器（多用户并行同步时生效）
+        self.configure_limits()
+
+    def configure_limits(
+        self,
+        xiaomi_concurrency: Optional[int] = None,
+        garmin_concurrency: Optional[int] = None,
+        xiaomi_rate: float = DEFAULT_XIAOMI_RATE,
+        garmin_rate: float = DEFAULT_GARMIN_RATE,
+        garmin_pool_size: Optional[int] = None,
+        garmin_keep_alive: bool = True
+    ):
+        """
+        配置小米/Garmin 的并发数与请求速率限制
+
+        Args:
+            xiaomi_concurrency: 同时进行的小米请求数上限（None 表示不限）
+            garmin_concurrency: 同时进行的 Garmin 上传数上限（None 表示不限）
+            xiaomi_rate: 小米请求速率（每秒请求数，<= 0 表示不限）
+            garmin_rate: Garmin 上传速率（每秒请求数，<= 0 表示不限）
+            garmin_pool_size: 每个 Garmin 域名保持的连接数（默认取 garmin_concurrency 或 10）
+            garmin_keep_alive: 上传是否复用连接
+        """
+        self.xiaomi_limiter = ServiceLimiter(
+            "xiaomi", max_concurrency=xiaomi_concurrency,
+            rate=xiaomi_rate, burst=max(1, int(xiaomi_rate)))
+        self.garmin_limiter = ServiceLimiter(
+            "garmin", max_concurrency=garmin_concurrency,
+            rate=garmin_rate, burst=max(1, int(garmin_rate)))
+        configure_upload_pool(
+            pool_size=garmin_pool_size or garmin_concurrency or DEFAULT_UPLOAD_POOL_SIZE,
+            keep_alive=garmin_keep_alive)
+
+    def keep_sessions_warm(self, enabled: bool = True, xiaomi_ttl: float = DEFAULT_XIAOMI_SESSION_TTL):
+        """
+        在多次同步之间复用已登录的小米/Garmin 客户端（守护模式使用）
+
+        复用时跳过小米 Token 登录和 Garmin 会话加载，HTTP 连接也保持不断开。
+        用户的账号信息变化后缓存自动失效。
+
+        Args:
+            enabled: 是否启用，关闭时清空缓存
+            xiaomi_ttl: 小米会话复用时长（秒）
+        """
+        with self._warm_lock:
+            self._warm_sessions = {} if enabled else None
+            self._xiaomi_session_ttl = xiaomi_ttl
+
+    def drop_sessions(self, username: Optional[str] = None):
+        """丢弃缓存的客户端（username 为 None 时丢弃全部），下次同步重新登录"""
+        with self._warm_lock:
+            if self._warm_sessions is None:
+                return
+            if username is None:
+                self._warm_sessions.clear()
+            else:
+                for key in [k for k in self._warm_sessions if k[1] == username]:
+                    del self._warm_sessions[key]
+
+    def _get_warm_session(self, service: str, username: str, fingerprint: tuple,
+                          ttl: Optional[float] = None):
+        """取出缓存的客户端；账号信息不一致或超过 ttl 秒时返回 None"""
+        with self._warm_lock:
+            if self._warm_sessions is None:
+                return None
+            entry = self._warm_sessions.get((service, username))
+            if entry is None:
+                return None
+            cached_fingerprint, client, created = entry
+            if cached_fingerprint != fingerprint or (ttl is not None and time.monotonic() - created > ttl):
+                del self._warm_sessions[(service, username)]
+                return None
+            return client
+
+    @staticmethod
+    def _xiaomi_fingerprint(user: UserModel) -> tuple:
+        """小米客户端缓存键：密码或 Token 变化（如重新登录）后不再复用旧客户端"""
+        token = user.token
+        if token is None:
+            return (user.password,)
+        return (user.password, token.userId, token.passToken, getattr(token, "ssecurity", None))
+
+    def _put_warm_session(self, service: str, username: str, fingerprint: tuple, client):
+        with self._warm_lock:
+            if self._warm_sessions is not None:
+                self._warm_sessions[(service, username)] = (fingerprint, client, time.monotonic())
+
+    def _create_state_manager(self) -> SyncStateManager:
+        """创建同步状态管理器（跟随自定义数据目录）"""
+        return SyncStateManager(get_sync_state_file(
+            custom_base=getattr(self.config_mgr, 'custom_data_dir', None)
+        ))
+
+    def _create_weight_store(self) -> WeightStore:
+        """创建本地体重数据存储（跟随自定义数据目录）"""
+        return WeightStore(get_weight_db_file(
+            custom_base=getattr(self.config_mgr, 'custom_data_dir', None)
+        ))
+
+    def _create_xiaomi_sessions(self) -> XiaomiSessionCache:
+        """创建小米登录会话缓存（跨次同步复用 Cookie，跳过 serviceLogin）"""
+        return XiaomiSessionCache(get_xiaomi_session_dir(
+            custom_base=getattr(self.config_mgr, 'custom_data_dir', None)
+        ), ttl=DEFAULT_XIAOMI_SESSION_TTL)
+
     def reload_config(self, new_config_path: str):
         """
         重新加载配置文件
@@ -45,6 +182,12 @@ class SyncOrchestrator:
         """
         self.config_path = new_config_path
         self.config_mgr = EnhancedConfigManager(new_config_path)
+        self.state_mgr = self._create_state_manager()
+        self.weight_store.close()
+        self.weight_store = self._create_weight_store()
+        self.upload_ledger.close()
+        self.upload_ledger = UploadLedger(self.weight_store.db_file)
+        self.xiaomi_sessions = self._create_xiaomi_sessions()
         logger.info(f"配置文件已重新加载：{new_config_path}")
 
     def list_users(self) -> List[UserModel]:
@@ -67,7 +210,9 @@ class SyncOrchestrator:
         self,
         username: str,
         chunk_size: int = 500,
-        input_callback=None
+        input_callback=None,
+        full: bool = False,
+        archive_fit: bool = False
     ) -> Generator[SyncProgress, None, None]:
         """
         执行同步，返回进度生成器
@@ -76,13 +221,28 @@ class SyncOrchestrator:
             username: 用户名
             chunk_size: 分块大小（默认 500）
             input_callback: 用户输入回调函数（用于登录时需要用户输入）
+            full: 是否忽略增量游标，重新获取全部历史数据
+            archive_fit: 是否将生成的 FIT 文件另存到输出目录（上传直接使用内存数据）
 
         Yields:
-            SyncProgress: 同步进度信息
+            SyncProgress: 同步进度信息（完成时 details 中的 timings 为各阶段耗时，见 utils.timing）
         """
-        try:
-            self._should_stop = False
+        self._should_stop = False
+        yield from self._sync_user_batched(username, chunk_size, input_callback, full, archive_fit)
+
+    def _sync_user_batched(self, username: str, chunk_size: int, input_callback, full: bool, archive_fit: bool):
+        """
+        同步单个用户，不重置停止标志（sync_users 的各工作线程共用同一个标志，
+        只在 sync_user / sync_users 入口处重置）
+        """
+        # Token 与最后同步时间等配置修改在本次同步结束时统一写入一次
+        with self.config_mgr.batch():
+            yield from self._sync_user(username, chunk_size, input_callback, full, archive_fit)
 
+    def _sync_user(self, username: str, chunk_size: int, input_callback, full: bool, archive_fit: bool):
+        """sync_user 的实现"""
+        timer = StageTimer()
+        try:
             # 获取用户配置
             user = self.get_user(username)
             if not user:
@@ -106,7 +266,15 @@ class SyncOrchestrator:
                 username=username
             )
 
-            xiaomi_client = XiaomiClient(username=user.username)
+            # 守护模式下优先复用已登录的客户端
+            xiaomi_client = self._get_warm_session(
+                "xiaomi", username, self._xiaomi_fingerprint(user), self._xiaomi_session_ttl)
+            warm_xiaomi = xiaomi_client is not None
+            if warm_xiaomi:
+                xiaomi_client.retry_count = 0
+                xiaomi_client.fitness_next_key = None
+            else:
+                xiaomi_client = XiaomiClient(username=user.username, limiter=self.xiaomi_limiter)
 
             # 检查是否有可用 token
             has_valid_token = (
@@ -115,7 +283,10 @@ class SyncOrchestrator:
                 user.token.passToken
             )
 
-            if not has_valid_token:
+            if warm_xiaomi:
+                logger.info(f"用户 {username} 复用已登录的小米会话")
+
+            elif not has_valid_token:
                 # 尝试用户名密码登录
                 yield SyncProgress(
                     stage="fetching",
@@ -146,6 +317,7 @@ class SyncOrchestrator:
 
                 if not login_result.get("success"):
                     error_msg = login_result.get("error", "未知错误")
+                    TOKEN_REFRESH_FAILURES.inc(service="xiaomi")
                     yield SyncProgress(
                         stage="error",
                         current=0,
@@ -170,12 +342,14 @@ class SyncOrchestrator:
 
                 # 刷新 token
                 try:
-                    new_token_data = xiaomi_client.login_from_token()
+                    with timer.span("xiaomi_login"):
+                        new_token_data = self._login_xiaomi(xiaomi_client, username)
                     if new_token_data:
                         self.config_mgr.update_user_token(username, new_token_data)
                         logger.info(f"用户 {username} 的 Token 已刷新")
                 except Exception as e:
                     # Token 刷新失败,但继续使用刚获取的 token
+                    TOKEN_REFRESH_FAILURES.inc(service="xiaomi")
                     logger.warning(f"Token 刷新失败,但继续使用: {e}")
 
             else:
@@ -197,12 +371,14 @@ class SyncOrchestrator:
                         username=username
                     )
 
-                    new_token_data = xiaomi_client.login_from_token()
+                    with timer.span("xiaomi_login"):
+                        new_token_data = self._login_xiaomi(xiaomi_client, username)
                     if new_token_data:
                         self.config_mgr.update_user_token(username, new_token_data)
                         logger.info(f"用户 {username} 的 Token 已刷新")
 
                 except Exception as e:
+                    TOKEN_REFRESH_FAILURES.inc(service="xiaomi")
                     yield SyncProgress(
                         stage="error",
                         current=0,
@@ -213,57 +389,11 @@ class SyncOrchestrator:
                     )
                     return
 
-            # 获取体重数据
-            yield SyncProgress(
-                stage="fetching",
-                current=30,
-                total=100,
-                message="📊 正在获取体重数据...",
-                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                username=username
-            )
-
-            weights = []
-            try:
-                # 尝试新 API
-                weights = xiaomi_client.get_model_weights(user.model)
-
-                if not weights:
-                    # 回退到旧 API
-                    fitness_data = xiaomi_client.get_fitness_data_by_time(key="weight")
-                    weights = unmarshal_fitness_data(fitness_data)
-
-                if not weights:
-                    yield SyncProgress(
-                        stage="error",
-                        current=0,
-                        total=100,
-                        message="❌ 未获取到任何体重数据",
-                        timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                        username=username
-                    )
-                    return
-
-            except Exception as e:
-                yield SyncProgress(
-                    stage="error",
-                    current=0,
-                    total=100,
-                    message=f"❌ 获取体重数据失败: {str(e)}",
-                    timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                    username=username
-                )
-                return
-
-            yield SyncProgress(
-                stage="fetching",
-                current=40,
-                total=100,
-                message=f"✅ 成功获取 {len(weights)} 条体重数据",
-                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                username=username,
-                details={"total_weights": len(weights)}
-            )
+            if not warm_xiaomi:
+                # 登录可能刷新了 Token，按写回配置后的 Token 记录缓存键
+                self._put_warm_session("xiaomi", username,
+                                       self._xiaomi_fingerprint(self.config_mgr.get_user(username) or user),
+                                       xiaomi_client)
 
             # 检查是否有 Garmin 配置
             if not user.garmin or not user.garmin.email:
@@ -277,99 +407,79 @@ class SyncOrchestrator:
                 )
                 return
 
-            # 阶段 2: 生成 FIT 文件并分块
-            yield SyncProgress(
-                stage="generating",
-                current=50,
-                total=100,
-                message="📝 正在生成 FIT 文件...",
-                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                username=username
-            )
+            # 增量同步游标
+            cursor = None if full else self.state_mgr.get_cursor(username)
+            if cursor:
+                logger.info(f"用户 {username} 增量同步，游标: {cursor}")
 
-            # 分块处理
-            weight_chunks = [weights[i:i+chunk_size]
-                            for i in range(0, len(weights), chunk_size)]
-            total_chunks = len(weight_chunks)
+            # 过滤规则（每次同步只校验、编译一次，各分块共用）
+            try:
+                record_filter = compile_filter(user.garmin.filter)
+            except Exception as e:
+                logger.error(f"过滤配置错误: {e}，将不使用过滤")
+                record_filter = None
 
-            yield SyncProgress(
-                stage="generating",
-                current=55,
-                total=100,
-                message=f"📦 数据将分为 {total_chunks} 个批次处理",
-                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                username=username,
-                details={"total_chunks": total_chunks}
-            )
+            def select_pending(records):
+                # 应用过滤规则，并只保留台账中不存在的记录
+                with timer.span("select", records=len(records)):
+                    if record_filter is not None:
+                        records = record_filter.apply(records)
+                    return self.upload_ledger.filter_new(username, records)
+
+            fetch_stats = {"stored": 0}
 
-            # 创建输出目录（使用可写路径）
+            def store_page(records):
+                # 写入本地存储（仅写入新增或变更的记录）
+                with timer.span("store", records=len(records)):
+                    fetch_stats["stored"] += self.weight_store.upsert(username, records)
+
+            # 输出目录仅在归档 FIT 文件时创建（使用可写路径）
             output_dir = get_output_dir(
                 custom_base=getattr(self.config_mgr, 'custom_data_dir', None)
-            )
+            ) if archive_fit else None
             timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
 
-            # 阶段 3: 登录 Garmin
+            def chunk_name(idx):
+                return f"weight_{username}_{timestamp}_{idx}.fit"
+
+            def build_fit(idx, chunk):
+                # FIT 在内存中生成，直接上传，不再落盘后回读
+                with timer.span("fit_build", records=len(chunk)) as span:
+                    fit_bytes = build_weight_fit_bytes(chunk)
+                    if fit_bytes is not None:
+                        span.bytes_out = len(fit_bytes)
+                if fit_bytes is not None and output_dir is not None:
+                    (output_dir / chunk_name(idx)).write_bytes(fit_bytes)
+                return fit_bytes
+
+            xiaomi_io = {"in": xiaomi_client.bytes_received, "out": xiaomi_client.bytes_sent}
+
+            def measure_page(span, records):
+                # 每页的收发字节数取客户端计数的增量（含重试）
+                span.records = len(records) if records else 0
+                span.bytes_in = xiaomi_client.bytes_received - xiaomi_io["in"]
+                span.bytes_out = xiaomi_client.bytes_sent - xiaomi_io["out"]
+                xiaomi_io["in"], xiaomi_io["out"] = xiaomi_client.bytes_received, xiaomi_client.bytes_sent
+
+            # 阶段 2: 流水线获取 → 生成 FIT → 上传
             yield SyncProgress(
-                stage="uploading",
-                current=60,
+                stage="fetching",
+                current=30,
                 total=100,
-                message="🏃 正在登录 Garmin...",
+                message="📊 正在获取体重数据...",
                 timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
                 username=username
             )
 
-            # 获取可写的会话目录（修复打包后的只读文件系统问题）
-            session_dir = get_session_dir(
-                email=user.garmin.email,
-                custom_base=getattr(self.config_mgr, 'custom_data_dir', None)
-            )
-
-            garmin_client = GarminClient(
-                email=user.garmin.email,
-                password=user.garmin.password,
-                auth_domain=user.garmin.domain,
-                session_dir=str(session_dir)  # 关键：传入可写路径
+            pipeline = SyncPipeline(
+                fetch_pages=lambda: timer.timed_iter(
+                    "xiaomi_page", self._iter_weight_pages(xiaomi_client, user.model, cursor), measure_page),
+                select=select_pending,
+                build_fit=build_fit,
+                chunk_size=chunk_size,
+                on_page=store_page
             )
 
-            # 登录 Garmin - 根据是否有 input_callback 选择登录方法
-            if input_callback:
-                # UI 模式：使用 login_for_ui，支持 MFA 对话框
-                yield SyncProgress(
-                    stage="uploading",
-                    current=60,
-                    total=100,
-                    message="🏃 正在登录 Garmin（如启用了两步验证，请输入验证码）...",
-                    timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                    username=username
-                )
-
-                # 通过 input_callback 获取 MFA 验证码
-                def get_mfa_code():
-                    logger.info(f"[DEBUG] get_mfa_code 被调用，正在请求用户输入...")
-                    mfa_result = input_callback({
-                        "action": "garmin_mfa",
-                        "username": username,
-                        "email": user.garmin.email
-                    })
-                    logger.info(f"[DEBUG] 收到 MFA 结果: {mfa_result}")
-                    return mfa_result.get("mfa_code", "")
-
-                login_success = garmin_client.login_for_ui(get_mfa_code)
-            else:
-                # CLI 模式：使用原有 login 方法
-                login_success = garmin_client.login()
-
-            if not login_success:
-                yield SyncProgress(
-                    stage="error",
-                    current=0,
-                    total=100,
-                    message="❌ Garmin 登录失败",
-                    timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                    username=username
-                )
-                return
-
             # 上传结果统计
             upload_results = {
                 'success': 0,
@@ -378,130 +488,219 @@ class SyncOrchestrator:
                 'failed_chunks': []
             }
 
-            # 阶段 4: 逐个处理和上传
-            for idx, chunk in enumerate(weight_chunks, 1):
-                if self._should_stop:
-                    yield SyncProgress(
-                        stage="stopped",
-                        current=0,
-                        total=100,
-                        message="⏸️ 同步已停止",
-                        timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                        username=username
-                    )
-                    return
-
-                chunk_filename = output_dir / f"weight_{username}_{timestamp}_{idx}.fit"
-
-                yield SyncProgress(
-                    stage="generating",
-                    current=60 + (idx * 30 // total_chunks),
-                    total=100,
-                    message=f"📝 生成 FIT 文件: 批次 {idx}/{total_chunks}",
-                    timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                    username=username,
-                    details={
-                        "chunk": idx,
-                        "total_chunks": total_chunks,
-                        "records": len(chunk),
-                        "filename": str(chunk_filename)
-                    }
-                )
-
-                # 生成 FIT 文件
-                filter_config = user.garmin.filter if user.garmin else None
-                created_path = create_weight_fit_file(
-                    chunk,
-                    chunk_filename,
-                    filter_config=filter_config
-                )
+            garmin_client = None
+            reported_pages = 0
+            last_report = 0.0
 
-                if not created_path:
-                    upload_results['failed'] += 1
-                    upload_results['failed_chunks'].append({
-                        'chunk': idx,
-                        'filename': str(chunk_filename),
-                        'error': 'Failed to generate FIT file',
-                        'records': len(chunk)
-                    })
-                    continue
-
-                # 上传到 Garmin
-                yield SyncProgress(
-                    stage="uploading",
-                    current=60 + (idx * 30 // total_chunks),
-                    total=100,
-                    message=f"⬆️ 上传批次 {idx}/{total_chunks} 到 Garmin...",
-                    timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                    username=username,
-                    details={"chunk": idx, "total_chunks": total_chunks}
-                )
-
-                status = garmin_client.upload_fit(chunk_filename)
-
-                if status == "SUCCESS":
-                    upload_results['success'] += 1
+            pipeline.start()
+            try:
+                while True:
+                    if self._should_stop:
+                        yield SyncProgress(
+                            stage="stopped",
+                            current=0,
+                            total=100,
+                            message="⏸️ 同步已停止",
+                            timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
+                            username=username
+                        )
+                        return
+
+                    item = pipeline.next_chunk()
+
+                    # 获取阶段进度（最多每秒一次）
+                    now = time.monotonic()
+                    if pipeline.pages != reported_pages and (
+                        item is not None or now - last_report >= 1.0
+                    ):
+                        reported_pages = pipeline.pages
+                        last_report = now
+                        yield SyncProgress(
+                            stage="fetching",
+                            current=40,
+                            total=100,
+                            message=f"📥 已获取 {pipeline.fetched_records} 条体重数据（{reported_pages} 页）",
+                            timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
+                            username=username,
+                            details={
+                                "pages": reported_pages,
+                                "total_weights": pipeline.fetched_records,
+                                "pending_weights": pipeline.pending_records,
+                                "retries": xiaomi_client.retry_count
+                            }
+                        )
+
+                    if item is None:
+                        continue
+                    if item is SyncPipeline.DONE:
+                        break
+
+                    idx = item.index
+                    current = 60 + 35 * idx // (idx + 1)
+
+                    if item.fit is None:
+                        upload_results['failed'] += 1
+                        CHUNKS.inc(user=username, status="failed")
+                        upload_results['failed_chunks'].append({
+                            'chunk': idx,
+                            'filename': None,
+                            'error': item.error,
+                            'records': len(item.records)
+                        })
+                        continue
+
+                    chunk_filename = chunk_name(idx)
                     yield SyncProgress(
-                        stage="uploading",
-                        current=60 + ((idx + 1) * 30 // total_chunks),
+                        stage="generating",
+                        current=current,
                         total=100,
-                        message=f"✅ 批次 {idx}/{total_chunks} 上传成功",
+                        message=f"📝 已生成 FIT 文件: 批次 {idx}",
                         timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
                         username=username,
-                        details={"chunk": idx, "status": status}
+                        details={
+                            "chunk": idx,
+                            "records": len(item.records),
+                            "filename": chunk_filename,
+                            "size": len(item.fit)
+                        }
                     )
-                elif status == "DUPLICATE":
-                    upload_results['duplicate'] += 1
+
+                    # 第一个批次就绪时再登录 Garmin，没有新数据时无需登录
+                    if garmin_client is None:
+                        with timer.span("garmin_login"):
+                            garmin_client = yield from self._login_garmin(user, input_callback)
+                        if garmin_client is None:
+                            TOKEN_REFRESH_FAILURES.inc(service="garmin")
+                            yield SyncProgress(
+                                stage="error",
+                                current=0,
+                                total=100,
+                                message="❌ Garmin 登录失败",
+                                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
+                                username=username
+                            )
+                            return
+
+                    # 上传到 Garmin
                     yield SyncProgress(
                         stage="uploading",
-                        current=60 + ((idx + 1) * 30 // total_chunks),
+                        current=current,
                         total=100,
-                        message=f"ℹ️ 批次 {idx}/{total_chunks} 数据已存在",
+                        message=f"⬆️ 上传批次 {idx} 到 Garmin...",
                         timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
                         username=username,
-                        details={"chunk": idx, "status": status}
+                        details={"chunk": idx}
                     )
-                else:
-                    upload_results['failed'] += 1
-                    upload_results['failed_chunks'].append({
-                        'chunk': idx,
-                        'filename': str(chunk_filename),
-                        'error': status,
-                        'records': len(chunk)
-                    })
+
+                    with timer.span("garmin_upload", records=len(item.records), bytes_out=len(item.fit)) as span:
+                        status = garmin_client.upload_fit_bytes(item.fit, chunk_filename)
+
+                    if status in ("SUCCESS", "DUPLICATE"):
+                        self.upload_ledger.mark_uploaded(username, item.records)
+
+                    if status == "SUCCESS":
+                        upload_results['success'] += 1
+                        CHUNKS.inc(user=username, status="success")
+                        message = f"✅ 批次 {idx} 上传成功"
+                    elif status == "DUPLICATE":
+                        upload_results['duplicate'] += 1
+                        CHUNKS.inc(user=username, status="duplicate")
+                        message = f"ℹ️ 批次 {idx} 数据已存在"
+                    else:
+                        upload_results['failed'] += 1
+                        CHUNKS.inc(user=username, status="failed")
+                        upload_results['failed_chunks'].append({
+                            'chunk': idx,
+                            'filename': chunk_filename,
+                            'error': status,
+                            'records': len(item.records)
+                        })
+                        message = f"❌ 批次 {idx} 上传失败: {status}"
+
                     yield SyncProgress(
                         stage="uploading",
-                        current=60 + ((idx + 1) * 30 // total_chunks),
+                        current=current,
                         total=100,
-                        message=f"❌ 批次 {idx}/{total_chunks} 上传失败: {status}",
+                        message=message,
                         timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
                         username=username,
-                        details={"chunk": idx, "status": status}
+                        details={"chunk": idx, "status": status, "seconds": round(span.seconds, 3)}
                     )
+            finally:
+                pipeline.stop()
 
-            # 完成
-            self.config_mgr.update_last_sync(username)
-
-            if upload_results['failed'] == 0:
+            if pipeline.error:
                 yield SyncProgress(
-                    stage="completed",
-                    current=100,
+                    stage="error",
+                    current=0,
                     total=100,
-                    message=f"✅ 同步完成！成功 {upload_results['success']} 个批次",
+                    message=f"❌ 获取体重数据失败: {str(pipeline.error)}",
                     timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
                     username=username,
-                    details=upload_results
+                    details={
+                        "retries": xiaomi_client.retry_count,
+                        "timings": timer.summary(),
+                        "duration": round(timer.elapsed(), 3)
+                    }
                 )
-            else:
+                return
+
+            RECORDS_FETCHED.inc(pipeline.fetched_records, user=username)
+            RECORDS_PENDING.inc(pipeline.pending_records, user=username)
+            upload_results['total_weights'] = pipeline.fetched_records
+            upload_results['stored_weights'] = fetch_stats["stored"]
+            upload_results['pending_weights'] = pipeline.pending_records
+            upload_results['retries'] = xiaomi_client.retry_count
+            upload_results['timings'] = timer.summary()
+            upload_results['duration'] = round(timer.elapsed(), 3)
+            if garmin_client is not None:
+                # 上传会话按 Garmin 域名共享，统计值为该会话的累计值
+                upload_results['connections'] = next(
+                    (c for c in get_upload_connection_stats()
+                     if c["domain"] == garmin_client._client.domain),
+                    None
+                )
+
+            if pipeline.fetched_records == 0 and not cursor:
                 yield SyncProgress(
-                    stage="completed",
-                    current=100,
+                    stage="error",
+                    current=0,
                     total=100,
-                    message=f"⚠️ 同步完成，但有 {upload_results['failed']} 个批次失败",
+                    message="❌ 未获取到任何体重数据",
                     timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
-                    username=username,
-                    details=upload_results
+                    username=username
                 )
+                return
+
+            # 完成
+            self.config_mgr.update_last_sync(username)
+
+            if upload_results['failed'] == 0:
+                # 全部成功才推进增量游标
+                self.state_mgr.update_cursor(
+                    username,
+                    [pipeline.latest_record] if pipeline.latest_record else [],
+                    next_key=xiaomi_client.fitness_next_key
+                )
+
+            if pipeline.fetched_records == 0:
+                message = "✅ 没有新的体重数据，无需同步"
+            elif pipeline.pending_records == 0:
+                message = "✅ 所有数据均已同步到 Garmin，无需上传"
+            elif upload_results['failed'] == 0:
+                message = f"✅ 同步完成！成功 {upload_results['success']} 个批次"
+            else:
+                message = f"⚠️ 同步完成，但有 {upload_results['failed']} 个批次失败"
+
+            yield SyncProgress(
+                stage="completed",
+                current=100,
+                total=100,
+                message=message,
+                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
+                username=username,
+                details=upload_results
+            )
 
         except Exception as e:
             logger.exception(f"同步失败: {e}")
@@ -511,9 +710,232 @@ class SyncOrchestrator:
                 total=100,
                 message=f"❌ 同步失败: {str(e)}",
                 timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
+                username=username,
+                details={"timings": timer.summary(), "duration": round(timer.elapsed(), 3)}
+            )
+
+    def _iter_weight_pages(self, xiaomi_client: XiaomiClient, model: str, cursor: Optional[Dict[str, Any]]):
+        """
+        逐页获取体重记录：优先使用设备接口，没有数据时回退到健康数据接口
+
+        Yields:
+            List[Dict]: 每页解析后的体重记录
+        """
+        has_data = False
+        pages = 0
+        try:
+            for weights in xiaomi_client.iter_model_weight_pages(
+                model,
+                since=cursor.get("create_time") if cursor else None
+            ):
+                pages += 1
+                has_data = has_data or bool(weights)
+                yield weights
+        except (XiaomiAPIError, XiaomiRequestError) as e:
+            # 设备接口不可用（如型号不支持、4xx）时回退；重试耗尽的临时错误直接抛出，
+            # 已获取部分数据时也不能回退，否则数据不完整
+            if pages or is_retryable_error(e):
+                raise
+            logger.warning(f"设备接口获取失败，改用健康数据接口: {e}")
+
+        if has_data:
+            return
+
+        start_time = cursor["time"] + 1 if cursor and cursor.get("time") else 1
+        for data_list in xiaomi_client.iter_fitness_data_pages(
+            key="weight",
+            start_time=start_time,
+            next_key=cursor.get("next_key") if cursor else None
+        ):
+            yield unmarshal_fitness_data(data_list)
+
+    def _login_xiaomi(self, xiaomi_client: XiaomiClient, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Token 登录小米；会话缓存未过期时直接复用，不请求 serviceLogin
+
+        Returns:
+            新的 Token 数据；复用缓存会话时返回 None
+        """
+        return self.xiaomi_sessions.login(
+            xiaomi_client, username,
+            on_token=lambda token_data: self.config_mgr.update_user_token(username, token_data))
+
+    def _login_garmin(self, user: UserModel, input_callback=None):
+        """
+        登录 Garmin（生成器，过程中产出进度）
+
+        Returns:
+            GarminClient: 登录成功的客户端，失败时返回 None
+        """
+        username = user.username
+
+        garmin_fingerprint = (user.garmin.email, user.garmin.password, user.garmin.domain)
+        garmin_client = self._get_warm_session("garmin", username, garmin_fingerprint)
+        if garmin_client is not None:
+            logger.info(f"用户 {username} 复用已登录的 Garmin 会话")
+            return garmin_client
+
+        yield SyncProgress(
+            stage="uploading",
+            current=60,
+            total=100,
+            message="🏃 正在登录 Garmin...",
+            timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
+            username=username
+        )
+
+        # 获取可写的会话目录（修复打包后的只读文件系统问题）
+        session_dir = get_session_dir(
+            email=user.garmin.email,
+            custom_base=getattr(self.config_mgr, 'custom_data_dir', None)
+        )
+
+        garmin_client = GarminClient(
+            email=user.garmin.email,
+            password=user.garmin.password,
+            auth_domain=user.garmin.domain,
+            session_dir=str(session_dir),  # 关键：传入可写路径
+            limiter=self.garmin_limiter
+        )
+
+        # 登录 Garmin - 根据是否有 input_callback 选择登录方法
+        if input_callback:
+            # UI 模式：使用 login_for_ui，支持 MFA 对话框
+            yield SyncProgress(
+                stage="uploading",
+                current=60,
+                total=100,
+                message="🏃 正在登录 Garmin（如启用了两步验证，请输入验证码）...",
+                timestamp=datetime.datetime.now().strftime("%H:%M:%S"),
                 username=username
             )
 
+            # 通过 input_callback 获取 MFA 验证码
+            def get_mfa_code():
+                logger.info(f"[DEBUG] get_mfa_code 被调用，正在请求用户输入...")
+                mfa_result = input_callback({
+                    "action": "garmin_mfa",
+                    "username": username,
+                    "email": user.garmin.email
+                })
+                logger.info(f"[DEBUG] 收到 MFA 结果: {mfa_result}")
+                return mfa_result.get("mfa_code", "")
+
+            login_success = garmin_client.login_for_ui(get_mfa_code)
+        else:
+            # CLI 模式：使用原有 login 方法
+            login_success = garmin_client.login()
+
+        if not login_success:
+            return None
+        self._put_warm_session("garmin", username, garmin_fingerprint, garmin_client)
+        return garmin_client
+
+    def sync_users(
+        self,
+        usernames: Optional[Iterable[str]] = None,
+        max_workers: int = 4,
+        chunk_size: int = 500,
+        full: bool = False,
+        progress_callback: Optional[Callable[[SyncProgress], None]] = None,
+        archive_fit: bool = False
+    ) -> List[SyncResult]:
+        """
+        并行同步多个用户（非交互模式）
+
+        Args:
+            usernames: 要同步的用户名，None 表示配置中的全部用户
+            max_workers: 工作线程数
+            chunk_size: 分块大小
+            full: 是否忽略增量游标
+            progress_callback: 进度回调（在工作线程中调用）
+            archive_fit: 是否将生成的 FIT 文件另存到输出目录
+
+        Returns:
+            List[SyncResult]: 每个用户的同步结果，顺序与 usernames 一致
+        """
+        if usernames is None:
+            usernames = [u.username for u in self.list_users() if u.username]
+        usernames = list(usernames)
+        if not usernames:
+            return []
+
+        self._should_stop = False
+        results: Dict[str, SyncResult] = {}
+        workers = max(1, min(max_workers, len(usernames)))
+        logger.info(f"开始并行同步 {len(usernames)} 个用户，工作线程数: {workers}")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync") as executor:
+            futures = {
+                executor.submit(
+                    self._run_user, name, chunk_size, full, progress_callback, archive_fit
+                ): name
+                for name in usernames
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.exception(f"用户 {name} 同步异常: {e}")
+                    results[name] = SyncResult(username=name, success=False, error_message=str(e))
+
+        return [results[name] for name in usernames]
+
+    def _run_user(
+        self,
+        username: str,
+        chunk_size: int,
+        full: bool,
+        progress_callback: Optional[Callable[[SyncProgress], None]],
+        archive_fit: bool = False
+    ) -> SyncResult:
+        """执行单个用户的同步并汇总为 SyncResult"""
+        last_progress = None
+        total_records = 0
+
+        for progress in self._sync_user_batched(
+                username, chunk_size, None, full, archive_fit):
+            last_progress = progress
+            if progress.details and "total_weights" in progress.details:
+                total_records = progress.details["total_weights"]
+            if progress_callback:
+                progress_callback(progress)
+
+        if last_progress is None:
+            return SyncResult(username=username, success=False, error_message="未返回任何进度")
+
+        details = last_progress.details or {}
+        failed = details.get("failed", 0)
+        success = last_progress.stage == "completed" and failed == 0
+
+        result = SyncResult(
+            username=username,
+            success=success,
+            total_records=total_records,
+            stored_records=details.get("stored_weights", 0),
+            pending_records=details.get("pending_weights", 0),
+            uploaded_chunks=details.get("success", 0),
+            failed_chunks=failed,
+            duplicate_chunks=details.get("duplicate", 0),
+            failed_details=details.get("failed_chunks", []),
+            error_message=None if success else last_progress.message,
+            retries=details.get("retries", 0),
+            duration=details.get("duration", 0.0),
+            timings=details.get("timings", {})
+        )
+
+        record_sync_run(username, success, result.duration)
+        return result
+
+    def get_limiter_stats(self) -> List[Dict[str, Any]]:
+        """获取各服务的限流统计"""
+        return [self.xiaomi_limiter.get_stats(), self.garmin_limiter.get_stats()]
+
+    def get_connection_stats(self) -> List[Dict[str, Any]]:
+        """获取 Garmin 上传连接复用统计（按域名）"""
+        return get_upload_connection_stats()
+
     def stop_sync(self):
         """停止同步"""
         self._should_stop = True
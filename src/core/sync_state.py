@@ -0,0 +1,99 @@
+"""
+同步状态管理
+记录每个用户的增量同步游标（高水位线），使后续同步只拉取新数据
+"""
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SyncStateManager:
+    """
+    按用户持久化的同步游标
+
+    游标格式:
+        {
+            "time": 最近一条已同步记录的时间戳（秒，对应新 API 的 time）,
+            "create_time": 同上（毫秒，对应旧 API 的 createTime）,
+            "next_key": 分页未完成时下次继续的 next_key,
+            "updated_at": 游标更新时间
+        }
+    """
+
+    def __init__(self, state_file: str = "data/sync_state.json"):
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def _load_state(self) -> Dict[str, Any]:
+        """加载状态文件"""
+        if not self.state_file.exists():
+            return {"users": {}}
+
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data.setdefault("users", {})
+            return data
+        except Exception as e:
+            logger.error(f"加载同步状态失败，将执行全量同步: {e}")
+            return {"users": {}}
+
+    def _save_state(self):
+        """保存状态文件"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=4, ensure_ascii=False)
+
+    def get_cursor(self, username: str) -> Optional[Dict[str, Any]]:
+        """获取用户的同步游标，不存在时返回 None"""
+        return self._state["users"].get(username)
+
+    def update_cursor(
+        self,
+        username: str,
+        weights: List[Dict[str, Any]],
+        next_key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        根据本次成功同步的记录推进游标
+
+        Args:
+            username: 用户名
+            weights: 本次同步的体重记录（需包含 Timestamp，单位秒）
+            next_key: 分页未完成时返回的 next_key；存在时不推进时间，下次从该位置继续
+
+        Returns:
+            更新后的游标
+        """
+        timestamps = [float(w['Timestamp']) for w in weights if w.get('Timestamp')]
+
+        with self._lock:
+            cursor = dict(self.get_cursor(username) or {})
+
+            if timestamps and not next_key:
+                latest = max(timestamps)
+                if latest > cursor.get("time", 0):
+                    cursor["time"] = int(latest)
+                    cursor["create_time"] = int(round(latest * 1000))
+
+            cursor["next_key"] = next_key
+            cursor["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            self._state["users"][username] = cursor
+            try:
+                self._save_state()
+            except Exception as e:
+                logger.error(f"保存同步状态失败: {e}")
+        return cursor
+
+    def reset_cursor(self, username: str):
+        """清除用户游标，下次执行全量同步"""
+        with self._lock:
+            if self._state["users"].pop(username, None) is not None:
+                self._save_state()
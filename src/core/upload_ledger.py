@@ -0,0 +1,155 @@
+"""
+上传台账
+记录已被 Garmin 接受的体重记录，避免每次同步重复生成和上传全部历史数据
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+# 参与内容哈希的字段（即写入 FIT 文件的字段）
+HASH_FIELDS = (
+    "Weight",
+    "BMI",
+    "BodyFat",
+    "BodyWater",
+    "BoneMass",
+    "MetabolicAge",
+    "MuscleMass",
+    "VisceralFat",
+    "BasalMetabolism",
+)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    username     TEXT NOT NULL,
+    timestamp    REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    uploaded_at  TEXT NOT NULL,
+    PRIMARY KEY (username, timestamp)
+) WITHOUT ROWID;
+"""
+
+
+def record_hash(weight: Dict[str, Any]) -> str:
+    """计算单条记录的内容哈希（时间戳 + FIT 字段）"""
+    payload = [weight.get('Timestamp')] + [weight.get(f) for f in HASH_FIELDS]
+    return hashlib.sha1(
+        json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+
+
+class UploadLedger:
+    """
+    已上传记录台账
+
+    以 (username, Timestamp) 为主键保存内容哈希。同一时间戳的记录内容变化后
+    哈希不同，会被视为新记录重新上传。
+    """
+
+    def __init__(self, db_file: str = "data/weights.db"):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def filter_new(self, username: str, weights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        过滤出尚未上传（或内容已变化）的记录
+
+        Args:
+            username: 用户名
+            weights: 体重记录列表
+
+        Returns:
+            List[Dict]: 需要上传的记录，保持原有顺序
+        """
+        if not weights:
+            return []
+
+        # 只查询本批记录的时间范围（走主键索引），分页调用时无需加载全部台账
+        timestamps = [float(w['Timestamp']) for w in weights if w.get('Timestamp') is not None]
+        if not timestamps:
+            return list(weights)
+
+        with self._lock:
+            uploaded = dict(self._conn.execute(
+                """
+                SELECT timestamp, content_hash FROM uploads
+                WHERE username = ? AND timestamp BETWEEN ? AND ?
+                """,
+                (username, min(timestamps), max(timestamps))
+            ).fetchall())
+
+        if not uploaded:
+            return list(weights)
+
+        new_weights = []
+        for w in weights:
+            ts = w.get('Timestamp')
+            if ts is None or uploaded.get(float(ts)) != record_hash(w):
+                new_weights.append(w)
+
+        logger.debug(
+            f"用户 {username}: {len(weights)} 条记录中 {len(new_weights)} 条尚未上传")
+        return new_weights
+
+    def mark_uploaded(self, username: str, weights: List[Dict[str, Any]]) -> int:
+        """
+        记录已被 Garmin 接受的记录（上传成功或判定为重复）
+
+        Returns:
+            int: 写入台账的记录数
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (username, float(w['Timestamp']), record_hash(w), now)
+            for w in weights if w.get('Timestamp') is not None
+        ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO uploads (username, timestamp, content_hash, uploaded_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (username, timestamp) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    uploaded_at = excluded.uploaded_at
+                """,
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def count(self, username: str) -> int:
+        """获取用户已上传记录数"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM uploads WHERE username = ?", (username,)
+            ).fetchone()
+        return row[0]
+
+    def reset(self, username: str):
+        """清空用户台账，下次同步将重新上传全部记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE username = ?", (username,))
+            self._conn.commit()
@@ -0,0 +1,211 @@
+"""
+本地体重数据存储
+基于 SQLite，按 (用户, 时间戳) 建立索引，支持增量写入与按时间范围查询
+"""
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from xiaomi.models import WeightRecord, as_dict
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS weights (
+    username  TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    weight    REAL,
+    data      TEXT NOT NULL,
+    PRIMARY KEY (username, timestamp)
+) WITHOUT ROWID;
+"""
+
+
+class WeightStore:
+    """
+    体重记录存储
+
+    每条记录以 (username, Timestamp) 为主键，完整数据以 JSON 保存在 data 列。
+    写入采用 upsert 语义：已存在且内容相同的记录不会产生写操作。
+    """
+
+    def __init__(self, db_file: str = "data/weights.db"):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, username: str, weights: List[Dict[str, Any]]) -> int:
+        """
+        写入体重记录（新增或更新）
+
+        Args:
+            username: 用户名
+            weights: unmarshal_fitness_data / unmarshal_scale_data 返回的 WeightRecord（或同结构的字典）
+
+        Returns:
+            int: 实际新增或变更的记录数
+        """
+        rows = []
+        for w in weights:
+            ts = w.get('Timestamp')
+            if ts is None:
+                continue
+            rows.append((
+                username,
+                float(ts),
+                w.get('Weight'),
+                json.dumps(as_dict(w), ensure_ascii=False, sort_keys=True),
+            ))
+
+        if not rows:
+            return 0
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """
+                INSERT INTO weights (username, timestamp, weight, data)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (username, timestamp) DO UPDATE SET
+                    weight = excluded.weight,
+                    data = excluded.data
+                WHERE weights.data != excluded.data
+                """,
+                rows
+            )
+            self._conn.commit()
+            changed = self._conn.total_changes - before
+
+        logger.debug(f"用户 {username} 写入 {changed}/{len(rows)} 条体重记录")
+        return changed
+
+    def iter_weights(
+        self,
+        username: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        newest_first: bool = True,
+        limit: Optional[int] = None,
+        batch_size: int = 500
+    ) -> Iterator[WeightRecord]:
+        """
+        按时间范围查询体重记录
+
+        结果按 batch_size 分批从游标读取，内存中最多保留一批记录。
+
+        Args:
+            username: 用户名
+            start: 起始时间戳（秒，包含）
+            end: 结束时间戳（秒，包含）
+            newest_first: 是否按时间倒序
+            limit: 最多返回条数
+            batch_size: 每次从数据库读取的行数
+
+        Yields:
+            WeightRecord: 体重记录
+        """
+        sql = "SELECT data FROM weights WHERE username = ?"
+        params: List[Any] = [username]
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(float(start))
+        if end is not None:
+            sql += " AND timestamp <= ?"
+            params.append(float(end))
+        sql += " ORDER BY timestamp DESC" if newest_first else " ORDER BY timestamp ASC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for (data,) in rows:
+                    yield WeightRecord.from_dict(json.loads(data))
+        finally:
+            cursor.close()
+
+    def count(self, username: str) -> int:
+        """获取用户记录总数"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM weights WHERE username = ?", (username,)
+            ).fetchone()
+        return row[0]
+
+    def latest_timestamp(self, username: str) -> Optional[float]:
+        """获取用户最新一条记录的时间戳"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(timestamp) FROM weights WHERE username = ?", (username,)
+            ).fetchone()
+        return row[0]
+
+    def get_statistics(self, username: str) -> Optional[Dict[str, Any]]:
+        """
+        获取体重统计（全部历史）
+
+        Returns:
+            Dict: count / latest / average / min / max，无数据时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT COUNT(weight), AVG(weight), MIN(weight), MAX(weight)
+                FROM weights WHERE username = ? AND weight > 0
+                """,
+                (username,)
+            ).fetchone()
+            latest = self._conn.execute(
+                """
+                SELECT weight FROM weights
+                WHERE username = ? AND weight > 0
+                ORDER BY timestamp DESC LIMIT 1
+                """,
+                (username,)
+            ).fetchone()
+
+        if not row or not row[0]:
+            return None
+
+        return {
+            "count": row[0],
+            "latest": latest[0] if latest else None,
+            "average": row[1],
+            "min": row[2],
+            "max": row[3],
+        }
+
+    def export_json(self, username: str, output_file: str) -> int:
+        """
+        导出用户全部记录为 JSON 文件（最新的在前）
+
+        Returns:
+            int: 导出的记录数
+        """
+        weights = [w.to_dict() for w in self.iter_weights(username)]
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(weights, f, indent=2, ensure_ascii=False)
+        return len(weights)
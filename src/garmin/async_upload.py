@@ -0,0 +1,189 @@
+"""
+Concurrent FIT uploads to Garmin Connect with asyncio/aiohttp.
+
+Login stays with the blocking GarminClient (garth); only the upload requests
+run on the event loop. Uploads are bounded by a global semaphore shared by all
+accounts and a per-account semaphore, and report the same status strings as
+GarminClient.upload_fit_bytes.
+
+This is an opt-in API for callers that already hold a batch of ready payloads.
+SyncOrchestrator and main.py keep the blocking uploads: their chunks stream out
+of SyncPipeline one at a time, each followed by a ledger write and a progress
+update, and uploads of different users already overlap on the sync_users
+threads over the shared keep-alive pool (GarminClient.upload_fit_bytes).
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Ensure we can import from the parent package
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from garmin.client import GarminClient, check_upload_format, classify_upload_response
+from utils.metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GLOBAL_UPLOADS = 8
+DEFAULT_ACCOUNT_UPLOADS = 2
+DEFAULT_TIMEOUT = 120
+
+
+def _require_aiohttp():
+    if aiohttp is None:
+        raise ImportError("Async Garmin uploads require aiohttp (pip install aiohttp)")
+
+
+def create_session(pool_size: int = DEFAULT_GLOBAL_UPLOADS, timeout: int = DEFAULT_TIMEOUT):
+    """
+    Create an aiohttp session to share between AsyncGarminUploader instances.
+    Must be called with a running event loop.
+    """
+    _require_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=pool_size),
+        cookie_jar=aiohttp.DummyCookieJar(),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+class AsyncGarminUploader:
+    """
+    Async upload path for one logged-in GarminClient.
+
+    Args:
+        client: A GarminClient on which login() succeeded.
+        session: Shared aiohttp session (see create_session).
+        global_semaphore: asyncio.Semaphore shared by all uploaders to bound
+                          total concurrent uploads.
+        max_concurrent: Concurrent uploads allowed for this account.
+        limiter: Optional async context manager (e.g.
+                 utils.rate_limit.AsyncServiceLimiter) entered around each upload.
+    """
+
+    def __init__(
+        self,
+        client: GarminClient,
+        session,
+        global_semaphore: Optional[asyncio.Semaphore] = None,
+        max_concurrent: int = DEFAULT_ACCOUNT_UPLOADS,
+        limiter=None
+    ):
+        _require_aiohttp()
+        self.client = client
+        self.session = session
+        self.global_semaphore = global_semaphore
+        self.account_semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self.limiter = limiter
+
+    async def upload_fit_bytes(self, data: Union[bytes, memoryview], filename: str) -> str:
+        """
+        Upload an in-memory FIT payload.
+
+        Returns:
+            str: "SUCCESS", "DUPLICATE", "ERROR_<status>", "UNSUPPORTED_FORMAT"
+                 or "UPLOAD_EXCEPTION", same as GarminClient.upload_fit_bytes.
+        """
+        file_base_name = check_upload_format(filename)
+        if file_base_name is None:
+            return "UNSUPPORTED_FORMAT"
+
+        async with self.account_semaphore:
+            if self.global_semaphore is None:
+                return await self._upload(data, file_base_name)
+            async with self.global_semaphore:
+                return await self._upload(data, file_base_name)
+
+    async def _upload(self, data, file_base_name):
+        try:
+            logger.info(f"Uploading {file_base_name} to Garmin Connect...")
+            payload = bytes(data)
+            for attempt in range(2):
+                # upload_target may refresh the OAuth2 token over blocking HTTP
+                upload_url, headers = await asyncio.to_thread(self.client.upload_target)
+
+                # A FormData can only be sent once
+                form = aiohttp.FormData()
+                form.add_field('file', payload, filename=file_base_name,
+                               content_type='application/octet-stream')
+
+                if self.limiter is None:
+                    status_code, text = await self._post(upload_url, headers, form)
+                else:
+                    async with self.limiter:
+                        status_code, text = await self._post(upload_url, headers, form)
+
+                # Token rejected before its expiry: refresh it and retry once
+                if status_code != 401 or attempt or not await asyncio.to_thread(
+                        self.client.refresh_rejected_token):
+                    break
+                logger.warning(f"Garmin rejected the token, retrying upload of {file_base_name}")
+
+            return classify_upload_response(status_code, text, file_base_name)
+
+        except Exception as e:
+            logger.error(f"Error during FIT upload: {e}")
+            return "UPLOAD_EXCEPTION"
+
+    async def _post(self, upload_url, headers, form):
+        started = time.perf_counter()
+        try:
+            async with self.session.post(upload_url, headers=headers, data=form) as resp:
+                result = resp.status, await resp.text()
+        except Exception:
+            observe_request("garmin", "upload", "error", time.perf_counter() - started)
+            raise
+        observe_request("garmin", "upload", result[0], time.perf_counter() - started)
+        return result
+
+    async def upload_many(self, uploads: Iterable[Tuple[str, bytes]]) -> List[str]:
+        """
+        Upload several (filename, data) payloads concurrently.
+
+        Returns:
+            One status per upload, in input order.
+        """
+        return await asyncio.gather(*(
+            self.upload_fit_bytes(data, filename) for filename, data in uploads
+        ))
+
+
+def upload_concurrently(
+    jobs: Sequence[Tuple[GarminClient, str, bytes]],
+    max_global: int = DEFAULT_GLOBAL_UPLOADS,
+    max_per_account: int = DEFAULT_ACCOUNT_UPLOADS
+) -> List[str]:
+    """
+    Blocking helper: run (client, filename, data) uploads on a new event loop.
+
+    Args:
+        jobs: Uploads for one or more logged-in GarminClients.
+        max_global: Concurrent uploads across all accounts.
+        max_per_account: Concurrent uploads per Garmin account.
+
+    Returns:
+        One status per job, in input order.
+    """
+    async def run():
+        global_semaphore = asyncio.Semaphore(max(1, max_global))
+        uploaders = {}
+        async with create_session(pool_size=max_global) as session:
+            tasks = []
+            for client, filename, data in jobs:
+                uploader = uploaders.get(id(client))
+                if uploader is None:
+                    uploader = AsyncGarminUploader(
+                        client, session, global_semaphore, max_concurrent=max_per_account)
+                    uploaders[id(client)] = uploader
+                tasks.append(uploader.upload_fit_bytes(data, filename))
+            return await asyncio.gather(*tasks)
+
+    return asyncio.run(run())
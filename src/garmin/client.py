@@ -3,16 +3,22 @@ import logging
 import os
 import sys
 import json
+import threading
+import time
+from contextlib import nullcontext
 from enum import Enum, auto
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 import requests
-
-from garth.http import Client
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 # Ensure we can import from the parent package
 sys.path.insert(0, str(Path(__file__).parent.parent))
+from garmin.session import GarminSessionManager, garmin_domain, session_manager
 from garmin.url_dict import GARMIN_URL_DICT
+from utils.metrics import observe_request
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +27,172 @@ class ActivityUploadFormat(Enum):
     GPX = auto()
     TCX = auto()
 
+# Upload sessions shared by all GarminClient instances, keyed by Garmin domain
+# (garmin.cn / garmin.com), so chunks and users reuse the same TLS connections.
+DEFAULT_UPLOAD_POOL_SIZE = 10
+
+_upload_sessions: Dict[str, requests.Session] = {}
+_upload_sessions_lock = threading.Lock()
+_upload_pool_size = DEFAULT_UPLOAD_POOL_SIZE
+_upload_keep_alive = True
+
+
+def configure_upload_pool(pool_size: int = DEFAULT_UPLOAD_POOL_SIZE, keep_alive: bool = True):
+    """
+    Configure the shared upload sessions.
+
+    Args:
+        pool_size: Max connections kept open per Garmin host.
+        keep_alive: Reuse connections between uploads. When False every upload
+                    sends "Connection: close" (the pre-pooling behaviour).
+
+    Existing sessions are closed; new ones are created on the next upload.
+    """
+    global _upload_pool_size, _upload_keep_alive
+    with _upload_sessions_lock:
+        _upload_pool_size = max(1, int(pool_size))
+        _upload_keep_alive = keep_alive
+        for session in _upload_sessions.values():
+            session.close()
+        _upload_sessions.clear()
+
+
+class _PooledUploadAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests sent and sockets actually opened."""
+
+    def __init__(self, pool_size: int):
+        self._stats_lock = threading.Lock()
+        self.num_requests = 0
+        self.num_connections = 0
+        super().__init__(pool_connections=4, pool_maxsize=pool_size)
+
+    def _count_connection(self):
+        with self._stats_lock:
+            self.num_connections += 1
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # urllib3 reconnects closed connection objects in place, so count connect()
+        # calls rather than connection objects.
+        on_connect = self._count_connection
+
+        class _HTTPConnection(HTTPConnection):
+            def connect(self):
+                on_connect()
+                super().connect()
+
+        class _HTTPSConnection(HTTPSConnection):
+            def connect(self):
+                on_connect()
+                super().connect()
+
+        class _HTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = _HTTPConnection
+
+        class _HTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = _HTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _HTTPConnectionPool,
+            "https": _HTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        with self._stats_lock:
+            self.num_requests += 1
+        return super().send(request, *args, **kwargs)
+
+
+def get_upload_session(domain: str) -> requests.Session:
+    """Return the pooled upload session for a Garmin domain, creating it on first use."""
+    with _upload_sessions_lock:
+        session = _upload_sessions.get(domain)
+        if session is None:
+            session = requests.Session()
+            adapter = _PooledUploadAdapter(_upload_pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Connection"] = "keep-alive" if _upload_keep_alive else "close"
+            _upload_sessions[domain] = session
+        return session
+
+
+def get_upload_connection_stats() -> List[Dict[str, int]]:
+    """
+    Connection reuse counters of the shared upload sessions.
+
+    Returns:
+        One dict per Garmin domain with `requests` (uploads sent), `connections`
+        (TCP/TLS connections opened) and `reused` (requests that did not need
+        a new connection).
+    """
+    with _upload_sessions_lock:
+        sessions = list(_upload_sessions.items())
+
+    stats = []
+    for domain, session in sessions:
+        adapter = session.get_adapter("https://")
+        stats.append({
+            "domain": domain,
+            "requests": adapter.num_requests,
+            "connections": adapter.num_connections,
+            "reused": max(0, adapter.num_requests - adapter.num_connections),
+        })
+    return stats
+
+
+def check_upload_format(filename: str) -> Optional[str]:
+    """Return the base name to upload as, or None if the format is unsupported."""
+    file_extension = Path(filename).suffix[1:].upper()
+    if file_extension not in ActivityUploadFormat.__members__:
+        logger.error(f"Unsupported file format: {file_extension}")
+        return None
+    return Path(filename).name
+
+
+def classify_upload_response(status_code: int, text: str, file_base_name: str) -> str:
+    """
+    Map an upload response to the upload status contract.
+
+    Returns:
+        "SUCCESS" (201/202), "DUPLICATE" (409) or "ERROR_<status>".
+    """
+    if status_code == 202 or status_code == 201:
+        logger.info(f"Successfully uploaded {file_base_name}")
+        return "SUCCESS"
+    elif status_code == 409:
+        logger.warning(f"Duplicate file detected on Garmin Connect: {file_base_name}")
+        return "DUPLICATE"
+    else:
+        logger.error(f"Upload failed with status {status_code}: {text}")
+        return f"ERROR_{status_code}"
+
+
 class GarminClient:
-    def __init__(self, email, password, auth_domain="CN", session_dir="data/.garth"):
+    # Overrides https://connectapi.<domain> for uploads (e.g. benchmarks/mock_servers)
+    CONNECTAPI_URL = os.environ.get("GARMIN_CONNECTAPI_URL")
+
+    def __init__(self, email, password, auth_domain="CN", session_dir="data/.garth", limiter=None,
+                 sessions: Optional[GarminSessionManager] = None):
+        """
+        Args:
+            limiter: Optional context manager (e.g. utils.rate_limit.ServiceLimiter)
+                     entered around every upload request.
+            sessions: Cache of logged-in garth clients (default: the process-wide
+                      garmin.session.session_manager).
+        """
         self.email = email
         self.password = password
         self.auth_domain = auth_domain
         self.session_dir = Path(session_dir) / email  # Segregate sessions by email
-        # Create independent Client instance to avoid conflicts with global garth singleton
+        # Create independent Client instance to avoid conflicts with global garth singleton.
+        # garth (and pydantic) is imported here rather than at module load, so runs
+        # that never log in to Garmin do not pay for it.
+        from garth.http import Client
         self._client = Client()
+        self.limiter = limiter or nullcontext()
+        self.sessions = sessions or session_manager
+        self.domain = garmin_domain(auth_domain)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/79.0.3945.88 Safari/537.36",
             "origin": GARMIN_URL_DICT.get("SSO_URL_ORIGIN", "https://sso.garmin.com"),
@@ -63,41 +227,64 @@ class GarminClient:
             bool: True if login successful, False otherwise.
         """
         try:
-            # Try to resume from saved session
-            if self.session_dir.exists() and any(self.session_dir.iterdir()):
-                logger.info(f"Attempting to resume Garmin session for {self.email} from {self.session_dir}")
-                try:
-                    self._client.load(str(self.session_dir))
-                    # Check if session is still valid by accessing username
-                    username = self._client.username
-                    logger.info(f"Garmin session resumed successfully for user: {username}")
+            with self.sessions.locked(self.email, self.domain):
+                # Reuse the process-wide client or the tokens saved on disk,
+                # refreshing the OAuth2 token locally instead of a new SSO login
+                client = self.sessions.acquire(self.email, self.domain, self.session_dir)
+                if client is not None:
+                    self._client = client
+                    logger.info(f"Garmin session resumed for {self.email}")
                     return True
-                except Exception as e:
-                    logger.warning(f"Failed to resume session: {e}. Performing fresh login.")
 
-            # Perform fresh login
-            logger.info(f"Logging in to Garmin for {self.email}...")
-            domain = "garmin.cn" if self.auth_domain and self.auth_domain.upper() == "CN" else "garmin.com"
-            self._client.configure(domain=domain)
+                # Perform fresh login
+                logger.info(f"Logging in to Garmin for {self.email}...")
+                self._client.configure(domain=self.domain)
 
-            logger.info(f"[DEBUG] 开始调用 garth login, mfa_provider={mfa_provider}")
-            self._client.login(self.email, self.password, prompt_mfa=mfa_provider)
-            logger.info(f"[DEBUG] garth login 调用完成")
+                logger.info(f"[DEBUG] 开始调用 garth login, mfa_provider={mfa_provider}")
+                self._client.login(self.email, self.password, prompt_mfa=mfa_provider)
+                logger.info(f"[DEBUG] garth login 调用完成")
 
-            # Save session
-            self.session_dir.mkdir(parents=True, exist_ok=True)
-            self._client.dump(str(self.session_dir))
-            logger.info(f"Garmin session saved to {self.session_dir}")
+                # Save session
+                self.sessions.put(self.email, self.domain, self._client, self.session_dir)
+                logger.info(f"Garmin session saved to {self.session_dir}")
 
-            # Clean up headers as required by some Garmin versions
-            if 'User-Agent' in self._client.sess.headers:
-                del self._client.sess.headers['User-Agent']
+                # Clean up headers as required by some Garmin versions
+                if 'User-Agent' in self._client.sess.headers:
+                    del self._client.sess.headers['User-Agent']
 
             return True
         except Exception as e:
             logger.error(f"Garmin login failed for {self.email}: {e}")
             return False
 
+    def upload_target(self):
+        """
+        URL and headers (with the current OAuth2 token) for an upload request.
+
+        Returns:
+            (upload_url, headers)
+        """
+        url_path = GARMIN_URL_DICT["garmin_connect_upload"]
+        base_url = self.CONNECTAPI_URL or f"https://connectapi.{self._client.domain}"
+        upload_url = f"{base_url}{url_path}"
+
+        # Refresh the token before it expires, long syncs outlive it
+        self.sessions.ensure_fresh(self.email, self.domain, self._client, self.session_dir)
+
+        # Update headers with dynamic tokens from client
+        headers = self.headers.copy()
+        headers['Authorization'] = str(self._client.oauth2_token)
+        return upload_url, headers
+
+    def refresh_rejected_token(self) -> bool:
+        """
+        Force an OAuth2 refresh after Garmin rejected the token (HTTP 401).
+
+        Returns:
+            bool: False if the token could not be refreshed.
+        """
+        return self.sessions.ensure_fresh(self.email, self.domain, self._client, self.session_dir, force=True)
+
     def upload_fit(self, fit_path: Union[str, Path]):
         """Upload FIT file to Garmin Connect."""
         fit_path = Path(fit_path)
@@ -105,42 +292,56 @@ class GarminClient:
             logger.error(f"FIT file not found: {fit_path}")
             return "FILE_NOT_FOUND"
 
-        file_base_name = fit_path.name
-        file_extension = fit_path.suffix[1:].upper()
-        
-        if file_extension not in ActivityUploadFormat.__members__:
-            logger.error(f"Unsupported file format: {file_extension}")
+        try:
+            with open(fit_path, 'rb') as f:
+                file_data = f.read()
+        except Exception as e:
+            logger.error(f"Error reading FIT file {fit_path}: {e}")
+            return "UPLOAD_EXCEPTION"
+
+        return self.upload_fit_bytes(file_data, fit_path.name)
+
+    def upload_fit_bytes(self, data: Union[bytes, memoryview], filename: str):
+        """
+        Upload an in-memory FIT payload to Garmin Connect.
+
+        Args:
+            data: FIT file contents (e.g. from garmin.fit_generator.build_weight_fit_bytes).
+            filename: File name reported to Garmin; its extension selects the format.
+
+        Returns:
+            str: "SUCCESS", "DUPLICATE", "ERROR_<status>", "UNSUPPORTED_FORMAT"
+                 or "UPLOAD_EXCEPTION", same as upload_fit.
+        """
+        file_base_name = check_upload_format(filename)
+        if file_base_name is None:
             return "UNSUPPORTED_FORMAT"
 
         try:
             logger.info(f"Uploading {file_base_name} to Garmin Connect...")
-            with open(fit_path, 'rb') as f:
-                file_data = f.read()
-            
             fields = {
-                'file': (file_base_name, file_data, 'application/octet-stream')
+                'file': (file_base_name, bytes(data), 'application/octet-stream')
             }
+            # Shared keep-alive session, one per Garmin domain
+            session = get_upload_session(self._client.domain)
+            for attempt in range(2):
+                upload_url, headers = self.upload_target()
+                with self.limiter:
+                    started = time.perf_counter()
+                    try:
+                        response = session.post(upload_url, headers=headers, files=fields)
+                    except Exception:
+                        observe_request("garmin", "upload", "error", time.perf_counter() - started)
+                        raise
+                    observe_request("garmin", "upload", response.status_code, time.perf_counter() - started)
+
+                # Token rejected before its expiry: refresh it and retry once
+                if response.status_code != 401 or attempt or not self.refresh_rejected_token():
+                    break
+                logger.warning(f"Garmin rejected the token, retrying upload of {file_base_name}")
+
+            return classify_upload_response(response.status_code, response.text, file_base_name)
 
-            url_path = GARMIN_URL_DICT["garmin_connect_upload"]
-            upload_url = f"https://connectapi.{self._client.domain}{url_path}"
-
-            # Update headers with dynamic tokens from client
-            headers = self.headers.copy()
-            headers['Authorization'] = str(self._client.oauth2_token)
-            
-            # Using requests for the upload part as in the original code
-            response = requests.post(upload_url, headers=headers, files=fields)
-            
-            if response.status_code == 202 or response.status_code == 201 :
-                logger.info(f"Successfully uploaded {file_base_name}")
-                return "SUCCESS"
-            elif response.status_code == 409:
-                logger.warning(f"Duplicate file detected on Garmin Connect: {file_base_name}")
-                return "DUPLICATE"
-            else:
-                logger.error(f"Upload failed with status {response.status_code}: {response.text}")
-                return f"ERROR_{response.status_code}"
-                
         except Exception as e:
             logger.error(f"Error during FIT upload: {e}")
             return "UPLOAD_EXCEPTION"
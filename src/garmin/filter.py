@@ -5,9 +5,13 @@ Provides filtering functionality based on various health metrics like weight,
 BMI, body fat percentage, etc.
 """
 
+import json
 import logging
 from enum import Enum
-from typing import List, Dict, Any, Optional, Union
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
+
+from garmin.weight_batch import WeightBatch, combine_masks, compare, count_true, full_mask, to_float
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -111,16 +115,66 @@ def evaluate_condition(data_point: Dict, condition: Dict) -> bool:
         return False
 
 
+def _condition_mask(batch: WeightBatch, condition: Dict):
+    """
+    Evaluate one condition for all records of `batch` at once.
+
+    Mirrors evaluate_condition: missing or non-numeric values never match, and
+    a condition that cannot be evaluated matches nothing.
+    """
+    field = condition.get("field")
+    operator = condition.get("operator")
+    value = condition.get("value")
+
+    try:
+        if field not in SUPPORTED_FIELDS:
+            raise ValueError(f"Unsupported field: {field}")
+
+        if operator == FilterOperator.BETWEEN.value:
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError(f"'between' operator requires a list of 2 values, got: {value}")
+            low, high = float(value[0]), float(value[1])
+        else:
+            low, high = float(value), None
+
+        return compare(batch.column(SUPPORTED_FIELDS[field]), operator, low, high)
+
+    except (ValueError, TypeError) as e:
+        _LOGGER.warning(f"Failed to evaluate condition {field} {operator} {value}: {e}")
+        return full_mask(len(batch), False)
+
+
+def filter_mask(batch: WeightBatch, conditions: List[Dict], logic: str = "and"):
+    """
+    Combine the condition masks of `batch` with AND / OR logic.
+
+    Returns:
+        Boolean mask (NumPy array, or list without NumPy) over batch.records.
+    """
+    mask = None
+    for i, condition in enumerate(conditions, 1):
+        condition_mask = _condition_mask(batch, condition)
+        _LOGGER.debug(
+            f"  Condition {i}: {condition.get('field')} {condition.get('operator')} "
+            f"{condition.get('value')} -> {count_true(condition_mask)}/{len(batch)} matched"
+        )
+        mask = condition_mask if mask is None else combine_masks(mask, condition_mask, logic)
+    return mask if mask is not None else full_mask(len(batch), True)
+
+
 def apply_filter(weights: List[Dict], filter_config: Dict) -> List[Dict]:
     """
     Apply filter rules to weight data.
 
+    The records are loaded into a columnar WeightBatch and every condition is
+    evaluated as one vectorized comparison (see garmin.weight_batch).
+
     Args:
-        weights: List of weight data dictionaries.
+        weights: List of WeightRecord objects or weight data dictionaries.
         filter_config: Filter configuration dict with 'enabled', 'conditions', and 'logic' keys.
 
     Returns:
-        Filtered list of weight data.
+        Filtered list of weight data, in the original order.
     """
     if not filter_config or not filter_config.get("enabled"):
         return weights
@@ -138,38 +192,18 @@ def apply_filter(weights: List[Dict], filter_config: Dict) -> List[Dict]:
         logic = "and"
 
     total_count = len(weights)
-    filtered_weights = []
 
     # Log filter details
     _LOGGER.info(f"Applying weight filter with {len(conditions)} condition(s) using '{logic.upper()}' logic")
-    for i, cond in enumerate(conditions, 1):
-        _LOGGER.debug(f"  Condition {i}: {cond['field']} {cond['operator']} {cond['value']}")
-
-    for weight_data in weights:
-        # Evaluate all conditions
-        condition_results = []
-        for condition in conditions:
-            try:
-                result = evaluate_condition(weight_data, condition)
-                condition_results.append(result)
-                _LOGGER.debug(
-                    f"  Evaluated: {condition['field']} {condition['operator']} {condition['value']} -> {result} "
-                    f"(actual value: {weight_data.get(SUPPORTED_FIELDS[condition['field']])})"
-                )
-            except Exception as e:
-                _LOGGER.warning(f"Error evaluating condition: {e}")
-                condition_results.append(False)
-
-        # Apply logic combination
-        if logic == "and":
-            passes = all(condition_results)
-        else:  # logic == "or"
-            passes = any(condition_results)
-
-        if passes:
-            filtered_weights.append(weight_data)
-
-    filtered_count = len(filtered_weights)
+
+    batch = WeightBatch(weights)
+    filtered_weights = batch.select(filter_mask(batch, conditions, logic))
+
+    _log_filter_result(total_count, len(filtered_weights))
+    return filtered_weights
+
+
+def _log_filter_result(total_count: int, filtered_count: int) -> None:
     filtered_out = total_count - filtered_count
 
     if filtered_count == 0:
@@ -182,4 +216,118 @@ def apply_filter(weights: List[Dict], filter_config: Dict) -> List[Dict]:
     else:
         _LOGGER.info(f"Filter applied: All {total_count} records passed (none filtered out)")
 
-    return filtered_weights
+
+def _threshold_test(operator: str, low: float, high: Optional[float]) -> Callable[[float], bool]:
+    """Per-value test for a pre-converted threshold (NaN never matches)."""
+    if operator == FilterOperator.EQ.value:
+        return lambda x: abs(x - low) < 0.001
+    if operator == FilterOperator.NE.value:
+        return lambda x: abs(x - low) >= 0.001
+    if operator == FilterOperator.GT.value:
+        return lambda x: x > low
+    if operator == FilterOperator.GTE.value:
+        return lambda x: x >= low
+    if operator == FilterOperator.LT.value:
+        return lambda x: x < low
+    if operator == FilterOperator.LTE.value:
+        return lambda x: x <= low
+    if operator == FilterOperator.BETWEEN.value:
+        return lambda x: low <= x <= high
+    raise ValueError(f"Unsupported operator: {operator}")
+
+
+class CompiledFilter:
+    """
+    A validated filter configuration with field keys and operators resolved
+    and thresholds converted to float. Create it with compile_filter().
+
+    Calling the object tests a single record; apply() filters a list of
+    records as a WeightBatch.
+    """
+
+    __slots__ = ("conditions", "logic", "_tests")
+
+    def __init__(self, conditions: List[Tuple[str, str, float, Optional[float]]], logic: str = "and"):
+        """
+        Args:
+            conditions: (data key, operator, value, upper bound or None) tuples.
+            logic: "and" or "or".
+        """
+        self.conditions = tuple(conditions)
+        self.logic = logic
+        self._tests = tuple(
+            (key, _threshold_test(operator, low, high)) for key, operator, low, high in self.conditions
+        )
+
+    def __call__(self, data_point) -> bool:
+        get = data_point.get
+        results = (test(to_float(get(key))) for key, test in self._tests)
+        return all(results) if self.logic == "and" else any(results)
+
+    def mask(self, batch: WeightBatch):
+        """Boolean mask over batch.records."""
+        mask = None
+        for key, operator, low, high in self.conditions:
+            condition_mask = compare(batch.column(key), operator, low, high)
+            mask = condition_mask if mask is None else combine_masks(mask, condition_mask, self.logic)
+        return mask if mask is not None else full_mask(len(batch), True)
+
+    def apply(self, weights: List[Dict]) -> List[Dict]:
+        """Filter `weights`, keeping the original records in order."""
+        batch = WeightBatch(weights)
+        filtered_weights = batch.select(self.mask(batch))
+        _log_filter_result(len(weights), len(filtered_weights))
+        return filtered_weights
+
+
+def compile_filter(filter_config: Optional[Dict]) -> Optional[CompiledFilter]:
+    """
+    Validate a filter configuration and compile it into a CompiledFilter.
+
+    Compiled filters are cached by configuration content, so every chunk and
+    every user with the same filter shares one object.
+
+    Args:
+        filter_config: Filter configuration dict with 'enabled', 'conditions', and 'logic' keys.
+
+    Returns:
+        The compiled filter, or None if no filter is configured or it is disabled.
+
+    Raises:
+        FilterConfigError: If the configuration is invalid.
+    """
+    if not filter_config or not filter_config.get("enabled"):
+        return None
+
+    try:
+        key = json.dumps(filter_config, sort_keys=True)
+    except (TypeError, ValueError):
+        return _compile(filter_config)
+    return _compile_cached(key)
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(key: str) -> CompiledFilter:
+    return _compile(json.loads(key))
+
+
+def _compile(filter_config: Dict) -> CompiledFilter:
+    from garmin.filter_config import FilterConfigValidator
+
+    FilterConfigValidator.validate(filter_config)
+
+    conditions = []
+    for condition in filter_config["conditions"]:
+        operator = condition["operator"]
+        value = condition["value"]
+        if operator == FilterOperator.BETWEEN.value:
+            low, high = float(value[0]), float(value[1])
+        else:
+            low, high = float(value), None
+        conditions.append((SUPPORTED_FIELDS[condition["field"]], operator, low, high))
+
+    compiled = CompiledFilter(conditions, filter_config.get("logic", "and"))
+    _LOGGER.info(
+        f"Weight filter compiled: {len(conditions)} condition(s) with '{compiled.logic.upper()}' logic"
+    )
+    return compiled
@@ -0,0 +1,174 @@
+"""
+Direct binary FIT encoder for weight FIT files.
+
+Writes the FIT header, one definition message for file_id and one for
+weight_scale (global message 30), followed by fixed-layout data records
+packed with precompiled `struct` formats. This avoids building a fit_tool
+message object (and its ~15 Field objects) per measurement.
+"""
+
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds between the Unix epoch and the FIT epoch (1989-12-31T00:00:00Z)
+FIT_EPOCH_OFFSET_MS = 631065600000
+
+PROTOCOL_VERSION = 0x20  # 2.0
+PROFILE_VERSION = 2160   # 21.60, same as weight_scale_message.py
+
+# FIT base types
+_ENUM = 0x00
+_UINT8 = 0x02
+_UINT16 = 0x84
+_UINT32 = 0x86
+_UINT32Z = 0x8C
+
+_INVALID = {
+    'B': 0xFF,
+    'H': 0xFFFF,
+    'I': 0xFFFFFFFF,
+}
+
+_FILE_ID_MESG_NUM = 0
+_WEIGHT_SCALE_MESG_NUM = 30
+
+_FILE_ID_LOCAL = 0
+_WEIGHT_SCALE_LOCAL = 1
+
+# file_id: (field number, struct format, base type)
+_FILE_ID_FIELDS = (
+    (3, 'I', _UINT32Z),  # serial_number
+    (4, 'I', _UINT32),   # time_created
+    (1, 'H', _UINT16),   # manufacturer
+    (2, 'H', _UINT16),   # product
+    (0, 'B', _ENUM),     # type
+)
+
+# weight_scale: (key in normalized row, field number, struct format, base type, scale)
+WEIGHT_SCALE_FIELDS = (
+    ('timestamp', 253, 'I', _UINT32, None),
+    ('weight', 0, 'H', _UINT16, 100),
+    ('percent_fat', 1, 'H', _UINT16, 100),
+    ('percent_hydration', 2, 'H', _UINT16, 100),
+    ('bone_mass', 4, 'H', _UINT16, 100),
+    ('muscle_mass', 5, 'H', _UINT16, 100),
+    ('basal_met', 7, 'H', _UINT16, 4),
+    ('bmi', 13, 'H', _UINT16, 10),
+    ('metabolic_age', 10, 'B', _UINT8, 1),
+    ('visceral_fat_rating', 11, 'B', _UINT8, 1),
+)
+
+_FILE_ID_STRUCT = struct.Struct('<B' + ''.join(f[1] for f in _FILE_ID_FIELDS))
+_WEIGHT_SCALE_STRUCT = struct.Struct('<B' + ''.join(f[2] for f in WEIGHT_SCALE_FIELDS))
+_WEIGHT_SCALE_ENCODERS = tuple(
+    (key, scale, _INVALID[fmt]) for key, _, fmt, _, scale in WEIGHT_SCALE_FIELDS
+)
+
+
+def _make_crc_table() -> Tuple[int, ...]:
+    """Byte-wise table for the FIT CRC-16 (reflected polynomial 0xA001)."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc16(data: bytes, crc: int = 0) -> int:
+    """Compute the FIT CRC-16 of `data`, continuing from `crc`."""
+    table = _CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _definition_message(local_type: int, global_num: int, fields: Iterable[Tuple[int, str, int]]) -> bytes:
+    fields = list(fields)
+    header = struct.pack('<BBBHB', 0x40 | local_type, 0, 0, global_num, len(fields))
+    body = b''.join(
+        struct.pack('<BBB', num, struct.calcsize(fmt), base_type)
+        for num, fmt, base_type in fields
+    )
+    return header + body
+
+
+_FILE_ID_DEFINITION = _definition_message(_FILE_ID_MESG_NUM, _FILE_ID_MESG_NUM, _FILE_ID_FIELDS)
+_WEIGHT_SCALE_DEFINITION = _definition_message(
+    _WEIGHT_SCALE_LOCAL,
+    _WEIGHT_SCALE_MESG_NUM,
+    ((num, fmt, base_type) for _, num, fmt, base_type, _ in WEIGHT_SCALE_FIELDS)
+)
+
+
+def encode_timestamp(timestamp_ms: int) -> int:
+    """Encode a Unix timestamp in ms the way fit_tool's timestamp field does."""
+    return round((timestamp_ms - FIT_EPOCH_OFFSET_MS) * 0.001)
+
+
+def _encode_value(value: Optional[float], scale: Optional[int], invalid: int) -> int:
+    if value is None:
+        return invalid
+    encoded = round(value * scale) if scale else int(value)
+    if encoded < 0 or encoded >= invalid:
+        return invalid
+    return encoded
+
+
+def encode_weight_fit(
+    rows: List[Dict[str, Optional[float]]],
+    time_created_ms: int,
+    manufacturer: int = 1,
+    product: int = 2429,
+    serial_number: int = 12345,
+    file_type: int = 9
+) -> bytes:
+    """
+    Encode normalized weight rows into a complete FIT file.
+
+    Args:
+        rows: One dict per measurement with 'timestamp' (Unix ms) and the
+              optional keys from WEIGHT_SCALE_FIELDS in physical units
+              (kg, %, kcal/day, ...). Missing/None values are written as
+              FIT invalid values.
+        time_created_ms: file_id.time_created as Unix timestamp in ms.
+        manufacturer, product, serial_number, file_type: file_id values
+              (defaults: Garmin Index Scale, FileType.WEIGHT).
+
+    Returns:
+        The FIT file as bytes.
+    """
+    pack = _WEIGHT_SCALE_STRUCT.pack
+    encoders = _WEIGHT_SCALE_ENCODERS[1:]
+
+    records = [
+        _FILE_ID_DEFINITION,
+        _FILE_ID_STRUCT.pack(
+            _FILE_ID_LOCAL,
+            serial_number,
+            encode_timestamp(time_created_ms),
+            manufacturer,
+            product,
+            file_type,
+        ),
+        _WEIGHT_SCALE_DEFINITION,
+    ]
+
+    for row in rows:
+        records.append(pack(
+            _WEIGHT_SCALE_LOCAL,
+            encode_timestamp(row['timestamp']),
+            *[_encode_value(row.get(key), scale, invalid) for key, scale, invalid in encoders]
+        ))
+
+    data = b''.join(records)
+
+    header = struct.pack('<BBHI4s', 14, PROTOCOL_VERSION, PROFILE_VERSION, len(data), b'.FIT')
+    header += struct.pack('<H', crc16(header))
+
+    crc = crc16(data, crc16(header))
+    return header + data + struct.pack('<H', crc)
@@ -6,13 +6,10 @@ from typing import List, Dict, Union, Optional
 import sys
 import math
 
-from fit_tool.fit_file_builder import FitFileBuilder
-from fit_tool.profile.messages.file_id_message import FileIdMessage
-from fit_tool.profile.profile_type import FileType, Manufacturer
-
 # Ensure we can import from the parent package
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from garmin.weight_scale_message import WeightScaleMessage
+from garmin.fit_encoder import encode_weight_fit
+from xiaomi.models import WeightRecord
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -23,16 +20,16 @@ def _is_nan(value) -> bool:
     except (ValueError, TypeError):
         return False
 
-def create_weight_fit_file(
-    weights: List[Dict],
-    output_filename: Union[str, Path] = "weights.fit",
-    filter_config: Optional[Dict] = None
-):
+def build_weight_fit_bytes(
+    weights: List[Union[Dict, WeightRecord]],
+    filter_config: Optional[Dict] = None,
+    use_fit_tool: bool = False
+) -> Optional[bytes]:
     """
-    Creates a FIT file containing the provided weight data.
+    Builds a FIT file containing the provided weight data in memory.
 
     Args:
-        weights: A list of dicts containing weight data. Expected keys:
+        weights: A list of WeightRecord, or dicts with the same keys:
                  - 'Date' (datetime or str) or 'Timestamp' (float/int)
                  - 'Weight' (kg)
                  - 'BMI'
@@ -43,121 +40,168 @@ def create_weight_fit_file(
                  - 'MuscleMass' (kg)
                  - 'VisceralFat' (rating)
                  - 'BasalMetabolism' (kcal)
-        output_filename: The name of the output FIT file.
-        filter_config: Optional filter configuration for filtering weight data.
+        filter_config: Optional filter configuration for filtering weight data,
+                       or a CompiledFilter from garmin.filter.compile_filter.
+        use_fit_tool: Build the file through fit_tool instead of the native
+                      encoder in garmin.fit_encoder (which also falls back to
+                      fit_tool if it fails).
+
+    Returns:
+        The FIT payload as bytes, or None if no weight data points were added.
     """
     # Apply filter if configured
     if filter_config is not None:
-        from garmin.filter_config import FilterConfigValidator
-        from garmin.filter import apply_filter
+        from garmin.filter import CompiledFilter, compile_filter
 
         try:
-            # Validate filter configuration
-            FilterConfigValidator.validate(filter_config)
+            # Validated and compiled once per distinct configuration
+            compiled = filter_config if isinstance(filter_config, CompiledFilter) else compile_filter(filter_config)
 
-            # Apply filter
-            original_count = len(weights)
-            weights = apply_filter(weights, filter_config)
+            if compiled is not None:
+                original_count = len(weights)
+                weights = compiled.apply(weights)
 
-            if len(weights) < original_count:
-                filtered_out = original_count - len(weights)
-                _LOGGER.info(
-                    f"Filter reduced records from {original_count} to {len(weights)} "
-                    f"({filtered_out} filtered out)"
-                )
+                if len(weights) < original_count:
+                    filtered_out = original_count - len(weights)
+                    _LOGGER.info(
+                        f"Filter reduced records from {original_count} to {len(weights)} "
+                        f"({filtered_out} filtered out)"
+                    )
 
         except Exception as e:
             _LOGGER.error(f"Filter error: {e}. Continuing without filter.")
             _LOGGER.info("Please check your filter configuration in users.json")
             # Continue with original data on error
 
-    builder = FitFileBuilder(auto_define=True, min_string_size=50)
+    time_created_ms = int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
+    rows = [row for row in (_to_fit_row(w) for w in weights) if row is not None]
 
-    # 1. File ID Message
-    file_id_mesg = FileIdMessage()
-    file_id_mesg.type = FileType.WEIGHT
-    file_id_mesg.manufacturer = Manufacturer.GARMIN
-    file_id_mesg.product = 2429  # Index Scale
-    file_id_mesg.serial_number = 12345
-    file_id_mesg.time_created = int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
-    builder.add(file_id_mesg)
+    if not rows:
+        _LOGGER.warning("No weight data points were added to the FIT file.")
+        return None
 
-    # 2. Add Weight Scale Messages
-    added_count = 0
-    for w in weights:
-        mesg = WeightScaleMessage()
-        
-        # Handle Timestamp
-        ts = None
-        if 'Timestamp' in w:
-            ts = float(w['Timestamp'])
-        elif 'Date' in w:
-            dt = w['Date']
-            if isinstance(dt, str):
-                try:
-                    # Try common Xiaomi format: 2026-01-01 08:53:22
-                    dt = datetime.datetime.strptime(dt, '%Y-%m-%d %H:%M:%S')
-                    dt = dt.replace(tzinfo=datetime.timezone.utc)
-                except ValueError:
-                    continue
-            if isinstance(dt, datetime.datetime):
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=datetime.timezone.utc)
-                ts = dt.timestamp()
-        
-        if ts is None:
-            continue
-            
-        # fit-tool expects milliseconds for timestamp field in some contexts, 
-        # but let's see. Library usage in generate_fit_file.py used *1000.
-        mesg.timestamp = int(ts * 1000)
+    if not use_fit_tool:
         try:
-            # Mappings from Xiaomi data structure to FIT WeightScaleMessage fields
-            if w.get('Weight') and not _is_nan(w['Weight']):
-                mesg.weight = float(w['Weight'])
-
-            if w.get('BMI') and not _is_nan(w['BMI']):
-                mesg.bmi = float(w['BMI'])
+            return encode_weight_fit(rows, time_created_ms)
+        except Exception as e:
+            _LOGGER.warning(f"Native FIT encoder failed: {e}. Falling back to fit_tool.")
+    return _build_with_fit_tool(rows, time_created_ms)
 
-            if w.get('BodyFat') and not _is_nan(w['BodyFat']):
-                mesg.percent_fat = float(w['BodyFat'])
 
-            if w.get('BodyWater') and not _is_nan(w['BodyWater']):
-                mesg.percent_hydration = float(w['BodyWater'])
+def create_weight_fit_file(
+    weights: List[Union[Dict, WeightRecord]],
+    output_filename: Union[str, Path] = "weights.fit",
+    filter_config: Optional[Dict] = None,
+    use_fit_tool: bool = False
+):
+    """
+    Creates a FIT file containing the provided weight data.
 
-            if w.get('BoneMass') and not _is_nan(w['BoneMass']):
-                mesg.bone_mass = float(w['BoneMass'])
+    Same as build_weight_fit_bytes, but writes the payload to `output_filename`
+    and returns its Path (or None if no weight data points were added).
+    """
+    fit_bytes = build_weight_fit_bytes(weights, filter_config, use_fit_tool)
+    if fit_bytes is None:
+        return None
 
-            if w.get('MetabolicAge') and not _is_nan(w['MetabolicAge']):
-                mesg.metabolic_age = int(w['MetabolicAge'])
+    # Ensure directory exists
+    output_path = Path(output_filename)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            if w.get('MuscleMass') and not _is_nan(w['MuscleMass']):
-                mesg.muscle_mass = float(w['MuscleMass'])
+    output_path.write_bytes(fit_bytes)
+    _LOGGER.info(f"Generated FIT file: {output_path}")
+    return output_path
 
-            if w.get('VisceralFat') and not _is_nan(w['VisceralFat']):
-                mesg.visceral_fat_rating = int(w['VisceralFat'])
 
-            if w.get('BasalMetabolism') and not _is_nan(w['BasalMetabolism']):
-                mesg.basal_met = float(w['BasalMetabolism'])
-        except Exception as e:
-            _LOGGER.warning(f"Failed to parse weight data: {e}. Data: {w}")
-        
-        
-        builder.add(mesg)
-        added_count += 1
+def _get_timestamp(w: Dict) -> Optional[float]:
+    """Resolve the measurement time (Unix seconds) from 'Timestamp' or 'Date'."""
+    if 'Timestamp' in w:
+        return float(w['Timestamp'])
+    if 'Date' in w:
+        dt = w['Date']
+        if isinstance(dt, str):
+            try:
+                # Try common Xiaomi format: 2026-01-01 08:53:22
+                dt = datetime.datetime.strptime(dt, '%Y-%m-%d %H:%M:%S')
+                dt = dt.replace(tzinfo=datetime.timezone.utc)
+            except ValueError:
+                return None
+        if isinstance(dt, datetime.datetime):
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=datetime.timezone.utc)
+            return dt.timestamp()
+    return None
+
+
+# Xiaomi record key -> (weight_scale field, conversion)
+_FIT_ROW_FIELDS = (
+    ('Weight', 'weight', float),
+    ('BMI', 'bmi', float),
+    ('BodyFat', 'percent_fat', float),
+    ('BodyWater', 'percent_hydration', float),
+    ('BoneMass', 'bone_mass', float),
+    ('MetabolicAge', 'metabolic_age', int),
+    ('MuscleMass', 'muscle_mass', float),
+    ('VisceralFat', 'visceral_fat_rating', int),
+    ('BasalMetabolism', 'basal_met', float),
+)
+
+
+def _to_fit_row(w: Union[Dict, WeightRecord]) -> Optional[Dict]:
+    """
+    Map a Xiaomi weight record to weight_scale field values.
 
-    if added_count == 0:
-        _LOGGER.warning("No weight data points were added to the FIT file.")
+    Returns a dict keyed like fit_encoder.WEIGHT_SCALE_FIELDS with the
+    timestamp in Unix ms, or None if the record has no usable timestamp.
+    """
+    if isinstance(w, WeightRecord):
+        # Direct attribute access; unset fields are None
+        ts = w.Timestamp
+        lookup = w.__getattribute__
+    else:
+        ts = _get_timestamp(w)
+        lookup = w.get
+    if ts is None:
         return None
 
-    fit_file = builder.build()
-    
-    # Ensure directory exists
-    output_path = Path(output_filename)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    fit_file.to_file(str(output_path))
-    _LOGGER.info(f"Generated FIT file with {added_count} records: {output_path}")
-    return output_path
+    # fit-tool expects milliseconds for the timestamp field
+    row = {'timestamp': int(float(ts) * 1000)}
+    try:
+        # Mappings from Xiaomi data structure to FIT WeightScaleMessage fields
+        for key, fit_key, convert in _FIT_ROW_FIELDS:
+            value = lookup(key)
+            if value and not _is_nan(value):
+                row[fit_key] = convert(value)
+    except Exception as e:
+        _LOGGER.warning(f"Failed to parse weight data: {e}. Data: {w}")
+
+    return row
+
 
+def _build_with_fit_tool(rows: List[Dict], time_created_ms: int) -> bytes:
+    """Build the FIT file through fit_tool's message objects (fallback path)."""
+    # fit_tool is only imported when this path is used; it is slow to load
+    from fit_tool.fit_file_builder import FitFileBuilder
+    from fit_tool.profile.messages.file_id_message import FileIdMessage
+    from fit_tool.profile.profile_type import FileType, Manufacturer
+    from garmin.weight_scale_message import WeightScaleMessage
+
+    builder = FitFileBuilder(auto_define=True, min_string_size=50)
+
+    # 1. File ID Message
+    file_id_mesg = FileIdMessage()
+    file_id_mesg.type = FileType.WEIGHT
+    file_id_mesg.manufacturer = Manufacturer.GARMIN
+    file_id_mesg.product = 2429  # Index Scale
+    file_id_mesg.serial_number = 12345
+    file_id_mesg.time_created = time_created_ms
+    builder.add(file_id_mesg)
+
+    # 2. Add Weight Scale Messages
+    for row in rows:
+        mesg = WeightScaleMessage()
+        for key, value in row.items():
+            setattr(mesg, key, value)
+        builder.add(mesg)
 
+    return builder.build().to_bytes()
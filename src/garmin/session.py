@@ -0,0 +1,197 @@
+"""
+In-process cache of logged-in garth clients.
+
+Every GarminClient used to load data/.garth/<email> from disk, validate it with
+a profile request and fall back to a full SSO login. The session manager keeps
+the loaded garth client per (email, domain) for the life of the process, checks
+the OAuth2 token's expiry locally and exchanges the OAuth1 token for a new
+OAuth2 token shortly before it expires, writing the refreshed token back to the
+session directory so the next process starts from it too.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.atomic_file import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Refresh OAuth2 tokens this many seconds before they expire, so a token never
+# runs out in the middle of a multi-chunk upload
+DEFAULT_REFRESH_MARGIN = 300
+
+OAUTH1_TOKEN_FILE = "oauth1_token.json"
+OAUTH2_TOKEN_FILE = "oauth2_token.json"
+
+
+def garmin_domain(auth_domain: Optional[str]) -> str:
+    """Map the configured auth domain ("CN" / "COM") to the garth domain."""
+    return "garmin.cn" if auth_domain and auth_domain.upper() == "CN" else "garmin.com"
+
+
+def token_expires_in(client) -> Optional[float]:
+    """
+    Seconds until the client's OAuth2 token expires.
+
+    Returns None when the client holds no garth OAuth2Token (e.g. a plain
+    bearer string set by benchmarks/load_sync.py), which is never refreshed.
+    """
+    expires_at = getattr(client.oauth2_token, "expires_at", None)
+    if expires_at is None:
+        return None
+    return expires_at - time.time()
+
+
+class GarminSessionManager:
+    """
+    Thread-safe cache of garth clients keyed by (email, domain).
+
+    Args:
+        refresh_margin: Refresh the OAuth2 token when it expires within this
+                        many seconds.
+    """
+
+    def __init__(self, refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._clients: Dict[Tuple[str, str], object] = {}
+        self._locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._guard = threading.Lock()
+        self.refreshes = 0
+
+    @contextmanager
+    def locked(self, email: str, domain: str):
+        """Serialize logins and refreshes of one account across threads."""
+        with self._guard:
+            lock = self._locks.setdefault((email, domain), threading.RLock())
+        with lock:
+            yield
+
+    def acquire(self, email: str, domain: str, session_dir: Union[str, Path]):
+        """
+        Return a garth client with a usable OAuth2 token, or None if the
+        account needs a full SSO login.
+
+        Tries the cached client first, then the tokens saved in session_dir,
+        refreshing the OAuth2 token when it is about to expire.
+        """
+        session_dir = Path(session_dir)
+        with self.locked(email, domain):
+            client = self._clients.get((email, domain))
+            if client is not None and not self._expiring(client):
+                return client
+
+            # Another process may have refreshed the tokens on disk meanwhile
+            loaded = self._load(session_dir, domain)
+            if loaded is not None and (client is None or self._expires_later(loaded, client)):
+                client = loaded
+            if client is None:
+                return None
+
+            if self._expiring(client) and not self._refresh(client, session_dir):
+                self._clients.pop((email, domain), None)
+                return None
+
+            self._clients[(email, domain)] = client
+            return client
+
+    def ensure_fresh(self, email: str, domain: str, client, session_dir: Union[str, Path],
+                     force: bool = False) -> bool:
+        """
+        Refresh client's OAuth2 token if it is about to expire (called before
+        each upload of a long-running sync).
+
+        Args:
+            force: Refresh even if the token has not expired yet (Garmin
+                   rejected it).
+
+        Returns:
+            bool: False if the token could not be refreshed.
+        """
+        token = client.oauth2_token
+        if not force and not self._expiring(client):
+            return True
+        with self.locked(email, domain):
+            # Another thread may have refreshed it while we waited for the lock
+            if client.oauth2_token is not token and not self._expiring(client):
+                return True
+            if self._refresh(client, Path(session_dir)):
+                return True
+            self.discard(email, domain)
+            return False
+
+    def put(self, email: str, domain: str, client, session_dir: Union[str, Path]):
+        """Cache a client after a full SSO login and save its tokens."""
+        with self.locked(email, domain):
+            self.save(client, session_dir)
+            self._clients[(email, domain)] = client
+
+    def discard(self, email: str, domain: str):
+        """Drop the cached client, e.g. after Garmin rejected its token."""
+        with self._guard:
+            self._clients.pop((email, domain), None)
+
+    def clear(self):
+        with self._guard:
+            self._clients.clear()
+
+    @staticmethod
+    def save(client, session_dir: Union[str, Path], oauth2_only: bool = False):
+        """Write the client's tokens in garth's session layout (atomically)."""
+        session_dir = Path(session_dir)
+        tokens = [(OAUTH2_TOKEN_FILE, client.oauth2_token)]
+        if not oauth2_only:
+            tokens.append((OAUTH1_TOKEN_FILE, client.oauth1_token))
+        for name, token in tokens:
+            if token is not None:
+                atomic_write(session_dir / name, json.dumps(asdict(token), indent=4, default=str))
+
+    def _expiring(self, client) -> bool:
+        expires_in = token_expires_in(client)
+        return expires_in is not None and expires_in < self.refresh_margin
+
+    @staticmethod
+    def _expires_later(candidate, client) -> bool:
+        return (token_expires_in(candidate) or 0) > (token_expires_in(client) or 0)
+
+    def _load(self, session_dir: Path, domain: str):
+        if not (session_dir / OAUTH1_TOKEN_FILE).exists():
+            return None
+        from garth.http import Client
+        client = Client()
+        try:
+            client.load(str(session_dir))
+        except Exception as e:
+            logger.warning(f"Failed to load Garmin session from {session_dir}: {e}")
+            return None
+        if client.domain != domain:
+            logger.info(f"Saved Garmin session is for {client.domain}, not {domain}; ignoring it")
+            return None
+        return client
+
+    def _refresh(self, client, session_dir: Path) -> bool:
+        if not client.oauth1_token:
+            return False
+        try:
+            client.refresh_oauth2()
+        except Exception as e:
+            logger.warning(f"Garmin OAuth2 token refresh failed: {e}")
+            return False
+        self.refreshes += 1
+        logger.info(f"Garmin OAuth2 token refreshed, valid for {token_expires_in(client):.0f}s")
+        try:
+            self.save(client, session_dir, oauth2_only=True)
+        except OSError as e:
+            logger.warning(f"Failed to save refreshed Garmin token to {session_dir}: {e}")
+        return True
+
+
+# Shared by all GarminClient instances of the process
+session_manager = GarminSessionManager()
@@ -0,0 +1,138 @@
+"""
+Columnar view of weight records for vectorized filtering.
+
+A WeightBatch holds one float column per filterable field (NaN where a record
+has no usable value) next to the original records, so filter conditions are
+evaluated as whole-column comparisons instead of per-record Python calls.
+Columns are NumPy arrays when NumPy is installed and plain lists otherwise.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from xiaomi.models import WeightRecord
+
+NAN = float('nan')
+
+
+def to_float(value: Any) -> float:
+    """float(value), or NaN if the value is missing or not numeric."""
+    if value is None:
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+class WeightBatch:
+    """
+    Records plus one float column per field.
+
+    Args:
+        records: WeightRecord objects or dicts with the same keys.
+        fields: Data keys to build columns for; other columns are built on
+                first access.
+    """
+
+    def __init__(self, records: Sequence[Any], fields: Iterable[str] = ()):
+        self.records = list(records)
+        self._columns: Dict[str, Any] = {}
+        for key in fields:
+            self.column(key)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, key: str):
+        """The column for data key `key` (built lazily)."""
+        column = self._columns.get(key)
+        if column is None:
+            values = (
+                to_float(getattr(w, key, None) if isinstance(w, WeightRecord) else w.get(key))
+                for w in self.records
+            )
+            if np is not None:
+                column = np.fromiter(values, dtype=np.float64, count=len(self.records))
+            else:
+                column = list(values)
+            self._columns[key] = column
+        return column
+
+    def select(self, mask) -> List[Any]:
+        """Records where `mask` is True, in their original order."""
+        if np is not None:
+            return [self.records[i] for i in np.flatnonzero(mask)]
+        return [record for record, keep in zip(self.records, mask) if keep]
+
+
+# --- mask operations (NumPy or pure-Python) ---
+
+def full_mask(size: int, value: bool):
+    if np is not None:
+        return np.full(size, value, dtype=bool)
+    return [value] * size
+
+
+def combine_masks(a, b, logic: str):
+    """Element-wise AND / OR of two masks."""
+    if np is not None:
+        return a & b if logic == "and" else a | b
+    if logic == "and":
+        return [x and y for x, y in zip(a, b)]
+    return [x or y for x, y in zip(a, b)]
+
+
+def count_true(mask) -> int:
+    if np is not None:
+        return int(np.count_nonzero(mask))
+    return sum(1 for x in mask if x)
+
+
+def compare(column, operator: str, low: float, high: Optional[float] = None):
+    """
+    Compare a column with a constant. NaN entries never match, the same as a
+    missing value in garmin.filter.evaluate_condition.
+
+    Args:
+        operator: One of eq / ne / gt / gte / lt / lte / between.
+        low: Comparison value (lower bound for between).
+        high: Upper bound for between.
+    """
+    if np is not None:
+        with np.errstate(invalid='ignore'):
+            if operator == "eq":
+                return np.abs(column - low) < 0.001
+            if operator == "ne":
+                return np.abs(column - low) >= 0.001
+            if operator == "gt":
+                return column > low
+            if operator == "gte":
+                return column >= low
+            if operator == "lt":
+                return column < low
+            if operator == "lte":
+                return column <= low
+            if operator == "between":
+                return (column >= low) & (column <= high)
+        raise ValueError(f"Unsupported operator: {operator}")
+
+    if operator == "eq":
+        return [abs(x - low) < 0.001 for x in column]
+    if operator == "ne":
+        return [abs(x - low) >= 0.001 for x in column]
+    if operator == "gt":
+        return [x > low for x in column]
+    if operator == "gte":
+        return [x >= low for x in column]
+    if operator == "lt":
+        return [x < low for x in column]
+    if operator == "lte":
+        return [x <= low for x in column]
+    if operator == "between":
+        return [low <= x <= high for x in column]
+    raise ValueError(f"Unsupported operator: {operator}")
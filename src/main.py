@@ -1,15 +1,26 @@
 
-from garmin.client import GarminClient
-from garmin.fit_generator import create_weight_fit_file
-from xiaomi.client import XiaomiClient, unmarshal_fitness_data
+from garmin.client import (
+    GarminClient, DEFAULT_UPLOAD_POOL_SIZE, configure_upload_pool, get_upload_connection_stats
+)
+from garmin.fit_generator import build_weight_fit_bytes
+from xiaomi.client import (
+    XiaomiClient, XiaomiAPIError, XiaomiRequestError, is_retryable_error, unmarshal_fitness_data
+)
 from xiaomi.config import ConfigManager
+from xiaomi.session import XiaomiSessionCache
+from core.sync_state import SyncStateManager
+from core.weight_store import WeightStore
+from core.upload_ledger import UploadLedger
+from utils.paths import get_sync_state_file, get_weight_db_file, get_xiaomi_session_dir
+from utils.rate_limit import ServiceLimiter, DEFAULT_XIAOMI_RATE, DEFAULT_GARMIN_RATE
+from utils.timing import StageTimer, format_timings
+from utils.metrics import REGISTRY, RECORDS_FETCHED, CHUNKS, TOKEN_REFRESH_FAILURES, record_sync_run
 import argparse
 import sys
 import logging
 import json
 import datetime
 from pathlib import Path
-import time
 
 # Add src to path
 sys.path.append(str(Path(__file__).parent))
@@ -24,8 +35,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def display_weight_data(weights, limit=10):
-    """Display weight data in a formatted way"""
+def display_weight_data(weights, limit=10, stats=None):
+    """
+    Display weight data in a formatted way.
+
+    `stats` is the full-history summary from WeightStore.get_statistics();
+    without it the statistics are computed from `weights` only.
+    """
     if not weights:
         print("No weight data found.")
         return
@@ -65,19 +81,180 @@ def display_weight_data(weights, limit=10):
         print()
 
     # Statistics
-    if len(weights) > 0:
+    if stats is None and len(weights) > 0:
         weights_values = [float(w.get('Weight'))
                           for w in weights if w.get('Weight')]
         if weights_values:
-            print(f"{'='*80}")
-            print(f"📈 Statistics")
-            print(f"{'='*80}")
-            print(f"  Latest Weight: {weights_values[0]} kg")
-            print(
-                f"  Average Weight: {sum(weights_values) / len(weights_values):.2f} kg")
-            print(f"  Min Weight: {min(weights_values)} kg")
-            print(f"  Max Weight: {max(weights_values)} kg")
-            print(f"{'='*80}\n")
+            stats = {
+                "count": len(weights_values),
+                "latest": weights_values[0],
+                "average": sum(weights_values) / len(weights_values),
+                "min": min(weights_values),
+                "max": max(weights_values),
+            }
+    if stats:
+        print(f"{'='*80}")
+        print(f"📈 Statistics ({stats['count']} records)")
+        print(f"{'='*80}")
+        print(f"  Latest Weight: {stats['latest']} kg")
+        print(f"  Average Weight: {stats['average']:.2f} kg")
+        print(f"  Min Weight: {stats['min']} kg")
+        print(f"  Max Weight: {stats['max']} kg")
+        print(f"{'='*80}\n")
+
+
+def log_connection_stats():
+    """Log connection reuse of the shared Garmin upload sessions."""
+    for stats in get_upload_connection_stats():
+        logger.info(
+            f"  🔗 {stats['domain']}: {stats['requests']} 次上传请求, "
+            f"新建连接 {stats['connections']} 个, 复用 {stats['reused']} 次")
+
+
+def log_timings(timings, duration):
+    """Log per-stage timings (StageTimer.summary()) of one user's run."""
+    logger.info(f"  ⏱️ 总耗时 {duration:.2f}s")
+    for line in format_timings(timings):
+        logger.info(f"    {line}")
+
+
+def log_result(result):
+    """Log one SyncResult of a parallel or daemon run."""
+    status = "✅" if result.success else "❌"
+    logger.info(
+        f"  {status} {result.username}: {result.total_records} 条记录, "
+        f"成功 {result.uploaded_chunks} / 重复 {result.duplicate_chunks} / "
+        f"失败 {result.failed_chunks} 个批次"
+        + (f" - {result.error_message}" if result.error_message else ""))
+    if result.timings:
+        log_timings(result.timings, result.duration)
+
+
+def iter_pending_chunks(records, select, chunk_size):
+    """
+    Group records into chunks of chunk_size after applying select.
+
+    select (filter rules, upload ledger) runs once per chunk_size records read,
+    so only one chunk of records is held in memory at a time.
+    """
+    page, buffer = [], []
+    for record in records:
+        page.append(record)
+        if len(page) < chunk_size:
+            continue
+        buffer.extend(select(page))
+        page = []
+        while len(buffer) >= chunk_size:
+            yield buffer[:chunk_size]
+            buffer = buffer[chunk_size:]
+    if page:
+        buffer.extend(select(page))
+    while buffer:
+        yield buffer[:chunk_size]
+        buffer = buffer[chunk_size:]
+
+
+def write_metrics(args):
+    """Write the metrics registry to --metrics-file (node_exporter textfile collector)."""
+    if not args.metrics_file:
+        return
+    try:
+        REGISTRY.write_textfile(args.metrics_file)
+    except OSError as e:
+        logger.error(f"Failed to write metrics to {args.metrics_file}: {e}")
+
+
+def run_parallel_sync(args):
+    """Sync all users concurrently through SyncOrchestrator and log a summary"""
+    from core.sync_service import SyncOrchestrator
+
+    orchestrator = SyncOrchestrator(args.config)
+    orchestrator.configure_limits(
+        xiaomi_concurrency=args.xiaomi_concurrency,
+        garmin_concurrency=args.garmin_concurrency,
+        xiaomi_rate=args.xiaomi_rate,
+        garmin_rate=args.garmin_rate,
+        garmin_pool_size=args.garmin_pool_size,
+        garmin_keep_alive=not args.no_keep_alive
+    )
+
+    def log_progress(progress):
+        logger.info(f"[{progress.username}] {progress.message}")
+
+    results = orchestrator.sync_users(
+        max_workers=args.workers,
+        full=args.full,
+        progress_callback=log_progress,
+        archive_fit=args.fit
+    )
+
+    logger.info("=" * 80)
+    logger.info(f"📊 并行同步汇总 - {len(results)} 个用户")
+    for result in results:
+        log_result(result)
+    for stats in orchestrator.get_limiter_stats():
+        logger.info(
+            f"  {stats['service']}: {stats['requests']} 次请求, "
+            f"限流等待 {stats['waited_seconds']}s")
+    log_connection_stats()
+    logger.info("=" * 80)
+    write_metrics(args)
+    return results
+
+
+def run_daemon(args):
+    """Keep running and sync every user on its own interval (see core.scheduler)"""
+    import signal
+    from core.sync_service import SyncOrchestrator
+    from core.scheduler import SyncScheduler
+
+    orchestrator = SyncOrchestrator(args.config)
+    orchestrator.configure_limits(
+        xiaomi_concurrency=args.xiaomi_concurrency,
+        garmin_concurrency=args.garmin_concurrency,
+        xiaomi_rate=args.xiaomi_rate,
+        garmin_rate=args.garmin_rate,
+        garmin_pool_size=args.garmin_pool_size,
+        garmin_keep_alive=not args.no_keep_alive
+    )
+
+    def log_progress(progress):
+        logger.info(f"[{progress.username}] {progress.message}")
+
+    def log_results(results):
+        for result in results:
+            log_result(result)
+        write_metrics(args)
+
+    schedule = {}
+    if args.interval is not None:
+        schedule["interval"] = args.interval
+    if args.jitter is not None:
+        schedule["jitter"] = args.jitter
+
+    scheduler = SyncScheduler(
+        orchestrator,
+        **schedule,
+        max_workers=args.workers,
+        archive_fit=args.fit,
+        progress_callback=log_progress,
+        result_callback=log_results
+    )
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, stopping after the current sync...")
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = REGISTRY.start_http_server(args.metrics_port, addr=args.metrics_addr)
+    try:
+        scheduler.run_forever()
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
 
 
 def main():
@@ -87,20 +264,73 @@ def main():
     parser.add_argument("--limit", type=int, default=10,
                         help="Number of records to display")
     parser.add_argument("--fit", action="store_true",
-                        help="Generate FIT files for Garmin")
+                        help="Write generated FIT files to --output-dir "
+                             "(--sync uploads from memory and does not need it)")
     parser.add_argument("--sync", action="store_true",
                         help="Upload weight data to Garmin Connect")
     parser.add_argument("--output-dir", default="data/garmin-fit",
                         help="Directory for generated FIT files")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the incremental sync cursor and fetch the full history")
+    parser.add_argument("--export-json", action="store_true",
+                        help="Export each user's stored weight history to data/weight_data_<user>.json")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of users to sync in parallel (requires --sync)")
+    parser.add_argument("--xiaomi-concurrency", type=int, default=None,
+                        help="Max concurrent Xiaomi requests across all users")
+    parser.add_argument("--garmin-concurrency", type=int, default=None,
+                        help="Max concurrent Garmin uploads across all users")
+    parser.add_argument("--xiaomi-rate", type=float, default=DEFAULT_XIAOMI_RATE,
+                        help="Max Xiaomi requests per second across all users (0 = unlimited)")
+    parser.add_argument("--garmin-rate", type=float, default=DEFAULT_GARMIN_RATE,
+                        help="Max Garmin uploads per second across all users (0 = unlimited)")
+    parser.add_argument("--garmin-pool-size", type=int, default=None,
+                        help="Connections kept open per Garmin domain for uploads "
+                             "(default: --garmin-concurrency or 10)")
+    parser.add_argument("--no-keep-alive", action="store_true",
+                        help="Open a new connection for every Garmin upload")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and sync each user periodically "
+                             "(implies --sync; logins are reused between runs)")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="Default minutes between syncs in --daemon mode (default: 1440); "
+                             "set \"sync_interval\" on a user in users.json to override")
+    parser.add_argument("--jitter", type=float, default=None,
+                        help="Random extra delay of up to this many minutes per scheduled sync "
+                             "(default: 10)")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write Prometheus metrics to this file after each run "
+                             "(for the node_exporter textfile collector)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this port at /metrics in --daemon mode")
+    parser.add_argument("--metrics-addr", default="0.0.0.0",
+                        help="Address for --metrics-port (default: 0.0.0.0)")
     args = parser.parse_args()
 
-    # If --sync is requested, we must also have --fit
-    if args.sync:
-        args.fit = True
+    if args.daemon:
+        run_daemon(args)
+        return
 
     config_mgr = ConfigManager(args.config)
+    # Same files as SyncOrchestrator (--workers, --daemon), following settings.data_dir
+    data_dir = config_mgr.config_data.get("settings", {}).get("data_dir")
+    state_mgr = SyncStateManager(get_sync_state_file(custom_base=data_dir))
+    store = WeightStore(get_weight_db_file(custom_base=data_dir))
+    ledger = UploadLedger(store.db_file)
+    xiaomi_sessions = XiaomiSessionCache(get_xiaomi_session_dir(custom_base=data_dir))
     users = config_mgr.get_users()
 
+    # Shared limiters replace the fixed pause between users
+    xiaomi_limiter = ServiceLimiter(
+        "xiaomi", max_concurrency=args.xiaomi_concurrency,
+        rate=args.xiaomi_rate, burst=max(1, int(args.xiaomi_rate)))
+    garmin_limiter = ServiceLimiter(
+        "garmin", max_concurrency=args.garmin_concurrency,
+        rate=args.garmin_rate, burst=max(1, int(args.garmin_rate)))
+    configure_upload_pool(
+        pool_size=args.garmin_pool_size or args.garmin_concurrency or DEFAULT_UPLOAD_POOL_SIZE,
+        keep_alive=not args.no_keep_alive)
+
     if not users:
         logger.warning(
             f"No users found in {args.config}. Please add users to the configuration file.")
@@ -131,6 +361,12 @@ def main():
             logger.info(f"Created template {args.config}")
             return
 
+    if args.workers > 1:
+        if args.sync:
+            run_parallel_sync(args)
+            return
+        logger.warning("--workers only applies to --sync, processing users sequentially")
+
     for user in users:
         username = user.get("username")
         token = user.get("token")
@@ -142,7 +378,14 @@ def main():
 
         logger.info(f"Processing user: {username}")
 
-        client = XiaomiClient(username=username)
+        client = XiaomiClient(username=username, limiter=xiaomi_limiter)
+        timer = StageTimer()
+
+        def measure_fetch(span, fetched):
+            # The span starts with the client's byte counters; keep the difference
+            span.records = len(fetched)
+            span.bytes_in = client.bytes_received - span.bytes_in
+            span.bytes_out = client.bytes_sent - span.bytes_out
 
         if token and token.get("userId") and token.get("passToken"):
             # Set credentials from token
@@ -155,85 +398,124 @@ def main():
             try:
                 # Validate/refresh token
                 logger.info("Logging in with saved Xiaomi token...")
-                new_token_data = client.login_from_token()
+                try:
+                    with timer.span("xiaomi_login"):
+                        # Skips serviceLogin while the cached session is fresh
+                        new_token_data = xiaomi_sessions.login(
+                            client, username,
+                            on_token=lambda data, name=username: config_mgr.update_user_token(name, data))
+                except Exception:
+                    TOKEN_REFRESH_FAILURES.inc(service="xiaomi")
+                    raise
 
                 # Update the token in config if changed
                 if new_token_data:
                     config_mgr.update_user_token(username, new_token_data)
                     logger.info("Xiaomi token refreshed and saved")
 
+                # Incremental sync: only fetch records newer than the last successful sync
+                cursor = None if args.full else state_mgr.get_cursor(username)
+                if cursor:
+                    logger.info(
+                        f"Incremental sync from cursor: time={cursor.get('time')}, "
+                        f"next_key={cursor.get('next_key')}")
+
                 # Fetch weights - prefer using the new API (supports imported data from zeeplife)
                 weights = []
+                success = True
 
                 # First attempt to use the new API endpoint
                 logger.info("Trying to fetch weight data using the new API...")
                 try:
-                    weights = client.get_model_weights(model)
+                    with timer.span("xiaomi_fetch", bytes_in=client.bytes_received,
+                                    bytes_out=client.bytes_sent) as span:
+                        weights = client.get_model_weights(
+                            model, since=cursor.get("create_time") if cursor else None)
+                        measure_fetch(span, weights)
                     logger.info(
                         f"Parsed and obtained {len(weights)} weight records")
-                except Exception as e:
+                except (XiaomiAPIError, XiaomiRequestError) as e:
+                    # Transient errors are retried inside the client and then
+                    # propagate; permanent rejections (API codes, 4xx) fall back
+                    if is_retryable_error(e):
+                        raise
                     logger.warning(
                         f"Failed to fetch data with the new API: {e}")
                     logger.info("Falling back to legacy API...")
+                    weights = []
 
                 # If no data from the new API, use the legacy API (for backward compatibility)
                 if not weights:
-                    fitness_data = client.get_fitness_data_by_time(
-                        key="weight")
+                    start_time = cursor["time"] + 1 if cursor and cursor.get("time") else 1
+                    with timer.span("xiaomi_fetch", bytes_in=client.bytes_received,
+                                    bytes_out=client.bytes_sent) as span:
+                        fitness_data = client.get_fitness_data_by_time(
+                            key="weight",
+                            start_time=start_time,
+                            next_key=cursor.get("next_key") if cursor else None)
+                        measure_fetch(span, fitness_data)
                     logger.info(f"Using legacy API, model: {model}")
                     # weights = client.get_model_weights(model)
                     weights = unmarshal_fitness_data(fitness_data)
+                if client.retry_count:
+                    logger.info(f"Xiaomi requests retried {client.retry_count} time(s)")
                 if weights:
                     logger.info(
                         f"Successfully retrieved {len(weights)} weight records")
-                    display_weight_data(weights, limit=args.limit)
+                    RECORDS_FETCHED.inc(len(weights), user=username)
+                    # Save to the local store; unchanged records are not rewritten
+                    with timer.span("store", records=len(weights)):
+                        changed = store.upsert(username, weights)
+                    logger.info(
+                        f"Weight store updated: {changed} new/changed records "
+                        f"({store.count(username)} total)")
 
-                    # Save to JSON file
-                    output_file = f"data/weight_data_{username}.json"
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(weights, f, indent=2, ensure_ascii=False)
-                    logger.info(f"Weight data saved to {output_file}")
-
-                    # Generate FIT file if requested
-                    if args.fit:
-                        # Extract and validate filter configuration
-                        filter_config = None
+                    display_weight_data(
+                        weights, limit=args.limit, stats=store.get_statistics(username))
+
+                    # Generate FIT data if requested (archived to disk only with --fit)
+                    if args.fit or args.sync:
+                        # Validate and compile the filter configuration once
+                        record_filter = None
                         if garmin_config:
-                            filter_config = garmin_config.get("filter")
-
-                            # If filter is configured, validate and log
-                            if filter_config and filter_config.get("enabled"):
-                                try:
-                                    from garmin.filter_config import FilterConfigValidator
-                                    FilterConfigValidator.validate(
-                                        filter_config)
-
-                                    conditions_count = len(
-                                        filter_config.get("conditions", []))
-                                    logic = filter_config.get("logic", "and")
-                                    logger.info(
-                                        f"Weight filter enabled: {conditions_count} condition(s) "
-                                        f"with '{logic.upper()}' logic"
-                                    )
-                                except Exception as e:
-                                    logger.error(
-                                        f"Invalid filter configuration: {e}")
-                                    logger.warning("Proceeding without filter")
-                                    filter_config = None
+                            try:
+                                from garmin.filter import compile_filter
+                                record_filter = compile_filter(garmin_config.get("filter"))
+                            except Exception as e:
+                                logger.error(
+                                    f"Invalid filter configuration: {e}")
+                                logger.warning("Proceeding without filter")
+
+                        def select_pending(records):
+                            with timer.span("select", records=len(records)):
+                                if record_filter is not None:
+                                    records = record_filter.apply(records)
+                                # Only upload records Garmin has not accepted yet
+                                if args.sync:
+                                    records = ledger.filter_new(username, records)
+                                return records
 
                         # Chunked upload logic
                         CHUNK_SIZE = 500
                         fit_output_dir = Path(args.output_dir)
-                        fit_output_dir.mkdir(parents=True, exist_ok=True)
+                        if args.fit:
+                            fit_output_dir.mkdir(parents=True, exist_ok=True)
                         timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
 
-                        # Split weights into chunks
-                        weight_chunks = [weights[i:i+CHUNK_SIZE]
-                                        for i in range(0, len(weights), CHUNK_SIZE)]
-                        total_chunks = len(weight_chunks)
-
-                        logger.info(
-                            f"体重数据共 {len(weights)} 条，将分为 {total_chunks} 个批次处理")
+                        # Release the fetched list and stream its time range back
+                        # from the store, a chunk at a time, through filtering and
+                        # FIT generation
+                        fetched_times = [float(w['Timestamp']) for w in weights
+                                         if w.get('Timestamp') is not None]
+                        fetched_start = min(fetched_times, default=None)
+                        fetched_end = max(fetched_times, default=None)
+                        weights = fetched_times = None
+                        stored_weights = store.iter_weights(
+                            username, start=fetched_start, end=fetched_end, batch_size=CHUNK_SIZE)
+                        weight_chunks = iter_pending_chunks(
+                            stored_weights, select_pending, CHUNK_SIZE)
+                        total_chunks = 0
+                        pending_count = 0
 
                         # Initialize upload results tracking
                         upload_results = {
@@ -243,40 +525,55 @@ def main():
                             'failed_chunks': []
                         }
 
+                        # Garmin client is created lazily for this user on first upload
+                        g_client = None
+                        garmin_login_attempted = False
+
                         # Process each chunk
                         for idx, chunk in enumerate(weight_chunks, 1):
+                            total_chunks = idx
+                            pending_count += len(chunk)
                             # Generate filename with chunk number
                             chunk_filename = fit_output_dir / \
                                 f"weight_{username}_{timestamp}_{idx}.fit"
 
                             logger.info(
-                                f"处理第 {idx}/{total_chunks} 批: {len(chunk)} 条数据")
+                                f"处理第 {idx} 批: {len(chunk)} 条数据")
 
-                            # Generate FIT file for this chunk
-                            created_path = create_weight_fit_file(
-                                chunk, chunk_filename, filter_config=filter_config
-                            )
+                            # Generate FIT data for this chunk in memory
+                            with timer.span("fit_build", records=len(chunk)) as span:
+                                fit_bytes = build_weight_fit_bytes(chunk)
+                                span.bytes_out = len(fit_bytes or b"")
 
-                            if created_path is None:
+                            if fit_bytes is None:
                                 logger.warning(
-                                    f"批次 {idx}/{total_chunks} 没有生成有效数据，跳过")
+                                    f"批次 {idx} 没有生成有效数据，跳过")
                                 continue
 
+                            if args.fit:
+                                chunk_filename.write_bytes(fit_bytes)
+                                logger.info(f"FIT 文件已保存: {chunk_filename}")
+
                             # Sync to Garmin if requested
                             if args.sync:
                                 # Initialize Garmin client on first sync
-                                if 'g_client' not in locals():
+                                if not garmin_login_attempted:
+                                    garmin_login_attempted = True
                                     if garmin_config and garmin_config.get("email") and garmin_config.get("password"):
                                         g_client = GarminClient(
                                             email=garmin_config["email"],
                                             password=garmin_config["password"],
                                             auth_domain=garmin_config.get(
-                                                "domain", "CN")
+                                                "domain", "CN"),
+                                            limiter=garmin_limiter
                                         )
 
-                                        if not g_client.login():
+                                        with timer.span("garmin_login"):
+                                            logged_in = g_client.login()
+                                        if not logged_in:
                                             logger.error(
                                                 "❌ Garmin login failed. Synchronization aborted.")
+                                            TOKEN_REFRESH_FAILURES.inc(service="garmin")
                                             g_client = None
                                     else:
                                         logger.warning(
@@ -286,22 +583,30 @@ def main():
                                 # Upload if client is available
                                 if g_client:
                                     logger.info(
-                                        f"正在上传批次 {idx}/{total_chunks} 到 Garmin Connect...")
-                                    status = g_client.upload_fit(
-                                        chunk_filename)
+                                        f"正在上传批次 {idx} 到 Garmin Connect...")
+                                    with timer.span("garmin_upload", records=len(chunk),
+                                                    bytes_out=len(fit_bytes)):
+                                        status = g_client.upload_fit_bytes(
+                                            fit_bytes, chunk_filename.name)
+
+                                    if status in ("SUCCESS", "DUPLICATE"):
+                                        ledger.mark_uploaded(username, chunk)
 
                                     if status == "SUCCESS":
                                         logger.info(
-                                            f"✅ 批次 {idx}/{total_chunks} 上传成功")
+                                            f"✅ 批次 {idx} 上传成功")
                                         upload_results['success'] += 1
+                                        CHUNKS.inc(user=username, status="success")
                                     elif status == "DUPLICATE":
                                         logger.info(
-                                            f"ℹ️ 批次 {idx}/{total_chunks} 数据已存在（重复）")
+                                            f"ℹ️ 批次 {idx} 数据已存在（重复）")
                                         upload_results['duplicate'] += 1
+                                        CHUNKS.inc(user=username, status="duplicate")
                                     else:
                                         logger.error(
-                                            f"❌ 批次 {idx}/{total_chunks} 上传失败: {status}")
+                                            f"❌ 批次 {idx} 上传失败: {status}")
                                         upload_results['failed'] += 1
+                                        CHUNKS.inc(user=username, status="failed")
                                         upload_results['failed_chunks'].append({
                                             'chunk': idx,
                                             'filename': str(chunk_filename),
@@ -309,6 +614,11 @@ def main():
                                             'records': len(chunk)
                                         })
 
+                        logger.info(
+                            f"待处理体重数据共 {pending_count} 条，分为 {total_chunks} 个批次处理")
+                        if args.sync and total_chunks == 0:
+                            logger.info("All weight records are already uploaded to Garmin")
+
                         # Print upload summary
                         if args.sync and total_chunks > 0:
                             logger.info("=" * 80)
@@ -320,6 +630,7 @@ def main():
                                 f"  ℹ️ 重复: {upload_results['duplicate']}")
                             logger.info(
                                 f"  ❌ 失败: {upload_results['failed']}")
+                            log_connection_stats()
 
                             if upload_results['failed_chunks']:
                                 logger.info("\n失败的批次详情:")
@@ -329,18 +640,44 @@ def main():
                                         f"({fail['records']} 条记录) - 错误: {fail['error']}"
                                     )
                             logger.info("=" * 80)
+
+                        # Garmin login failures and failed chunks make the run unsuccessful
+                        success = upload_results['failed'] == 0 and (
+                            not args.sync or g_client is not None or total_chunks == 0)
+
+                        # Advance the incremental cursor only after a fully successful sync
+                        if args.sync and success:
+                            # The cursor only needs the newest fetched timestamp
+                            state_mgr.update_cursor(
+                                username,
+                                [{'Timestamp': fetched_end}] if fetched_end is not None else [],
+                                next_key=client.fitness_next_key)
+                elif cursor:
+                    logger.info("No new weight data since the last sync")
                 else:
                     logger.warning("No weight data found")
+                    success = False
+
+                if args.export_json:
+                    output_file = f"data/weight_data_{username}.json"
+                    exported = store.export_json(username, output_file)
+                    logger.info(f"Exported {exported} weight records to {output_file}")
+
+                log_timings(timer.summary(), timer.elapsed())
 
             except Exception as e:
+                success = False
                 logger.error(f"Failed to process data for {username}: {e}")
                 logger.exception("Detailed error:")
+            # Same run/last-success series as SyncOrchestrator, for the textfile collector
+            record_sync_run(username, success, timer.elapsed())
         else:
             logger.warning(
                 f"No valid token for {username}. Please run the login tool to generate a token.")
             logger.info("Run: python src/xiaomi/login.py --config users.json")
-        logger.info("Sleep 5 seconds")
-        time.sleep( 5 )
+            record_sync_run(username, False, timer.elapsed())
+
+    write_metrics(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,154 @@
+"""
+原子写入与文件锁
+配置文件等由多个线程 / 进程（GUI、定时任务、守护进程）共同读写的文件使用：
+先写临时文件再改名，读取方不会看到写了一半的文件；写入前加锁，避免互相覆盖
+"""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _LockState:
+    """同一进程内按锁文件路径共享：线程锁 + 各线程的重入深度与文件描述符"""
+
+    def __init__(self):
+        self.thread_lock = threading.Lock()
+        self.local = threading.local()
+
+
+# flock 只在进程之间互斥，进程内的线程（以及同一文件的多个 FileLock）通过共享的 _LockState 互斥
+_lock_states: Dict[str, _LockState] = {}
+_lock_states_guard = threading.Lock()
+
+
+def atomic_write(path: Union[str, Path], data: Union[str, bytes], mode: Optional[int] = None):
+    """
+    原子写入文件：写入同目录下的临时文件并刷盘，再替换目标文件
+
+    Args:
+        path: 目标文件
+        data: 文件内容（str 按 UTF-8 编码）
+        mode: 文件权限；None 时沿用已有文件的权限，新文件为 0600
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if mode is None:
+        try:
+            mode = path.stat().st_mode & 0o777
+        except OSError:
+            mode = None
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FileLock:
+    """
+    跨线程、跨进程的互斥锁，基于 path 旁边的 .<文件名>.lock 文件
+    （POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking）
+
+    同一线程内可重入。用法：
+        with FileLock("users.json"):
+            ...
+
+    Args:
+        path: 被保护的文件（锁文件放在同一目录）
+        timeout: 等待锁的秒数，None 表示一直等待；超时抛出 TimeoutError
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: Optional[float] = None):
+        path = Path(path)
+        self.lock_file = path.parent / f".{path.name}.lock"
+        self.timeout = timeout
+        key = os.path.abspath(self.lock_file)
+        with _lock_states_guard:
+            state = _lock_states.setdefault(key, _LockState())
+        self._thread_lock = state.thread_lock
+        self._local = state.local
+
+    def acquire(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            return
+
+        if not self._thread_lock.acquire(timeout=-1 if self.timeout is None else self.timeout):
+            raise TimeoutError(f"等待文件锁超时: {self.lock_file}")
+        try:
+            self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                self._lock_fd(fd)
+            except BaseException:
+                os.close(fd)
+                raise
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._local.fd = fd
+        self._local.depth = 1
+
+    def release(self):
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            raise RuntimeError("FileLock 未被当前线程持有")
+        self._local.depth = depth - 1
+        if depth > 1:
+            return
+
+        fd = self._local.fd
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def _lock_fd(self, fd: int):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | (fcntl.LOCK_NB if deadline is not None else 0))
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待文件锁超时: {self.lock_file}")
+                time.sleep(0.05)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
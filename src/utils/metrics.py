@@ -0,0 +1,269 @@
+"""
+监控指标
+进程内的计数器 / 仪表 / 直方图注册表，输出 Prometheus 文本格式：
+定时任务运行结束后写入 node_exporter 的 textfile 目录，守护模式下也可以开启 HTTP 端点
+"""
+import abc
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+from .atomic_file import atomic_write
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    """指标基类：按标签值分组保存数据"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Prometheus 文本格式的样本行（调用时已持有 self._lock）"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """可设置为任意值的仪表"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """直方图（累计分桶 + 总和 + 次数）"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data["counts"][i] += 1
+                    break
+            data["sum"] += value
+            data["count"] += 1
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            return data["count"] if data else 0
+
+    def _samples(self):
+        lines = []
+        for key, data in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, data["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data['sum'])}")
+            lines.append(f"{self.name}_count{labels} {data['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"指标 {metric.name} 已以不同的类型或标签注册")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Union[str, Path]):
+        """
+        写入 textfile collector 文件（先写临时文件再改名，采集时不会读到半个文件）
+        """
+        atomic_write(path, self.render(), mode=0o644)
+
+    def start_http_server(self, port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """
+        在后台线程中提供 /metrics 端点
+
+        Returns:
+            ThreadingHTTPServer: 服务器对象，调用 shutdown() 停止
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"监控指标端点已启动: http://{addr}:{server.server_port}/metrics")
+        return server
+
+
+# 进程内默认注册表及同步流程使用的指标
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "weight_sync_http_request_duration_seconds",
+    "HTTP request latency by service and endpoint",
+    ("service", "endpoint"))
+HTTP_REQUESTS = REGISTRY.counter(
+    "weight_sync_http_requests_total",
+    "HTTP requests by service, endpoint and result",
+    ("service", "endpoint", "status"))
+TOKEN_REFRESH_FAILURES = REGISTRY.counter(
+    "weight_sync_token_refresh_failures_total",
+    "Failed Xiaomi token logins / Garmin logins",
+    ("service",))
+RECORDS_FETCHED = REGISTRY.counter(
+    "weight_sync_records_fetched_total",
+    "Weight records fetched from Xiaomi",
+    ("user",))
+RECORDS_PENDING = REGISTRY.counter(
+    "weight_sync_records_pending_total",
+    "Weight records selected for upload (after filter and upload ledger)",
+    ("user",))
+CHUNKS = REGISTRY.counter(
+    "weight_sync_chunks_total",
+    "FIT chunks by upload result (success, duplicate, failed)",
+    ("user", "status"))
+SYNC_RUNS = REGISTRY.counter(
+    "weight_sync_runs_total",
+    "Sync runs by result (success, failed)",
+    ("user", "result"))
+SYNC_DURATION = REGISTRY.gauge(
+    "weight_sync_last_run_duration_seconds",
+    "Duration of the last sync run",
+    ("user",))
+LAST_SUCCESS = REGISTRY.gauge(
+    "weight_sync_last_success_timestamp_seconds",
+    "Unix time of the last successful sync run",
+    ("user",))
+
+
+def record_sync_run(user: str, success: bool, duration: float):
+    """记录一次用户同步的结果、耗时与最后成功时间"""
+    SYNC_RUNS.inc(user=user, result="success" if success else "failed")
+    SYNC_DURATION.set(duration, user=user)
+    if success:
+        LAST_SUCCESS.set(time.time(), user=user)
+
+
+def observe_request(service: str, endpoint: str, status: Union[int, str], seconds: float):
+    """记录一次 HTTP 请求的耗时与结果（status 为状态码或结果字符串）"""
+    HTTP_REQUEST_SECONDS.observe(seconds, service=service, endpoint=endpoint)
+    HTTP_REQUESTS.inc(service=service, endpoint=endpoint, status=str(status))
@@ -67,6 +67,24 @@ def get_session_dir(email: str, custom_base: str = None) -> Path:
     return session_dir
 
 
+def get_xiaomi_session_dir(custom_base: str = None) -> Path:
+    """
+    获取小米登录会话缓存目录（Cookie、ssecurity、时间偏移）
+
+    Args:
+        custom_base: 自定义基础路径（可选）
+
+    Returns:
+        Path: 会话目录路径
+    """
+    if custom_base:
+        base_path = Path(custom_base)
+    else:
+        base_path = get_app_data_dir()
+
+    return base_path / '.xiaomi'
+
+
 def get_output_dir(custom_base: str = None) -> Path:
     """
     获取输出目录（用于 FIT 文件等）
@@ -115,3 +133,41 @@ def get_config_dir() -> Path:
         config_dir = Path(__file__).parent.parent.parent
 
     return config_dir
+
+
+def get_sync_state_file(custom_base: str = None) -> Path:
+    """
+    获取同步状态文件路径（增量同步游标）
+
+    Args:
+        custom_base: 自定义基础路径（可选）
+
+    Returns:
+        Path: 状态文件路径
+    """
+    if custom_base:
+        base_path = Path(custom_base)
+    else:
+        base_path = get_app_data_dir()
+
+    base_path.mkdir(parents=True, exist_ok=True)
+    return base_path / 'sync_state.json'
+
+
+def get_weight_db_file(custom_base: str = None) -> Path:
+    """
+    获取本地体重数据库路径
+
+    Args:
+        custom_base: 自定义基础路径（可选）
+
+    Returns:
+        Path: SQLite 数据库文件路径
+    """
+    if custom_base:
+        base_path = Path(custom_base)
+    else:
+        base_path = get_app_data_dir()
+
+    base_path.mkdir(parents=True, exist_ok=True)
+    return base_path / 'weights.db'
@@ -0,0 +1,171 @@
+"""
+限流工具
+提供令牌桶限速与并发数限制，供多用户并行同步时共享使用
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# 默认限速（每秒请求数），单用户分页拉取时基本不会触发
+DEFAULT_XIAOMI_RATE = 10.0
+DEFAULT_GARMIN_RATE = 2.0
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限速器
+
+    Args:
+        rate: 每秒允许的请求数，<= 0 表示不限速
+        burst: 桶容量（允许的突发请求数）
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        获取一个令牌，必要时阻塞等待
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """acquire 的协程版本，等待时不阻塞事件循环"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def _reserve(self) -> float:
+        """预占一个令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # 令牌不足时预占一个令牌（余额为负），后续调用者会顺延等待
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class ServiceLimiter:
+    """
+    单个服务的访问限制：并发数 + 请求速率
+
+    作为上下文管理器使用，包裹一次 HTTP 请求:
+
+        with limiter:
+            session.post(...)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: int = 1
+    ):
+        self.name = name
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._rate_limiter = RateLimiter(rate, burst) if rate else None
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.waited_seconds = 0.0
+
+    def __enter__(self):
+        start = time.monotonic()
+        if self._semaphore:
+            self._semaphore.acquire()
+        try:
+            if self._rate_limiter:
+                self._rate_limiter.acquire()
+        except BaseException:
+            if self._semaphore:
+                self._semaphore.release()
+            raise
+
+        with self._stats_lock:
+            self.requests += 1
+            self.waited_seconds += time.monotonic() - start
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._semaphore:
+            self._semaphore.release()
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流统计"""
+        with self._stats_lock:
+            return {
+                "service": self.name,
+                "requests": self.requests,
+                "waited_seconds": round(self.waited_seconds, 3),
+            }
+
+
+class AsyncServiceLimiter:
+    """
+    ServiceLimiter 的 asyncio 版本，在同一事件循环内共享使用:
+
+        async with limiter:
+            await session.post(...)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: int = 1
+    ):
+        self.name = name
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._rate_limiter = RateLimiter(rate, burst) if rate else None
+
+        self.requests = 0
+        self.waited_seconds = 0.0
+
+    async def __aenter__(self):
+        start = time.monotonic()
+        if self._semaphore:
+            await self._semaphore.acquire()
+        try:
+            if self._rate_limiter:
+                await self._rate_limiter.acquire_async()
+        except BaseException:
+            if self._semaphore:
+                self._semaphore.release()
+            raise
+
+        self.requests += 1
+        self.waited_seconds += time.monotonic() - start
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._semaphore:
+            self._semaphore.release()
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流统计"""
+        return {
+            "service": self.name,
+            "requests": self.requests,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
@@ -0,0 +1,130 @@
+"""
+重试工具
+提供指数退避 + 随机抖动的重试策略，支持服务端 Retry-After 提示
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 HTTP Retry-After 头（秒数或 HTTP 日期）
+
+    Returns:
+        float: 需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    指数退避重试策略
+
+    第 n 次重试前等待 min(max_delay, base_delay * 2^(n-1))，并按 jitter 比例随机缩短，
+    避免多个用户同时重试。异常带有 retry_after 属性（秒）时，至少等待该时长。
+
+    Args:
+        max_attempts: 最多尝试次数（含首次），1 表示不重试
+        base_delay: 首次重试的等待秒数
+        max_delay: 单次等待上限（秒）
+        jitter: 随机抖动比例（0~1），0 表示不抖动
+        sleep: 等待函数（测试时可替换）
+        async_sleep: call_async 使用的协程等待函数
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.5,
+        sleep: Callable[[float], Any] = time.sleep,
+        async_sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep
+    ):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = min(1.0, max(0.0, jitter))
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """
+        计算第 retry 次重试（从 1 开始）前的等待秒数
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        if self.jitter:
+            delay *= 1 - self.jitter * random.random()
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(
+        self,
+        func: Callable[[], Any],
+        is_retryable: Callable[[BaseException], bool],
+        on_retry: Optional[Callable[[int, BaseException, float], None]] = None
+    ) -> Any:
+        """
+        执行 func，遇到可重试的异常时按策略等待后重试
+
+        Args:
+            func: 要执行的函数（每次重试重新调用）
+            is_retryable: 判断异常是否可以重试
+            on_retry: 每次重试前的回调 on_retry(retry, exc, delay)
+
+        Returns:
+            func 的返回值；重试次数用尽或异常不可重试时抛出最后一次的异常
+        """
+        retry = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                retry += 1
+                self._sleep(self._next_delay(retry, e, is_retryable, on_retry))
+
+    async def call_async(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        is_retryable: Callable[[BaseException], bool],
+        on_retry: Optional[Callable[[int, BaseException, float], None]] = None
+    ) -> Any:
+        """call 的协程版本，func 返回 awaitable，等待时不阻塞事件循环"""
+        retry = 0
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                retry += 1
+                await self._async_sleep(self._next_delay(retry, e, is_retryable, on_retry))
+
+    def _next_delay(self, retry, exc, is_retryable, on_retry) -> float:
+        """决定是否重试（不重试时重新抛出当前异常），返回等待秒数"""
+        if retry >= self.max_attempts or not is_retryable(exc):
+            raise exc
+        delay = self.backoff(retry, getattr(exc, "retry_after", None))
+        if on_retry:
+            on_retry(retry, exc, delay)
+        logger.warning(
+            f"请求失败（第 {retry}/{self.max_attempts - 1} 次重试，{delay:.1f}s 后）: {exc}")
+        return delay
@@ -0,0 +1,125 @@
+"""
+耗时统计工具
+按阶段记录同步过程的耗时、收发字节数与记录数，汇总后放入 SyncProgress.details / SyncResult
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+_END = object()
+
+
+class Span:
+    """一次计时；with 块内可补充收发字节数与记录数"""
+
+    __slots__ = ("name", "seconds", "records", "bytes_in", "bytes_out")
+
+    def __init__(self, name: str, records: int = 0, bytes_in: int = 0, bytes_out: int = 0):
+        self.name = name
+        self.seconds = 0.0
+        self.records = records
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+
+
+class StageTimer:
+    """
+    按阶段累计耗时（线程安全，流水线的获取/生成线程会同时写入）
+
+    Args:
+        clock: 计时函数（测试时可替换）
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._started = clock()
+
+    @contextmanager
+    def span(self, name: str, records: int = 0, bytes_in: int = 0, bytes_out: int = 0) -> Iterator[Span]:
+        """对 with 块计时，结束时（包括抛出异常时）计入阶段 name"""
+        span = Span(name, records, bytes_in, bytes_out)
+        start = self._clock()
+        try:
+            yield span
+        finally:
+            span.seconds = self._clock() - start
+            self.add(span)
+
+    def add(self, span: Span):
+        """计入一次已完成的计时"""
+        with self._lock:
+            stage = self._stages.get(span.name)
+            if stage is None:
+                stage = self._stages[span.name] = {
+                    "count": 0, "seconds": 0.0, "max_seconds": 0.0,
+                    "records": 0, "bytes_in": 0, "bytes_out": 0,
+                }
+            stage["count"] += 1
+            stage["seconds"] += span.seconds
+            stage["max_seconds"] = max(stage["max_seconds"], span.seconds)
+            stage["records"] += span.records
+            stage["bytes_in"] += span.bytes_in
+            stage["bytes_out"] += span.bytes_out
+
+    def timed_iter(
+        self,
+        name: str,
+        iterable: Iterable[Any],
+        measure: Optional[Callable[[Span, Any], None]] = None
+    ) -> Iterator[Any]:
+        """
+        逐项计时地迭代：每次取下一项（例如请求一页数据）记为一次计时
+
+        Args:
+            measure: 每次取值后调用 measure(span, item) 补充统计，迭代结束时 item 为 None
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.span(name) as span:
+                item = next(iterator, _END)
+                if measure:
+                    measure(span, None if item is _END else item)
+            if item is _END:
+                return
+            yield item
+
+    def elapsed(self) -> float:
+        """创建以来经过的秒数"""
+        return self._clock() - self._started
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的汇总（秒数保留 3 位小数），按首次出现的顺序"""
+        with self._lock:
+            result = {}
+            for name, stage in self._stages.items():
+                stage = dict(stage)
+                stage["seconds"] = round(stage["seconds"], 3)
+                stage["max_seconds"] = round(stage["max_seconds"], 3)
+                result[name] = stage
+            return result
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def format_timings(timings: Dict[str, Dict[str, float]]) -> List[str]:
+    """把 StageTimer.summary() 格式化为日志行"""
+    lines = []
+    for name, stage in timings.items():
+        line = f"{name}: {stage['count']} 次, {stage['seconds']:.2f}s"
+        if stage["count"] > 1:
+            line += f" (最长 {stage['max_seconds']:.2f}s)"
+        if stage["records"]:
+            line += f", {stage['records']} 条记录"
+        if stage["bytes_in"] or stage["bytes_out"]:
+            line += f", 收 {_format_bytes(stage['bytes_in'])} / 发 {_format_bytes(stage['bytes_out'])}"
+        lines.append(line)
+    return lines
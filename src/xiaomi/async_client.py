@@ -0,0 +1,264 @@
+"""
+asyncio variant of XiaomiClient built on aiohttp.
+
+Signing, encryption and response parsing are shared with the blocking client
+through XiaomiClientBase; only the HTTP calls differ. Many clients can share one
+aiohttp session (see create_session) so that hundreds of users are fetched
+concurrently over a small connection pool from a single thread.
+
+Like garmin.async_upload this is an opt-in API; the sync paths (SyncOrchestrator,
+main.py) use the blocking XiaomiClient on their worker threads.
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urljoin
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Ensure we can import from the parent package
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from xiaomi.client import XiaomiClientBase, XiaomiRequestError, is_retryable_error, unmarshal_scale_data
+from utils.metrics import observe_request
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 20
+DEFAULT_TIMEOUT = 30
+MAX_REDIRECTS = 10
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+
+
+def _require_aiohttp():
+    if aiohttp is None:
+        raise ImportError("AsyncXiaomiClient requires aiohttp (pip install aiohttp)")
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+    """
+    Create an aiohttp session to share between AsyncXiaomiClient instances.
+
+    Cookies are kept per client rather than in the session, so the session can
+    be shared by different users. Must be called with a running event loop.
+
+    Args:
+        pool_size: Max simultaneous connections across all clients.
+        timeout: Total timeout per request in seconds.
+    """
+    _require_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=pool_size),
+        cookie_jar=aiohttp.DummyCookieJar(),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+def is_retryable_async_error(exc):
+    """is_retryable_error plus aiohttp's connection errors and timeouts."""
+    if is_retryable_error(exc):
+        return True
+    return isinstance(exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+class AsyncXiaomiClient(XiaomiClientBase):
+    def __init__(self, username=None, password=None, region="cn", session=None, limiter=None,
+                 retry_policy=None):
+        """
+        Args:
+            session: aiohttp.ClientSession from create_session(), shared by all
+                     clients. If omitted the client creates (and closes) its own.
+            limiter: Optional async context manager (e.g.
+                     utils.rate_limit.AsyncServiceLimiter) entered around every
+                     HTTP call.
+            retry_policy: utils.retry.RetryPolicy used for paged data requests.
+        """
+        _require_aiohttp()
+        super().__init__(username, password, region, retry_policy)
+        self._session = session
+        self._owns_session = session is None
+        self.limiter = limiter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the session if this client created it."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = create_session()
+        return self._session
+
+    async def _limited(self, coro_factory):
+        if self.limiter is None:
+            return await coro_factory()
+        async with self.limiter:
+            return await coro_factory()
+
+    def _store_cookies(self, resp):
+        for name, morsel in resp.cookies.items():
+            self.cookies[name] = morsel.value
+
+    async def _get(self, url, headers=None):
+        """
+        GET following redirects by hand: the shared session keeps no cookies,
+        so each hop sends the client's cookies, including those set by earlier
+        hops of the same chain (serviceLogin -> auth location -> ...).
+        """
+        headers = dict(headers or {})
+        # Cookies passed explicitly (e.g. userId/passToken) are sent on every hop
+        base_cookies = dict(
+            part.strip().split("=", 1) for part in headers.pop("Cookie", "").split(";") if "=" in part)
+
+        async def do_get(url):
+            cookies = {**base_cookies, **self.cookies}
+            if cookies:
+                headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+            async with self.session.get(url, headers=headers, allow_redirects=False) as resp:
+                text = await resp.text()
+                self._store_cookies(resp)
+                return resp.status, resp.headers.get("Location"), text, resp.headers.get("Date")
+
+        for _ in range(MAX_REDIRECTS + 1):
+            status, location, text, server_date = await self._limited(lambda: do_get(url))
+            if status not in REDIRECT_STATUSES or not location:
+                return text, server_date
+            url = urljoin(url, location)
+        raise Exception(f"Too many redirects while fetching {url}")
+
+    async def login_from_token(self):
+        """
+        Validates the token and sets up the session.
+        Needs user_id, pass_token to be set.
+        """
+        url, headers = self._token_login_request()
+
+        _LOGGER.info("Attempting login with token...")
+        text, _ = await self._get(url, headers=headers)
+
+        auth_location = self._apply_login_response(text)
+        if auth_location:
+            _, server_date = await self._get(auth_location)
+            self._apply_server_date(server_date)
+
+        return self._token_data()
+
+    async def request(self, api_url, params):
+        try:
+            return await self._request(api_url, params)
+        except XiaomiRequestError as e:
+            if e.status_code != 401 or not self.session_resumed:
+                raise
+        # The cached session expired early: log in again and retry once
+        _LOGGER.info("Cached Xiaomi session was rejected, logging in again...")
+        token_data = await self.login_from_token()
+        if self.on_relogin:
+            self.on_relogin(token_data)
+        return await self._request(api_url, params)
+
+    async def _request(self, api_url, params):
+        final_data, signed_nonce = self._sign_request(api_url, params)
+        headers = self._request_headers(self.cookies)
+
+        body = urlencode(final_data)
+
+        async def do_post():
+            started = time.perf_counter()
+            try:
+                async with self.session.post(self.base_url + api_url, data=body, headers=headers) as resp:
+                    result = resp.status, await resp.read(), resp.headers.get("Retry-After")
+            except Exception:
+                observe_request("xiaomi", api_url, "error", time.perf_counter() - started)
+                raise
+            observe_request("xiaomi", api_url, result[0], time.perf_counter() - started)
+            return result
+
+        status, content, retry_after = await self._limited(do_post)
+        self.bytes_sent += len(body)
+        self.bytes_received += len(content)
+        text = content.decode("utf-8", errors="replace")
+        return self._decode_response(status, text, retry_after, signed_nonce)
+
+    async def _request_with_retry(self, api_url, params, parse=None):
+        async def attempt():
+            data = await self.request(api_url, params)
+            return parse(data) if parse else data
+
+        return await self.retry_policy.call_async(
+            attempt,
+            is_retryable_async_error,
+            self._on_retry
+        )
+
+    async def get_fitness_data_by_time(self, key="weight", start_time=1, end_time=None, next_key=None):
+        """Async version of XiaomiClient.get_fitness_data_by_time."""
+        all_data = []
+        async for data_list in self.iter_fitness_data_pages(key, start_time, end_time, next_key):
+            all_data.extend(data_list)
+
+        _LOGGER.info(
+            f"Successfully fetched {len(all_data)} items of {key} data")
+        return all_data
+
+    async def iter_fitness_data_pages(self, key="weight", start_time=1, end_time=None, next_key=None):
+        """Async version of XiaomiClient.iter_fitness_data_pages."""
+        if end_time is None:
+            end_time = self._default_end_time()
+
+        _LOGGER.info(f"Fetching {key} data using new API...")
+
+        has_more = next_key is not None
+
+        try:
+            while True:
+                req_params = self._fitness_page_params(key, start_time, end_time, next_key)
+                data_list, has_more, next_key = await self._request_with_retry(
+                    self.FITNESS_API, req_params, self._parse_fitness_page)
+
+                yield data_list
+
+                if not has_more or not next_key:
+                    break
+        finally:
+            self._finish_fitness_paging(next_key, has_more)
+
+    async def get_model_weights(self, model, since=None):
+        """Async version of XiaomiClient.get_model_weights."""
+        all_weights = []
+        async for weights in self.iter_model_weight_pages(model, since):
+            all_weights.extend(weights)
+        return all_weights
+
+    async def iter_model_weight_pages(self, model, since=None):
+        """Async version of XiaomiClient.iter_model_weight_pages."""
+        _LOGGER.info(f"Fetching data for model: {model}...")
+        ts = int(time.time() * 1000)
+        end_time = int(since) + 1 if since else 1
+
+        while ts > 0:
+            req_params = self._model_page_params(model, ts, end_time)
+            items = await self._request_with_retry(self.MODEL_API, req_params, self._parse_model_page)
+
+            if not items:
+                break
+
+            weights, last_create_time = unmarshal_scale_data(items)
+            yield weights
+
+            if len(items) < self.MODEL_PAGE_SIZE:
+                break
+
+            ts = last_create_time
@@ -8,12 +8,12 @@ import os
 import struct
 import logging
 import email.utils
+from contextlib import nullcontext
 
-# Try to import curlify for debugging, but don't fail if missing
-try:
-    import curlify
-except ImportError:
-    curlify = None
+from xiaomi.models import WeightRecord
+from xiaomi.rc4 import rc4_drop1024
+from utils.retry import RetryPolicy, parse_retry_after
+from utils.metrics import observe_request
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -48,6 +48,20 @@ def parse_any_int(v):
     return 0
 
 
+def _scale_body_fields(v):
+    """Body composition fields shared by the legacy scale payload formats."""
+    return dict(
+        BodyFat=parse_any_float(v.get("bfp")),
+        BodyWater=parse_any_float(v.get("bwp")),
+        BoneMass=parse_any_float(v.get("bmc")),
+        MetabolicAge=parse_any_int(v.get("ma")),
+        MuscleMass=parse_any_float(v.get("smm")),
+        VisceralFat=parse_any_int(v.get("vfl")),
+        BasalMetabolism=parse_any_int(v.get("bmr")),
+        BodyScore=parse_any_int(v.get("sbc")),
+    )
+
+
 def unmarshal_scale_data(items):
     weights = []
     last_create_time = 0
@@ -63,56 +77,27 @@ def unmarshal_scale_data(items):
         except:
             continue
 
-        w = {}
-        # Convert ms timestamp to readable string
-        w['Date'] = time.strftime(
-            '%Y-%m-%d %H:%M:%S', time.localtime(create_time / 1000))
-        w['Timestamp'] = create_time / 1000
-        w['Source'] = from_source
-
-        if from_source == 1:
-            w['Weight'] = parse_any_float(v2.get("weight"))
-            w['BMI'] = parse_any_float(v2.get("bmi"))
-            w['BodyFat'] = parse_any_float(v2.get("bfp"))
-            w['BodyWater'] = parse_any_float(v2.get("bwp"))
-            w['BoneMass'] = parse_any_float(v2.get("bmc"))
-            w['MetabolicAge'] = parse_any_int(v2.get("ma"))
-            w['MuscleMass'] = parse_any_float(v2.get("smm"))
-            w['VisceralFat'] = parse_any_int(v2.get("vfl"))
-            w['BasalMetabolism'] = parse_any_int(v2.get("bmr"))
-            w['BodyScore'] = parse_any_int(v2.get("sbc"))
-
-        elif from_source == 2:
-            w['Weight'] = parse_any_float(v2.get("weight"))
-            w['BMI'] = parse_any_float(v2.get("bmi"))
-            w['BodyFat'] = parse_any_float(v2.get("bfp"))
-            w['BodyWater'] = parse_any_float(v2.get("bwp"))
-            w['BoneMass'] = parse_any_float(v2.get("bmc"))
-            w['MetabolicAge'] = parse_any_int(v2.get("ma"))
-            w['MuscleMass'] = parse_any_float(v2.get("smm"))
-            w['VisceralFat'] = parse_any_int(v2.get("vfl"))
-            w['BasalMetabolism'] = parse_any_int(v2.get("bmr"))
-            w['BodyScore'] = parse_any_int(v2.get("sbc"))
+        w = WeightRecord(Timestamp=create_time / 1000, Source=from_source)
+
+        if from_source in (1, 2):
+            w.Weight = parse_any_float(v2.get("weight"))
+            w.BMI = parse_any_float(v2.get("bmi"))
+            for name, value in _scale_body_fields(v2).items():
+                setattr(w, name, value)
 
         elif from_source == 3:
-            w['Weight'] = parse_any_float(v2.get("weight"))
-            w['BMI'] = parse_any_float(v2.get("bmi"))
-            w['HeartRate'] = v2.get("heartRate")
+            w.Weight = parse_any_float(v2.get("weight"))
+            w.BMI = parse_any_float(v2.get("bmi"))
+            w.HeartRate = v2.get("heartRate")
 
             body_res_data = v2.get("bodyResData")
             if body_res_data:
                 try:
-                    v3 = json.loads(body_res_data)
-                    w['BodyFat'] = parse_any_float(v3.get("bfp"))
-                    w['BodyWater'] = parse_any_float(v3.get("bwp"))
-                    w['BoneMass'] = parse_any_float(v3.get("bmc"))
-                    w['MetabolicAge'] = parse_any_int(v3.get("ma"))
-                    w['MuscleMass'] = parse_any_float(v3.get("smm"))
-                    w['VisceralFat'] = parse_any_int(v3.get("vfl"))
-                    w['BasalMetabolism'] = parse_any_int(v3.get("bmr"))
-                    w['BodyScore'] = parse_any_int(v3.get("sbc"))
+                    body_fields = _scale_body_fields(json.loads(body_res_data))
                 except:
-                    pass
+                    body_fields = {}
+                for name, value in body_fields.items():
+                    setattr(w, name, value)
 
         weights.append(w)
 
@@ -132,6 +117,9 @@ def unmarshal_fitness_data(data_list):
         "update_time": update time,
         "zone_name": "Time zone name"
     }
+
+    Returns:
+        List of WeightRecord.
     """
     weights = []
 
@@ -148,43 +136,93 @@ def unmarshal_fitness_data(data_list):
             _LOGGER.warning(f"Failed to parse value data: {value_str}")
             continue
 
-        w = {}
-        # Convert timestamp (in seconds) to readable format
-        w['Date'] = time.strftime(
-            '%Y-%m-%d %H:%M:%S', time.localtime(time_stamp))
-        w['Timestamp'] = time_stamp
-        w['Sid'] = item.get("sid")
-        w['ZoneOffset'] = item.get("zone_offset")
-        w['ZoneName'] = item.get("zone_name")
-        w['UpdateTime'] = item.get("update_time")
-
-        # Parse body data from value
-        w['Weight'] = parse_any_float(value_data.get("weight"))
-        w['BMI'] = parse_any_float(value_data.get("bmi"))
-        w['BodyFat'] = parse_any_float(value_data.get("body_fat_rate"))
-        w['BodyWater'] = parse_any_float(value_data.get("moisture_rate"))
-        w['BoneMass'] = parse_any_float(value_data.get("bone_mass"))
-        w['MetabolicAge'] = parse_any_int(value_data.get("ma"))
-        w['MuscleMass'] = parse_any_float(value_data.get(
-            "muscle_rate")) / 100 * parse_any_float(value_data.get("weight"))
-        w['VisceralFat'] = parse_any_int(value_data.get("visceral_fat"))
-        w['BasalMetabolism'] = parse_any_int(
-            value_data.get("basal_metabolism"))
-        w['BodyScore'] = parse_any_int(value_data.get("sbc"))
-        w['HeartRate'] = parse_any_int(value_data.get("heartRate"))
-        w['ProteinRate'] = parse_any_float(value_data.get("protein_rate"))
-        weights.append(w)
+        weight = parse_any_float(value_data.get("weight"))
+        weights.append(WeightRecord(
+            Timestamp=time_stamp,
+            Sid=item.get("sid"),
+            ZoneOffset=item.get("zone_offset"),
+            ZoneName=item.get("zone_name"),
+            UpdateTime=item.get("update_time"),
+            # Parse body data from value
+            Weight=weight,
+            BMI=parse_any_float(value_data.get("bmi")),
+            BodyFat=parse_any_float(value_data.get("body_fat_rate")),
+            BodyWater=parse_any_float(value_data.get("moisture_rate")),
+            BoneMass=parse_any_float(value_data.get("bone_mass")),
+            MetabolicAge=parse_any_int(value_data.get("ma")),
+            MuscleMass=parse_any_float(value_data.get("muscle_rate")) / 100 * weight,
+            VisceralFat=parse_any_int(value_data.get("visceral_fat")),
+            BasalMetabolism=parse_any_int(value_data.get("basal_metabolism")),
+            BodyScore=parse_any_int(value_data.get("sbc")),
+            HeartRate=parse_any_int(value_data.get("heartRate")),
+            ProteinRate=parse_any_float(value_data.get("protein_rate")),
+        ))
     return weights
 
 
-class XiaomiClient:
-    def __init__(self, username=None, password=None, region="cn"):
+# HTTP status codes treated as transient (throttling / server side)
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# JSON `code` values of a 200 response that mean the same (the API echoes
+# throttling / overload in the body instead of the HTTP status)
+RETRYABLE_API_CODES = RETRYABLE_STATUS_CODES
+
+
+class XiaomiRequestError(Exception):
+    """HTTP-level failure of a Xiaomi API request."""
+
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(f"Request failed: {status_code} {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class XiaomiAPIError(Exception):
+    """The API answered but reported an error (non-zero code or malformed result)."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def is_retryable_error(exc):
+    """Whether a failed request is worth retrying (throttling, 5xx, network errors)."""
+    if isinstance(exc, XiaomiRequestError):
+        return exc.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, XiaomiAPIError):
+        return exc.code in RETRYABLE_API_CODES
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def _log_curl(request):
+    """Log a request as a curl command (debug only; curlify is optional and imported on first use)."""
+    try:
+        import curlify
+    except ImportError:
+        return
+    _LOGGER.debug(curlify.to_curl(request))
+
+
+class XiaomiClientBase:
+    """
+    Transport-independent parts of the Xiaomi health API client: credentials,
+    request signing/encryption and response parsing. XiaomiClient (requests)
+    and xiaomi.async_client.AsyncXiaomiClient (aiohttp) add the HTTP calls.
+    """
+
+    # Overridable (e.g. to point at benchmarks/mock_servers for load tests)
+    ACCOUNT_URL = os.environ.get("XIAOMI_ACCOUNT_URL", "https://account.xiaomi.com")
+    API_URL = os.environ.get("XIAOMI_API_URL")
+
+    FITNESS_API = "/app/v1/data/get_fitness_data_by_time"
+    MODEL_API = "/app/v1/eco/api_proxy"
+    MODEL_PAGE_SIZE = 20
+
+    def __init__(self, username=None, password=None, region="cn", retry_policy=None):
         self.username = username
         self.password = password
         self.region = region
         self.sid = APP_ID
-        self.session = requests.Session()
-        # self.session.headers.update({"User-Agent": USER_AGENT})
 
         # Credentials
         self.user_id = None
@@ -194,6 +232,22 @@ class XiaomiClient:
         self.cookies = {}
         self.time_offset = 0
 
+        # Set when the login state came from xiaomi.session.XiaomiSessionCache
+        # instead of serviceLogin; on_relogin(token_data) is called if the API
+        # rejects it and the client logs in again
+        self.session_resumed = False
+        self.on_relogin = None
+
+        # next_key to resume paging from when the last fetch stopped early
+        self.fitness_next_key = None
+
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Number of retried requests since the client was created
+        self.retry_count = 0
+        # Body bytes of signed API requests/responses since the client was created
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
     def set_credentials(self, user_id, ssecurity_encoded, pass_token):
         self.user_id = user_id
         # ssecurity is usually base64 encoded string when stored
@@ -217,55 +271,43 @@ class XiaomiClient:
         return m.digest()
 
     def _rc4_encrypt(self, key, data):
-        S = list(range(256))
-        j = 0
-        for i in range(256):
-            j = (j + S[i] + key[i % len(key)]) % 256
-            S[i], S[j] = S[j], S[i]
-
-        i = j = 0
-        for _ in range(1024):
-            i = (i + 1) % 256
-            j = (j + S[i]) % 256
-            S[i], S[j] = S[j], S[i]
-
-        out = []
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-
-        for char in data:
-            i = (i + 1) % 256
-            j = (j + S[i]) % 256
-            S[i], S[j] = S[j], S[i]
-            out.append(char ^ S[(S[i] + S[j]) % 256])
-
-        return bytes(out)
+        return rc4_drop1024(key, data)
 
-    def login_from_token(self):
-        """
-        Validates the token and sets up the session.
-        Needs user_id, pass_token to be set.
-        """
+    @property
+    def base_url(self):
+        if self.API_URL:
+            return self.API_URL
+        return "https://hlth.io.mi.com" if self.region == "cn" else f"https://{self.region}.hlth.io.mi.com"
+
+    # --- login ---
+
+    def _token_login_request(self):
+        """URL and headers of the serviceLogin call that validates the token."""
         if not self.user_id or not self.pass_token:
             raise Exception("Missing credentials for token login")
 
-        _LOGGER.info("Attempting login with token...")
         headers = {
             "Cookie": f"userId={self.user_id}; passToken={self.pass_token}",
             "User-Agent": USER_AGENT
         }
+        url = f"{self.ACCOUNT_URL}/pass/serviceLogin?_json=true&sid={self.sid}"
+        return url, headers
 
-        url = f"https://account.xiaomi.com/pass/serviceLogin?_json=true&sid={self.sid}"
-        resp = self.session.get(url, headers=headers)
+    def _apply_login_response(self, text):
+        """
+        Parse the serviceLogin response and update the credentials.
 
+        Returns:
+            The auth `location` URL to visit next (may be None).
+        """
         try:
-            txt = resp.text
+            txt = text
             if txt.startswith("&&&START&&&"):
                 txt = txt[11:]
             data = json.loads(txt)
         except Exception as e:
             raise Exception(
-                f"Failed to parse login response: {resp.text}") from e
+                f"Failed to parse login response: {text}") from e
 
         if data.get("code") != 0:
             raise Exception(f"Login with token failed: {data}")
@@ -278,18 +320,43 @@ class XiaomiClient:
         if "passToken" in data:
             self.pass_token = data["passToken"]
 
-        auth_location = data.get("location")
-        if auth_location:
-            resp2 = self.session.get(auth_location)
-            # Calculate time offset
-            server_date = resp2.headers.get("Date")
-            if server_date:
-                server_ts = email.utils.mktime_tz(
-                    email.utils.parsedate_tz(server_date))
-                self.time_offset = server_ts - time.time()
-                _LOGGER.info(
-                    f"Synchronized time with server. Offset: {self.time_offset:.2f}s")
+        return data.get("location")
 
+    def _apply_server_date(self, server_date):
+        """Calculate the time offset used in nonces from the server's Date header."""
+        if server_date:
+            server_ts = email.utils.mktime_tz(
+                email.utils.parsedate_tz(server_date))
+            self.time_offset = server_ts - time.time()
+            _LOGGER.info(
+                f"Synchronized time with server. Offset: {self.time_offset:.2f}s")
+
+    def _session_cookies(self):
+        return dict(self.cookies)
+
+    def _restore_cookies(self, cookies):
+        self.cookies.update(cookies)
+
+    def export_session(self):
+        """Login state produced by login_from_token (see xiaomi.session)."""
+        return {
+            "user_id": self.user_id,
+            "ssecurity": base64.b64encode(self.ssecurity).decode('utf-8') if self.ssecurity else None,
+            "time_offset": self.time_offset,
+            "cookies": self._session_cookies(),
+        }
+
+    def restore_session(self, state):
+        """Restore export_session() output instead of calling login_from_token."""
+        self.user_id = state["user_id"]
+        if state.get("ssecurity"):
+            self.ssecurity = base64.b64decode(state["ssecurity"])
+        self.time_offset = state.get("time_offset", 0)
+        self._restore_cookies(state.get("cookies") or {})
+        self.session_resumed = True
+
+    def _token_data(self):
+        self.session_resumed = False
         _LOGGER.info("Login with token successful!")
         return {
             "userId": self.user_id,
@@ -297,9 +364,15 @@ class XiaomiClient:
             "ssecurity": base64.b64encode(self.ssecurity).decode('utf-8') if self.ssecurity else None
         }
 
-    def request(self, api_url, params):
-        base_url = "https://hlth.io.mi.com" if self.region == "cn" else f"https://{self.region}.hlth.io.mi.com"
+    # --- signed requests ---
 
+    def _sign_request(self, api_url, params):
+        """
+        Encrypt and sign request parameters.
+
+        Returns:
+            (form data to POST, signed nonce needed to decrypt the response)
+        """
         nonce = self._gen_nonce()
         signed_nonce = self._gen_signed_nonce(self.ssecurity, nonce)
 
@@ -324,37 +397,223 @@ class XiaomiClient:
             "signature": signature,
             "_nonce": base64.b64encode(nonce).decode('utf-8')
         }
+        return final_data, signed_nonce
 
+    @staticmethod
+    def _request_headers(cookies_dict):
         headers = {
             "Content-Type": "application/x-www-form-urlencoded"
         }
-
-        cookies_dict = self.session.cookies.get_dict()
         if cookies_dict:
             cookie_str = "; ".join(
                 [f"{k}={v}" for k, v in cookies_dict.items()])
             headers["Cookie"] = cookie_str
+        return headers
 
-        resp = self.session.post(
-            base_url + api_url, data=final_data, headers=headers)
-        if curlify:
-            _LOGGER.debug(curlify.to_curl(resp.request))
-
-        if resp.status_code != 200:
-            raise Exception(f"Request failed: {resp.status_code} {resp.text}")
+    def _decode_response(self, status_code, text, retry_after_header, signed_nonce):
+        """Check the HTTP status and decrypt the response body."""
+        if status_code != 200:
+            raise XiaomiRequestError(
+                status_code, text,
+                retry_after=parse_retry_after(retry_after_header))
 
         try:
-            resp_bytes = base64.b64decode(resp.text)
+            resp_bytes = base64.b64decode(text)
             decrypted = self._rc4_encrypt(signed_nonce, resp_bytes)
-            return json.loads(decrypted)
+            data = json.loads(decrypted)
         except Exception:
             # Sometimes it might not be encrypted or just error json
             try:
-                return json.loads(resp.text)
+                data = json.loads(text)
             except:
-                return resp.text
+                return text
+
+        if isinstance(data, dict) and data.get("code") in RETRYABLE_API_CODES:
+            raise XiaomiAPIError(
+                f"API throttled: {data.get('message', data.get('code'))}", code=data.get("code"))
+        return data
+
+    def _on_retry(self, retry, exc, delay):
+        self.retry_count += 1
+
+    # --- paging ---
+
+    @staticmethod
+    def _fitness_page_params(key, start_time, end_time, next_key):
+        # Build request parameters
+        params = {
+            "start_time": start_time,
+            "end_time": end_time,
+            "key": key
+        }
+
+        if next_key:
+            params["next_key"] = next_key
+
+        return json.dumps(params, separators=(',', ':'))
 
-    def get_fitness_data_by_time(self, key="weight", start_time=1, end_time=None):
+    @staticmethod
+    def _parse_fitness_page(data):
+        """
+        Returns:
+            (data_list, has_more, next_key) of a get_fitness_data_by_time page.
+        """
+        # Parse response - API returns: {"code": 0, "result": {"data_list": [...], "has_more": ..., "next_key": ...}}
+        if not isinstance(data, dict):
+            raise XiaomiAPIError(f"Unexpected response type: {type(data)}")
+
+        # Check API response code
+        if data.get("code") != 0:
+            raise XiaomiAPIError(
+                f"API returned error: {data.get('message', 'unknown error')}",
+                code=data.get("code"))
+
+        # Get data from result
+        result = data.get("result", {})
+        return result.get("data_list", []), result.get("has_more", False), result.get("next_key")
+
+    def _model_page_params(self, model, ts, end_time):
+        inner_params = {
+            "param": {"endTime": end_time, "beginTime": ts},
+            "model": model,
+            "uid": int(self.user_id),
+            "did": 0
+        }
+        outer_params = {
+            "eco_api": "eco/scale/getData",
+            "params": json.dumps(inner_params, separators=(',', ':'))
+        }
+        return json.dumps(outer_params, separators=(',', ':'))
+
+    @staticmethod
+    def _parse_model_page(data):
+        """
+        Returns:
+            The raw items of an eco/scale/getData page (empty at the end).
+        """
+        if not isinstance(data, dict):
+            raise XiaomiAPIError(f"Unexpected response type: {type(data)}")
+
+        if data.get("code") != 0:
+            raise XiaomiAPIError(f"API Error: {data}", code=data.get("code"))
+
+        res_result = data.get("result", {})
+        resp_str = res_result.get("resp")
+
+        if not resp_str:
+            return []
+
+        try:
+            inner_resp = json.loads(resp_str)
+        except ValueError as e:
+            raise XiaomiAPIError(f"Malformed inner response: {resp_str[:200]}") from e
+
+        if inner_resp.get("code") != 0:
+            raise XiaomiAPIError(f"Inner API Error: {inner_resp}", code=inner_resp.get("code"))
+
+        return inner_resp.get("result", [])
+
+    @staticmethod
+    def _default_end_time():
+        # Default end time: current time + 24 hours (in seconds)
+        return int(time.time()) + 24 * 60 * 60
+
+    def _finish_fitness_paging(self, next_key, has_more):
+        self.fitness_next_key = next_key if has_more else None
+        if self.fitness_next_key:
+            _LOGGER.warning(
+                f"Paging stopped early, next fetch resumes from next_key={self.fitness_next_key}")
+
+
+class XiaomiClient(XiaomiClientBase):
+    def __init__(self, username=None, password=None, region="cn", limiter=None, retry_policy=None):
+        """
+        Args:
+            limiter: Optional context manager (e.g. utils.rate_limit.ServiceLimiter)
+                     entered around every HTTP call; shared between clients to
+                     bound concurrency and request rate across users.
+            retry_policy: utils.retry.RetryPolicy used for paged data requests
+                          (default: 4 attempts with exponential backoff).
+        """
+        super().__init__(username, password, region, retry_policy)
+        self.session = requests.Session()
+        self.limiter = limiter or nullcontext()
+        # self.session.headers.update({"User-Agent": USER_AGENT})
+
+    def _session_cookies(self):
+        return self.session.cookies.get_dict()
+
+    def _restore_cookies(self, cookies):
+        self.session.cookies.update(cookies)
+
+    def login_from_token(self):
+        """
+        Validates the token and sets up the session.
+        Needs user_id, pass_token to be set.
+        """
+        url, headers = self._token_login_request()
+
+        _LOGGER.info("Attempting login with token...")
+        with self.limiter:
+            resp = self.session.get(url, headers=headers)
+
+        auth_location = self._apply_login_response(resp.text)
+        if auth_location:
+            with self.limiter:
+                resp2 = self.session.get(auth_location)
+            self._apply_server_date(resp2.headers.get("Date"))
+
+        return self._token_data()
+
+    def request(self, api_url, params):
+        try:
+            return self._request(api_url, params)
+        except XiaomiRequestError as e:
+            if e.status_code != 401 or not self.session_resumed:
+                raise
+        # The cached session expired early: log in again and retry once
+        _LOGGER.info("Cached Xiaomi session was rejected, logging in again...")
+        token_data = self.login_from_token()
+        if self.on_relogin:
+            self.on_relogin(token_data)
+        return self._request(api_url, params)
+
+    def _request(self, api_url, params):
+        final_data, signed_nonce = self._sign_request(api_url, params)
+        headers = self._request_headers(self.session.cookies.get_dict())
+
+        with self.limiter:
+            started = time.perf_counter()
+            try:
+                resp = self.session.post(
+                    self.base_url + api_url, data=final_data, headers=headers)
+            except Exception:
+                observe_request("xiaomi", api_url, "error", time.perf_counter() - started)
+                raise
+            observe_request("xiaomi", api_url, resp.status_code, time.perf_counter() - started)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _log_curl(resp.request)
+        self.bytes_sent += len(resp.request.body or b"")
+        self.bytes_received += len(resp.content)
+
+        return self._decode_response(
+            resp.status_code, resp.text, resp.headers.get("Retry-After"), signed_nonce)
+
+    def _request_with_retry(self, api_url, params, parse=None):
+        """
+        request() with the client's retry policy.
+
+        Every attempt re-sends the same page parameters, so paging resumes from
+        the same next_key/ts instead of restarting. `parse` runs inside the
+        retry loop, so throttling codes in the parsed body are retried too.
+        """
+        return self.retry_policy.call(
+            lambda: parse(self.request(api_url, params)) if parse else self.request(api_url, params),
+            is_retryable_error,
+            self._on_retry
+        )
+
+    def get_fitness_data_by_time(self, key="weight", start_time=1, end_time=None, next_key=None):
         """
         Get health data using the new API endpoint.
         API: /app/v1/data/get_fitness_data_by_time
@@ -364,126 +623,94 @@ class XiaomiClient:
             key: Data type, e.g. "weight", "steps", "sleep", etc.
             start_time: Start timestamp (in seconds), defaults to 1 for earliest
             end_time: End timestamp (in seconds), defaults to current time + 24 hours
+            next_key: Paging key to resume from (as left in `fitness_next_key`
+                      by a previous, interrupted fetch)
 
         Returns:
-            List of all retrieved data
+            List of all retrieved data.
+
+        Raises:
+            XiaomiRequestError / XiaomiAPIError if a page still fails after
+            retries; `self.fitness_next_key` then holds the key of that page.
+        """
+        all_data = []
+        for data_list in self.iter_fitness_data_pages(key, start_time, end_time, next_key):
+            all_data.extend(data_list)
+
+        _LOGGER.info(
+            f"Successfully fetched {len(all_data)} items of {key} data")
+        return all_data
+
+    def iter_fitness_data_pages(self, key="weight", start_time=1, end_time=None, next_key=None):
+        """
+        Page-by-page variant of get_fitness_data_by_time.
+
+        Yields:
+            The raw `data_list` of each page as soon as it arrives.
         """
         if end_time is None:
-            # Default end time: current time + 24 hours (in seconds)
-            end_time = int(time.time()) + 24 * 60 * 60
+            end_time = self._default_end_time()
 
         _LOGGER.info(f"Fetching {key} data using new API...")
 
-        all_data = []
-        next_key = None
+        has_more = next_key is not None
 
-        while True:
-            # Build request parameters
-            params = {
-                "start_time": start_time,
-                "end_time": end_time,
-                "key": key
-            }
+        try:
+            while True:
+                req_params = self._fitness_page_params(key, start_time, end_time, next_key)
 
-            if next_key:
-                params["next_key"] = next_key
+                # Errors propagate so that a truncated history is never
+                # mistaken for a complete one
+                data_list, has_more, next_key = self._request_with_retry(
+                    self.FITNESS_API, req_params, self._parse_fitness_page)
 
-            req_params = json.dumps(params, separators=(',', ':'))
+                yield data_list
 
-            try:
-                # Call the new API endpoint
-                data = self.request(
-                    "/app/v1/data/get_fitness_data_by_time", req_params)
-
-                # Parse response - API returns: {"code": 0, "result": {"data_list": [...], "has_more": ..., "next_key": ...}}
-                if isinstance(data, dict):
-                    # Check API response code
-                    if data.get("code") != 0:
-                        _LOGGER.error(
-                            f"API returned error: {data.get('message', 'unknown error')}")
-                        break
-
-                    # Get data from result
-                    result = data.get("result", {})
-                    data_list = result.get("data_list", [])
-                    has_more = result.get("has_more", False)
-                    next_key = result.get("next_key")
-
-                    all_data.extend(data_list)
-
-                    # Check if there is more data
-                    if not has_more or not next_key:
-                        break
-                else:
-                    _LOGGER.warning(f"Unexpected response type: {type(data)}")
+                # Check if there is more data
+                if not has_more or not next_key:
                     break
+        finally:
+            self._finish_fitness_paging(next_key, has_more)
 
-            except Exception as e:
-                _LOGGER.error(f"Request failed: {e}")
-                break
-
-        _LOGGER.info(
-            f"Successfully fetched {len(all_data)} items of {key} data")
-        return all_data
-
-    def get_model_weights(self, model):
+    def get_model_weights(self, model, since=None):
         """
         Legacy API method (kept for compatibility).
         It is recommended to use get_fitness_data_by_time("weight") instead.
-        """
-        _LOGGER.info(f"Fetching data for model: {model}...")
-        ts = int(time.time() * 1000)
-        all_weights = []
-
-        while ts > 0:
-            inner_params = {
-                "param": {"endTime": 1, "beginTime": ts},
-                "model": model,
-                "uid": int(self.user_id),
-                "did": 0
-            }
-            outer_params = {
-                "eco_api": "eco/scale/getData",
-                "params": json.dumps(inner_params, separators=(',', ':'))
-            }
-            req_params = json.dumps(outer_params, separators=(',', ':'))
 
-            try:
-                data = self.request("/app/v1/eco/api_proxy", req_params)
-            except Exception as e:
-                _LOGGER.error(f"Request failed: {e}")
-                break
-
-            if isinstance(data, dict) and data.get("code") != 0:
-                _LOGGER.error(f"API Error: {data}")
-                break
-
-            res_result = data.get("result", {})
-            resp_str = res_result.get("resp")
+        Args:
+            model: Scale model, e.g. "yunmai.scales.ms103"
+            since: Only fetch records with createTime (in ms) newer than this
 
-            if not resp_str:
-                break
+        Raises:
+            XiaomiRequestError / XiaomiAPIError if a page still fails after retries.
+        """
+        all_weights = []
+        for weights in self.iter_model_weight_pages(model, since):
+            all_weights.extend(weights)
+        return all_weights
 
-            try:
-                inner_resp = json.loads(resp_str)
-            except:
-                break
+    def iter_model_weight_pages(self, model, since=None):
+        """
+        Page-by-page variant of get_model_weights.
 
-            if inner_resp.get("code") != 0:
-                _LOGGER.error(f"Inner API Error: {inner_resp}")
-                break
+        Yields:
+            The parsed weight records of each page as soon as it arrives.
+        """
+        _LOGGER.info(f"Fetching data for model: {model}...")
+        ts = int(time.time() * 1000)
+        end_time = int(since) + 1 if since else 1
 
-            items = inner_resp.get("result", [])
+        while ts > 0:
+            req_params = self._model_page_params(model, ts, end_time)
+            items = self._request_with_retry(self.MODEL_API, req_params, self._parse_model_page)
 
             if not items:
                 break
 
             weights, last_create_time = unmarshal_scale_data(items)
-            all_weights.extend(weights)
+            yield weights
 
-            if len(items) < 20:
+            if len(items) < self.MODEL_PAGE_SIZE:
                 break
 
             ts = last_create_time
-
-        return all_weights
@@ -1,12 +1,15 @@
-
 import json
 import os
 from typing import Dict, List, Optional
 
+from utils.atomic_file import FileLock, atomic_write
+
 class ConfigManager:
     def __init__(self, config_file: str = "users.json"):
         self.config_file = config_file
         self.config_data = self._load_config()
+        # Shared with core.config_manager, so the CLI, GUI and daemon do not overwrite each other
+        self._file_lock = FileLock(config_file)
 
     def _load_config(self) -> Dict:
         if not os.path.exists(self.config_file):
@@ -20,23 +23,39 @@ class ConfigManager:
 
     def save_config(self):
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config_data, f, indent=4, ensure_ascii=False)
+            with self._file_lock:
+                self._write()
         except Exception as e:
             print(f"Error saving config: {e}")
 
+    def _write(self):
+        atomic_write(self.config_file, json.dumps(self.config_data, indent=4, ensure_ascii=False))
+
     def get_users(self) -> List[Dict]:
         return self.config_data.get("users", [])
 
     def update_user_token(self, username: str, token_data: Dict):
-        for user in self.config_data.get("users", []):
-            if user.get("username") == username:
-                if "token" not in user:
-                    user["token"] = {}
-                user["token"].update(token_data)
-                self.save_config()
-                return
-        
+        try:
+            with self._file_lock:
+                # Apply the change to the latest file contents: another process
+                # may have written the config since it was loaded
+                if os.path.exists(self.config_file):
+                    latest = self._load_config()
+                    if latest.get("users"):
+                        self.config_data = latest
+
+                for user in self.config_data.get("users", []):
+                    if user.get("username") == username:
+                        token = user.setdefault("token", {})
+                        # Only rewrite the config when a value actually changed
+                        if any(str(token.get(k)) != str(v) for k, v in token_data.items()):
+                            token.update(token_data)
+                            self._write()
+                        return
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return
+
         # If user not found (should generally be found if config drives the loop)
         print(f"User {username} not found in config to update token.")
 
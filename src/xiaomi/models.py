@@ -0,0 +1,85 @@
+"""
+Typed weight measurement record.
+
+unmarshal_scale_data / unmarshal_fitness_data return WeightRecord objects
+instead of one dict with ~15 string keys per measurement. Attribute names match
+the former dict keys, and `get()` / `[]` keep dict-style access working for the
+filter, upload ledger and pipeline code, which accept both forms. Plain dicts
+are only produced at the JSON boundary (weight store, export) via to_dict().
+"""
+
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+
+@dataclass(slots=True)
+class WeightRecord:
+    """One scale measurement. Fields left as None were not reported."""
+
+    Timestamp: float  # Unix seconds
+    Weight: Optional[float] = None
+    BMI: Optional[float] = None
+    BodyFat: Optional[float] = None
+    BodyWater: Optional[float] = None
+    BoneMass: Optional[float] = None
+    MetabolicAge: Optional[int] = None
+    MuscleMass: Optional[float] = None
+    VisceralFat: Optional[int] = None
+    BasalMetabolism: Optional[int] = None
+    BodyScore: Optional[int] = None
+    HeartRate: Any = None
+    ProteinRate: Optional[float] = None
+    # Legacy scale API
+    Source: Optional[int] = None
+    # Fitness data API
+    Sid: Optional[str] = None
+    ZoneOffset: Any = None
+    ZoneName: Optional[str] = None
+    UpdateTime: Any = None
+
+    @property
+    def Date(self) -> str:
+        """Local time of the measurement, formatted on demand."""
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.Timestamp))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get() equivalent; unset fields count as missing."""
+        if key not in _KEYS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in _KEYS and getattr(self, key) is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the dict layout used by the weight store and JSON export."""
+        result = {'Date': self.Date}
+        for name in FIELD_NAMES:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WeightRecord":
+        """Build a record from a dict as produced by to_dict() (extra keys are ignored)."""
+        return cls(**{name: data[name] for name in FIELD_NAMES if name in data})
+
+
+FIELD_NAMES = tuple(f.name for f in fields(WeightRecord))
+_KEYS = frozenset(FIELD_NAMES) | {'Date'}
+
+
+def as_dict(weight) -> Dict[str, Any]:
+    """Return `weight` as a dict, whether it is a WeightRecord or already a dict."""
+    return weight.to_dict() if isinstance(weight, WeightRecord) else weight
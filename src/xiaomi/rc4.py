@@ -0,0 +1,97 @@
+"""
+RC4-drop1024 as used by the Xiaomi health API.
+
+The keystream is generated by OpenSSL through `cryptography`'s ARC4 when the
+key size is supported (the signed nonce is a 32-byte SHA-256 digest), and by
+a pure-Python implementation otherwise.
+"""
+
+import logging
+from typing import Tuple, Union
+
+_LOGGER = logging.getLogger(__name__)
+
+DROP_BYTES = 1024
+
+try:
+    # cryptography >= 43 moved ARC4 to the "decrepit" namespace
+    from cryptography.hazmat.decrepit.ciphers.algorithms import ARC4
+except ImportError:
+    try:
+        from cryptography.hazmat.primitives.ciphers.algorithms import ARC4
+    except ImportError:
+        ARC4 = None
+
+if ARC4 is not None:
+    from cryptography.hazmat.primitives.ciphers import Cipher
+    _ARC4_KEY_SIZES = frozenset(ARC4.key_sizes)
+else:
+    Cipher = None
+    _ARC4_KEY_SIZES = frozenset()
+
+_DROP = bytes(DROP_BYTES)
+
+
+def rc4_drop1024(key: bytes, data: Union[bytes, bytearray, memoryview, str]) -> bytes:
+    """
+    Encrypt/decrypt `data` with RC4, discarding the first 1024 keystream bytes.
+
+    Args:
+        key: RC4 key (the request's signed nonce).
+        data: Bytes to process; str is encoded as UTF-8.
+
+    Returns:
+        The processed bytes (RC4 is symmetric).
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    if len(key) * 8 in _ARC4_KEY_SIZES:
+        encryptor = Cipher(ARC4(bytes(key)), mode=None).encryptor()
+        encryptor.update(_DROP)
+        return encryptor.update(data)
+
+    return rc4_drop1024_py(key, data)
+
+
+def _dropped_state(key: bytes) -> Tuple[bytearray, int, int]:
+    """RC4 state (S, i, j) after the KSA and the 1024 discarded rounds."""
+    S = bytearray(range(256))
+    key_len = len(key)
+    j = 0
+    for i in range(256):
+        j = (j + S[i] + key[i % key_len]) & 0xFF
+        S[i], S[j] = S[j], S[i]
+
+    i = j = 0
+    for _ in range(DROP_BYTES):
+        i = (i + 1) & 0xFF
+        j = (j + S[i]) & 0xFF
+        S[i], S[j] = S[j], S[i]
+
+    return S, i, j
+
+
+def rc4_drop1024_py(key: bytes, data: Union[bytes, bytearray, memoryview]) -> bytes:
+    """
+    Pure-Python RC4-drop1024.
+
+    The keystream is generated byte by byte; only the final XOR with `data`
+    is done as a single big-integer operation.
+    """
+    S, i, j = _dropped_state(bytes(key))
+    n = len(data)
+    keystream = bytearray(n)
+
+    for k in range(n):
+        i = (i + 1) & 0xFF
+        si = S[i]
+        j = (j + si) & 0xFF
+        sj = S[j]
+        S[i] = sj
+        S[j] = si
+        keystream[k] = S[(si + sj) & 0xFF]
+
+    return (
+        int.from_bytes(data, 'little') ^ int.from_bytes(keystream, 'little')
+    ).to_bytes(n, 'little')
@@ -0,0 +1,128 @@
+"""
+Cache of Xiaomi login sessions.
+
+login_from_token costs two round trips (serviceLogin and the auth location
+redirect) on every sync, although the service cookies, ssecurity and server
+time offset it produces stay valid for hours. XiaomiSessionCache keeps them per
+user, in memory and optionally as JSON files in a session directory, and
+restores them into a client instead of logging in while they are fresh.
+
+A cached session is only reused for the same userId/passToken. If the API
+rejects a resumed session (HTTP 401), XiaomiClient logs in again and retries
+the request once.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+from utils.atomic_file import atomic_write
+
+_LOGGER = logging.getLogger(__name__)
+
+# How long a login session is reused before serviceLogin runs again
+DEFAULT_SESSION_TTL = 6 * 3600
+
+
+def credentials_fingerprint(user_id, pass_token) -> str:
+    """Hash identifying the token a session was created from (the token itself is not stored)."""
+    return hashlib.sha256(f"{user_id}:{pass_token}".encode("utf-8")).hexdigest()
+
+
+class XiaomiSessionCache:
+    """
+    Args:
+        session_dir: Directory for the per-user session files; None keeps
+                     sessions in memory only.
+        ttl: Seconds a session is reused after login.
+    """
+
+    def __init__(self, session_dir: Optional[Union[str, Path]] = None, ttl: float = DEFAULT_SESSION_TTL):
+        self.session_dir = Path(session_dir) if session_dir else None
+        self.ttl = ttl
+        self._sessions: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def login(self, client, key: str, on_token: Optional[Callable[[dict], None]] = None) -> Optional[dict]:
+        """
+        Resume the cached session of `key` into client, or log in with its token.
+
+        Args:
+            client: XiaomiClient with credentials set (set_credentials).
+            key: Cache key, usually the username.
+            on_token: Called with the new token data if a resumed session is
+                      rejected later and the client has to log in again.
+
+        Returns:
+            The token data from login_from_token, or None if the cached
+            session was reused (the token did not change).
+        """
+        state = self.get(key, credentials_fingerprint(client.user_id, client.pass_token))
+        if state is not None:
+            client.restore_session(state)
+            _LOGGER.info(f"Reusing Xiaomi session of {key} "
+                         f"(expires in {state['expires_at'] - time.time():.0f}s)")
+
+            def relogin(token_data):
+                self.store(key, client)
+                if on_token:
+                    on_token(token_data)
+
+            client.on_relogin = relogin
+            return None
+
+        token_data = client.login_from_token()
+        self.store(key, client)
+        return token_data
+
+    def get(self, key: str, fingerprint: str) -> Optional[dict]:
+        """The unexpired session state of `key` created from the given token, or None."""
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is None:
+                state = self._read(key)
+                if state is not None:
+                    self._sessions[key] = state
+        if state is None or state.get("fingerprint") != fingerprint or state.get("expires_at", 0) <= time.time():
+            return None
+        return state
+
+    def store(self, key: str, client):
+        """Save the client's current session for `key`."""
+        state = client.export_session()
+        state["fingerprint"] = credentials_fingerprint(client.user_id, client.pass_token)
+        state["expires_at"] = time.time() + self.ttl
+        with self._lock:
+            self._sessions[key] = state
+            if self.session_dir is not None:
+                try:
+                    atomic_write(self._path(key), json.dumps(state, indent=2))
+                except OSError as e:
+                    _LOGGER.warning(f"Failed to save Xiaomi session of {key}: {e}")
+
+    def invalidate(self, key: str):
+        """Forget the session of `key` so the next login runs serviceLogin."""
+        with self._lock:
+            self._sessions.pop(key, None)
+            if self.session_dir is not None:
+                self._path(key).unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        # Usernames may be phone numbers or emails; keep the file name safe
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return self.session_dir / f"{name}.json"
+
+    def _read(self, key: str) -> Optional[dict]:
+        if self.session_dir is None:
+            return None
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            _LOGGER.warning(f"Ignoring unreadable Xiaomi session of {key}: {e}")
+            return None
@@ -0,0 +1,167 @@
+"""
+Tests for the asyncio Xiaomi client against a local fake API server.
+"""
+
+import unittest
+import sys
+import asyncio
+import base64
+import hashlib
+import json
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from xiaomi.async_client import aiohttp
+from xiaomi.rc4 import rc4_drop1024
+
+SSECURITY = b"0123456789abcdef"
+PAGES = 3
+
+
+def make_server():
+    """Fake get_fitness_data_by_time: decrypts the request, pages by next_key."""
+    async def fitness(request):
+        form = await request.post()
+        signed_nonce = hashlib.sha256(SSECURITY + base64.b64decode(form["_nonce"])).digest()
+        params = json.loads(rc4_drop1024(signed_nonce, base64.b64decode(form["data"])))
+
+        page = int(params.get("next_key") or 0)
+        result = {
+            "data_list": [{"page": page, "user": request.headers["Cookie"]}],
+            "has_more": page + 1 < PAGES,
+            "next_key": str(page + 1) if page + 1 < PAGES else None,
+        }
+        body = json.dumps({"code": 0, "result": result}).encode()
+        return aiohttp.web.Response(text=base64.b64encode(rc4_drop1024(signed_nonce, body)).decode())
+
+    app = aiohttp.web.Application()
+    app.router.add_post("/app/v1/data/get_fitness_data_by_time", fitness)
+    return app
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp not installed")
+class TestAsyncXiaomiClient(unittest.TestCase):
+    """Many clients share one small connection pool."""
+
+    def test_concurrent_fetches(self):
+        import aiohttp.web
+        from xiaomi.async_client import AsyncXiaomiClient, create_session
+
+        async def run():
+            runner = aiohttp.web.AppRunner(make_server())
+            await runner.setup()
+            site = aiohttp.web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            class LocalClient(AsyncXiaomiClient):
+                base_url = f"http://127.0.0.1:{port}"
+
+            try:
+                async with create_session(pool_size=4) as session:
+                    clients = []
+                    for n in range(50):
+                        client = LocalClient(username=f"user{n}", session=session)
+                        client.set_credentials(str(n), SSECURITY, "token")
+                        client.cookies["userId"] = str(n)
+                        clients.append(client)
+
+                    results = await asyncio.gather(*(
+                        c.get_fitness_data_by_time(start_time=1, end_time=2) for c in clients
+                    ))
+            finally:
+                await runner.cleanup()
+            return results
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(results), 50)
+        for n, data in enumerate(results):
+            self.assertEqual([d["page"] for d in data], [0, 1, 2])
+            # Cookies are per client even though the session is shared
+            self.assertEqual({d["user"] for d in data}, {f"userId={n}"})
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp not installed")
+class TestAsyncLogin(unittest.TestCase):
+    """Token login follows the auth redirects with per-client cookies."""
+
+    def _run(self, scenario):
+        import aiohttp.web
+        from xiaomi.async_client import AsyncXiaomiClient, create_session
+
+        self.logins = 0
+
+        async def service_login(request):
+            self.logins += 1
+            data = {"code": 0, "userId": "7", "passToken": "token",
+                    "ssecurity": base64.b64encode(SSECURITY).decode(),
+                    "location": f"http://{request.host}/auth"}
+            return aiohttp.web.Response(text="&&&START&&&" + json.dumps(data))
+
+        async def auth(request):
+            response = aiohttp.web.Response(status=302, headers={"Location": "/auth2"})
+            response.set_cookie("step", "1")
+            return response
+
+        async def auth2(request):
+            # Cookie set by the previous hop must come back within the chain
+            if request.cookies.get("step") != "1":
+                return aiohttp.web.Response(status=403)
+            response = aiohttp.web.Response(text="ok")
+            response.set_cookie("serviceToken", f"fresh{self.logins}")
+            return response
+
+        async def fitness(request):
+            if not request.cookies.get("serviceToken", "").startswith("fresh"):
+                return aiohttp.web.Response(status=401)
+            return aiohttp.web.Response(text=json.dumps({"code": 0, "result": {"data_list": [1]}}))
+
+        app = aiohttp.web.Application()
+        app.router.add_get("/pass/serviceLogin", service_login)
+        app.router.add_get("/auth", auth)
+        app.router.add_get("/auth2", auth2)
+        app.router.add_post("/app/v1/data/get_fitness_data_by_time", fitness)
+
+        async def run():
+            runner = aiohttp.web.AppRunner(app)
+            await runner.setup()
+            site = aiohttp.web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+            try:
+                async with create_session() as session:
+                    client = AsyncXiaomiClient(session=session)
+                    client.ACCOUNT_URL = client.API_URL = url
+                    client.set_credentials("7", SSECURITY, "token")
+                    return await scenario(client)
+            finally:
+                await runner.cleanup()
+
+        return asyncio.run(run())
+
+    def test_redirect_chain_keeps_cookies(self):
+        async def scenario(client):
+            await client.login_from_token()
+            return client.cookies
+
+        cookies = self._run(scenario)
+        self.assertEqual(cookies, {"step": "1", "serviceToken": "fresh1"})
+
+    def test_rejected_session_logs_in_again(self):
+        tokens = []
+
+        async def scenario(client):
+            client.restore_session({"user_id": "7", "cookies": {"serviceToken": "stale"}})
+            client.on_relogin = tokens.append
+            return await client.get_fitness_data_by_time(start_time=1, end_time=2)
+
+        self.assertEqual(self._run(scenario), [1])
+        self.assertEqual(self.logins, 1)
+        self.assertEqual([t["userId"] for t in tokens], ["7"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for concurrent async Garmin uploads against a local fake server.
+"""
+
+import unittest
+import sys
+import asyncio
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from garmin.async_upload import aiohttp, upload_concurrently
+from garmin.client import GarminClient
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp not installed")
+class TestAsyncUpload(unittest.TestCase):
+    """Status contract and semaphore bounds."""
+
+    def setUp(self):
+        import aiohttp.web
+
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.total_active = 0
+        self.total_peak = 0
+
+        async def upload(request):
+            account = request.headers["Authorization"]
+            form = await request.post()
+            name = form["file"].filename
+
+            self.active[account] += 1
+            self.total_active += 1
+            self.peak[account] = max(self.peak[account], self.active[account])
+            self.total_peak = max(self.total_peak, self.total_active)
+            await asyncio.sleep(0.05)
+            self.active[account] -= 1
+            self.total_active -= 1
+
+            if account == "stale":
+                return aiohttp.web.Response(status=401)
+            if name.startswith("dup"):
+                return aiohttp.web.Response(status=409)
+            if name.startswith("bad"):
+                return aiohttp.web.Response(status=500, text="boom")
+            return aiohttp.web.Response(status=202)
+
+        app = aiohttp.web.Application()
+        app.router.add_post("/upload", upload)
+
+        self.loop = asyncio.new_event_loop()
+        self.runner = aiohttp.web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = aiohttp.web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def _client(self, account):
+        client = GarminClient(f"{account}@example.com", "password")
+        url = f"http://127.0.0.1:{self.port}/upload"
+        client.upload_target = lambda: (url, {"Authorization": account})
+        return client
+
+    def test_status_contract(self):
+        client = self._client("a")
+        statuses = upload_concurrently([
+            (client, "ok.fit", b"data"),
+            (client, "dup.fit", b"data"),
+            (client, "bad.fit", b"data"),
+            (client, "ok.txt", b"data"),
+        ])
+        self.assertEqual(statuses, ["SUCCESS", "DUPLICATE", "ERROR_500", "UNSUPPORTED_FORMAT"])
+
+    def test_global_and_per_account_limits(self):
+        clients = [self._client(name) for name in ("a", "b", "c")]
+        jobs = [(client, f"ok_{i}.fit", b"data") for client in clients for i in range(4)]
+
+        statuses = upload_concurrently(jobs, max_global=3, max_per_account=2)
+
+        self.assertEqual(statuses, ["SUCCESS"] * 12)
+        self.assertLessEqual(self.total_peak, 3)
+        self.assertGreater(self.total_peak, 1)
+        self.assertTrue(all(peak <= 2 for peak in self.peak.values()))
+
+    def test_upload_target_runs_off_the_loop(self):
+        client = self._client("a")
+        target = client.upload_target
+        threads = []
+
+        def recording_target():
+            threads.append(threading.get_ident())
+            return target()
+
+        client.upload_target = recording_target
+        self.assertEqual(upload_concurrently([(client, "ok.fit", b"data")]), ["SUCCESS"])
+        self.assertNotEqual(threads, [threading.get_ident()])
+
+    def test_rejected_token_is_refreshed_once(self):
+        client = self._client("stale")
+        token = {"value": "stale"}
+        url = f"http://127.0.0.1:{self.port}/upload"
+        client.upload_target = lambda: (url, {"Authorization": token["value"]})
+
+        def refresh():
+            token["value"] = "fresh"
+            return True
+
+        client.refresh_rejected_token = refresh
+        self.assertEqual(upload_concurrently([(client, "ok.fit", b"data")]), ["SUCCESS"])
+
+        # A token that stays rejected is not retried again
+        client.refresh_rejected_token = lambda: True
+        token["value"] = "stale"
+        self.assertEqual(upload_concurrently([(client, "ok.fit", b"data")]), ["ERROR_401"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests for the synthetic payload generator and baseline comparison of the pipeline benchmark.
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add src and benchmarks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from synthetic import BENCH_FILTER, fitness_items, scale_items
+from bench_pipeline import compare
+from xiaomi.client import unmarshal_fitness_data, unmarshal_scale_data
+from garmin.filter import apply_filter
+
+
+class TestSyntheticPayloads(unittest.TestCase):
+
+    def test_payloads_parse_into_records(self):
+        fitness = unmarshal_fitness_data(fitness_items(300))
+        scale, last_create_time = unmarshal_scale_data(scale_items(300))
+
+        self.assertEqual(len(fitness), 300)
+        self.assertEqual(len(scale), 300)
+        self.assertEqual({w.Source for w in scale}, {1, 2, 3})
+        self.assertEqual(last_create_time, int(scale[-1].Timestamp * 1000))
+        self.assertTrue(all(w.Weight > 0 and w.BodyWater > 0 for w in fitness + scale))
+        # The same seed gives the same measurements in both formats
+        self.assertEqual([w.Weight for w in fitness], [w.Weight for w in scale])
+
+    def test_payloads_are_deterministic(self):
+        self.assertEqual(fitness_items(50, seed=1), fitness_items(50, seed=1))
+        self.assertNotEqual(fitness_items(50, seed=1), fitness_items(50, seed=2))
+
+    def test_filter_drops_outliers_only(self):
+        records = unmarshal_fitness_data(fitness_items(1000))
+        kept = apply_filter(records, BENCH_FILTER)
+        self.assertLess(len(kept), len(records))
+        self.assertGreater(len(kept), len(records) * 0.8)
+
+
+class TestBaselineComparison(unittest.TestCase):
+
+    def test_regressions_beyond_tolerance_are_reported(self):
+        baseline = {"1000": {"apply_filter": {"seconds": 0.010, "peak_kib": 100.0}}}
+        results = {
+            "1000": {"apply_filter": {"seconds": 0.012, "peak_kib": 150.0}},
+            "10000": {"apply_filter": {"seconds": 1.0, "peak_kib": 1000.0}},
+        }
+
+        regressions = compare(results, baseline, tolerance=0.3)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("peak_kib", regressions[0])
+        self.assertEqual(compare(results, baseline, tolerance=0.6), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Tests for locked, atomic and batched writes of EnhancedConfigManager.
+"""
+
+import json
+import unittest
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core import config_manager
+from core.config_manager import EnhancedConfigManager
+from utils.atomic_file import FileLock, atomic_write
+
+
+def _user(name):
+    return {"username": name, "password": "", "token": {"userId": "1", "passToken": "p", "ssecurity": "s"}}
+
+
+class TestConfigWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "users.json"
+        self.path.write_text(json.dumps({"users": [_user("alice"), _user("bob")]}))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _load(self):
+        return {u["username"]: u for u in json.loads(self.path.read_text())["users"]}
+
+    def test_batch_writes_once(self):
+        manager = EnhancedConfigManager(str(self.path))
+        with mock.patch.object(config_manager, "atomic_write", wraps=atomic_write) as write:
+            with manager.batch():
+                manager.update_user_token("alice", {"userId": "1", "passToken": "new", "ssecurity": "s"})
+                with manager.batch():
+                    manager.update_last_sync("alice", "2026-01-01 00:00:00")
+                self.assertEqual(write.call_count, 0)
+                self.assertNotIn("last_sync", self._load()["alice"])
+            self.assertEqual(write.call_count, 1)
+
+            manager.update_last_sync("bob", "2026-01-02 00:00:00")
+            self.assertEqual(write.call_count, 2)
+
+        users = self._load()
+        self.assertEqual(users["alice"]["token"]["passToken"], "new")
+        self.assertEqual(users["alice"]["last_sync"], "2026-01-01 00:00:00")
+        self.assertEqual(users["bob"]["last_sync"], "2026-01-02 00:00:00")
+        self.assertEqual(sorted(p.name for p in self.path.parent.iterdir()),
+                         [".users.json.lock", "users.json"])
+
+    def test_unchanged_token_is_not_written(self):
+        manager = EnhancedConfigManager(str(self.path))
+        with mock.patch.object(config_manager, "atomic_write", wraps=atomic_write) as write:
+            # serviceLogin returns userId as an int
+            self.assertTrue(manager.update_user_token("alice", {"userId": 1, "passToken": "p", "ssecurity": "s"}))
+            self.assertEqual(write.call_count, 0)
+            manager.update_user_token("alice", {"userId": 1, "passToken": "p2", "ssecurity": "s"})
+            self.assertEqual(write.call_count, 1)
+        self.assertEqual(self._load()["alice"]["token"]["passToken"], "p2")
+
+    def test_external_changes_are_merged(self):
+        first = EnhancedConfigManager(str(self.path))
+        second = EnhancedConfigManager(str(self.path))
+
+        first.update_last_sync("alice", "2026-01-01 00:00:00")
+        # second still holds the old data; its write must not revert alice
+        second.update_last_sync("bob", "2026-01-02 00:00:00")
+
+        users = self._load()
+        self.assertEqual(users["alice"]["last_sync"], "2026-01-01 00:00:00")
+        self.assertEqual(users["bob"]["last_sync"], "2026-01-02 00:00:00")
+
+    def test_concurrent_updates_from_threads(self):
+        names = [f"user{i}" for i in range(8)]
+        self.path.write_text(json.dumps({"users": [_user(n) for n in names]}))
+        managers = [EnhancedConfigManager(str(self.path)) for _ in names]
+
+        def run(manager, name):
+            for i in range(5):
+                with manager.batch():
+                    manager.update_last_sync(name, f"2026-01-01 00:00:0{i}")
+
+        threads = [threading.Thread(target=run, args=pair) for pair in zip(managers, names)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        users = self._load()
+        self.assertEqual({users[n]["last_sync"] for n in names}, {"2026-01-01 00:00:04"})
+
+
+class TestUserIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "users.json"
+        self.path.write_text(json.dumps({"users": [_user(f"user{i}") for i in range(5)]}))
+        self.manager = EnhancedConfigManager(str(self.path))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_models_are_cached_until_changed(self):
+        user = self.manager.get_user("user3")
+        self.assertIs(self.manager.get_user("user3"), user)
+        self.assertIs(self.manager.get_users()[3], user)
+
+        self.manager.update_last_sync("user3", "2026-01-01 00:00:00")
+        updated = self.manager.get_user("user3")
+        self.assertIsNot(updated, user)
+        self.assertIsNone(user.last_sync)
+        self.assertEqual(updated.last_sync, "2026-01-01 00:00:00")
+        self.assertIs(self.manager.get_users()[3], updated)
+
+    def test_index_follows_add_and_delete(self):
+        from core.models import UserModel
+
+        self.assertTrue(self.manager.delete_user("user1"))
+        self.assertIsNone(self.manager.get_user("user1"))
+        self.assertTrue(self.manager.add_user(UserModel(username="user9", password="")))
+        self.assertFalse(self.manager.add_user(UserModel(username="user9", password="")))
+
+        self.assertTrue(self.manager.update_last_sync("user4", "2026-01-01 00:00:00"))
+        self.assertEqual([u.username for u in self.manager.get_users()],
+                         ["user0", "user2", "user3", "user4", "user9"])
+        saved = json.loads(self.path.read_text())["users"]
+        self.assertEqual(saved[3]["last_sync"], "2026-01-01 00:00:00")
+
+    def test_reload_drops_cache(self):
+        user = self.manager.get_user("user0")
+        data = json.loads(self.path.read_text())
+        data["users"][0]["model"] = "other.model"
+        data["users"].append(_user("user5"))
+        self.path.write_text(json.dumps(data))
+
+        self.assertTrue(self.manager.reload_if_changed())
+        self.assertIsNot(self.manager.get_user("user0"), user)
+        self.assertEqual(self.manager.get_user("user0").model, "other.model")
+        self.assertIsNotNone(self.manager.get_user("user5"))
+
+
+class TestFileLock(unittest.TestCase):
+
+    def test_lock_is_exclusive_and_reentrant(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "users.json"
+            lock, other = FileLock(path), FileLock(path, timeout=0.1)
+            with lock:
+                with lock, FileLock(path):
+                    pass
+                result = []
+                thread = threading.Thread(target=lambda: result.append(self._try(other)))
+                thread.start()
+                thread.join()
+                self.assertEqual(result, [False])
+            self.assertTrue(self._try(other))
+
+    @staticmethod
+    def _try(lock):
+        try:
+            with lock:
+                return True
+        except TimeoutError:
+            return False
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,7 +9,7 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from garmin.filter import evaluate_condition, apply_filter, FilterOperator, SUPPORTED_FIELDS
+from garmin.filter import evaluate_condition, apply_filter, compile_filter, FilterOperator, SUPPORTED_FIELDS
 
 
 class TestEvaluateCondition(unittest.TestCase):
@@ -274,6 +274,52 @@ class TestApplyFilter(unittest.TestCase):
         self.assertEqual(len(result), 3)  # 65, 75, 85 (BMI 22, 25, 28)
 
 
+class TestCompileFilter(unittest.TestCase):
+    """Test the compile_filter function."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.sample_weights = [
+            {'Weight': 65.0, 'BodyFat': 18.0},
+            {'Weight': 75.0, 'BodyFat': 22.0},
+            {'Weight': '85.0', 'BodyFat': None},
+            {'BodyFat': 12.0},
+        ]
+        self.config = {
+            'enabled': True,
+            'conditions': [
+                {'field': 'Weight', 'operator': 'between', 'value': [70, 90]},
+                {'field': 'BodyFat', 'operator': 'lt', 'value': '15'}
+            ],
+            'logic': 'or'
+        }
+
+    def test_matches_apply_filter(self):
+        """Test that the compiled filter selects the same records as apply_filter."""
+        compiled = compile_filter(self.config)
+        expected = apply_filter(self.sample_weights, self.config)
+        self.assertEqual(compiled.apply(self.sample_weights), expected)
+        self.assertEqual([w for w in self.sample_weights if compiled(w)], expected)
+        self.assertEqual(len(expected), 3)
+
+    def test_disabled_or_missing(self):
+        """Test that no filter is compiled when disabled or missing."""
+        self.assertIsNone(compile_filter(None))
+        self.assertIsNone(compile_filter({'enabled': False, 'conditions': []}))
+
+    def test_invalid_config_raises(self):
+        """Test that invalid configurations are rejected when compiling."""
+        from garmin.filter_config import FilterConfigError
+        config = {'enabled': True, 'conditions': [{'field': 'Weight', 'operator': 'gt', 'value': 'heavy'}]}
+        with self.assertRaises(FilterConfigError):
+            compile_filter(config)
+
+    def test_same_config_is_compiled_once(self):
+        """Test that equal configurations share one compiled filter."""
+        same = {'logic': 'or', 'conditions': list(self.config['conditions']), 'enabled': True}
+        self.assertIs(compile_filter(self.config), compile_filter(same))
+
+
 class TestFilterConfigValidator(unittest.TestCase):
     """Test the FilterConfigValidator class."""
 
@@ -0,0 +1,104 @@
+"""
+Tests for the direct binary FIT encoder
+"""
+import sys
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from fit_tool.fit_file import FitFile
+
+from garmin.fit_encoder import crc16, encode_weight_fit
+from garmin.fit_generator import build_weight_fit_bytes, create_weight_fit_file
+
+
+WEIGHTS = [
+    {
+        'Timestamp': 1767257602.0,
+        'Weight': 70.55,
+        'BMI': 22.4,
+        'BodyFat': 18.3,
+        'BodyWater': 55.1,
+        'BoneMass': 3.1,
+        'MetabolicAge': 30,
+        'MuscleMass': 52.7,
+        'VisceralFat': 8,
+        'BasalMetabolism': 1580,
+    },
+    {'Timestamp': 1767344000.0, 'Weight': 70.1},
+    {'Date': '2026-01-03 08:53:22', 'Weight': 69.9, 'BodyFat': float('nan')},
+]
+
+
+# FIT invalid values per field size (fields left unset by the encoder)
+_INVALID = {1: 0xFF, 2: 0xFFFF, 4: 0xFFFFFFFF}
+
+
+def _weight_records(data: bytes):
+    """Decode weight_scale messages with fit_tool, skipping invalid fields"""
+    fit_file = FitFile.from_bytes(data)
+    result = []
+    for record in fit_file.records:
+        message = record.message
+        if record.is_definition or message.global_id != 30:
+            continue
+        result.append({
+            field.name: field.get_value()
+            for field in message.fields
+            if field.encoded_values
+            and field.encoded_values[0] != _INVALID.get(field.size)
+        })
+    return result
+
+
+class TestFitEncoder(unittest.TestCase):
+    """Native encoder output must decode to the same values as fit_tool's."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_header_and_crc(self):
+        data = encode_weight_fit([{'timestamp': 1767257602000, 'weight': 70.0}], 1767257602000)
+
+        self.assertEqual(data[0], 14)
+        self.assertEqual(data[8:12], b'.FIT')
+        data_size = struct.unpack('<I', data[4:8])[0]
+        self.assertEqual(len(data), 14 + data_size + 2)
+        self.assertEqual(struct.unpack('<H', data[12:14])[0], crc16(data[:12]))
+        # CRC over the whole file including its trailing CRC is zero
+        self.assertEqual(crc16(data), 0)
+
+    def test_matches_fit_tool(self):
+        native = create_weight_fit_file(WEIGHTS, self.base / "native.fit")
+        fallback = create_weight_fit_file(WEIGHTS, self.base / "fit_tool.fit", use_fit_tool=True)
+
+        native_records = _weight_records(native.read_bytes())
+        fit_tool_records = _weight_records(fallback.read_bytes())
+
+        self.assertEqual(len(native_records), 3)
+        self.assertEqual(native_records, fit_tool_records)
+        self.assertAlmostEqual(native_records[0]['weight'], 70.55, places=2)
+        self.assertEqual(native_records[0]['metabolic_age'], 30)
+        self.assertNotIn('percent_fat', native_records[2])
+
+    def test_in_memory_build(self):
+        data = build_weight_fit_bytes(WEIGHTS)
+
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(len(_weight_records(data)), 3)
+        self.assertEqual(list(self.base.iterdir()), [])
+
+    def test_no_records(self):
+        self.assertIsNone(build_weight_fit_bytes([{'Weight': 70.0}]))
+        self.assertIsNone(create_weight_fit_file([{'Weight': 70.0}], self.base / "empty.fit"))
+
+
+if __name__ == '__main__':
+    unittest.main()
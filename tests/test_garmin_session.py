@@ -0,0 +1,121 @@
+"""
+Tests for the in-process Garmin session cache and proactive OAuth2 refresh.
+"""
+
+import json
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add src and benchmarks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from garth.auth_tokens import OAuth1Token, OAuth2Token
+from garth.http import Client
+
+from garmin.client import GarminClient
+from garmin.session import GarminSessionManager
+from mock_servers import GarminMockServer
+from mock_servers.garmin_api import UPLOAD_PATH
+
+
+def _oauth2(expires_in, access_token="access"):
+    now = int(time.time())
+    return OAuth2Token(scope="", jti="", token_type="Bearer", access_token=access_token,
+                       refresh_token="refresh", expires_in=expires_in, expires_at=now + expires_in,
+                       refresh_token_expires_in=86400, refresh_token_expires_at=now + 86400)
+
+
+def _client(expires_in, domain="garmin.com"):
+    client = Client()
+    client.configure(oauth1_token=OAuth1Token("token", "secret", domain=domain),
+                     oauth2_token=_oauth2(expires_in), domain=domain)
+    return client
+
+
+def _fake_refresh(client):
+    client.oauth2_token = _oauth2(3600, access_token="refreshed")
+
+
+class TestGarminSessionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session_dir = Path(self.tmp.name) / "user@example.com"
+        self.manager = GarminSessionManager(refresh_margin=300)
+        patcher = mock.patch.object(Client, "refresh_oauth2", autospec=True, side_effect=_fake_refresh)
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_loads_from_disk_once(self):
+        self.assertIsNone(self.manager.acquire("user@example.com", "garmin.com", self.session_dir))
+
+        self.manager.save(_client(3600), self.session_dir)
+        client = self.manager.acquire("user@example.com", "garmin.com", self.session_dir)
+        self.assertIsNotNone(client)
+        self.assertIs(self.manager.acquire("user@example.com", "garmin.com", self.session_dir), client)
+        # A session saved for the other domain is not reused
+        self.assertIsNone(self.manager.acquire("user@example.com", "garmin.cn", self.session_dir))
+        self.refresh.assert_not_called()
+
+    def test_expiring_token_is_refreshed_and_saved(self):
+        self.manager.save(_client(60), self.session_dir)
+        client = self.manager.acquire("user@example.com", "garmin.com", self.session_dir)
+
+        self.assertEqual(self.refresh.call_count, 1)
+        self.assertEqual(client.oauth2_token.access_token, "refreshed")
+        saved = json.loads((self.session_dir / "oauth2_token.json").read_text())
+        self.assertEqual(saved["access_token"], "refreshed")
+
+        # Fresh again: no further refresh until it nears expiry
+        self.assertTrue(self.manager.ensure_fresh("user@example.com", "garmin.com", client, self.session_dir))
+        client.oauth2_token = _oauth2(10)
+        self.assertTrue(self.manager.ensure_fresh("user@example.com", "garmin.com", client, self.session_dir))
+        self.assertEqual(self.refresh.call_count, 2)
+
+    def test_failed_refresh_requires_login(self):
+        self.refresh.side_effect = RuntimeError("401")
+        self.manager.save(_client(60), self.session_dir)
+        self.assertIsNone(self.manager.acquire("user@example.com", "garmin.com", self.session_dir))
+
+    def test_garmin_clients_share_the_session(self):
+        self.manager.save(_client(3600), self.session_dir)
+        first, second = (GarminClient("user@example.com", "pw", "COM", session_dir=self.tmp.name,
+                                      sessions=self.manager) for _ in range(2))
+        with mock.patch.object(Client, "login") as login:
+            self.assertTrue(first.login())
+            self.assertTrue(second.login())
+        login.assert_not_called()
+        self.assertIs(first._client, second._client)
+
+        first._client.oauth2_token = _oauth2(10)
+        _, headers = second.upload_target()
+        self.assertEqual(headers["Authorization"], "Bearer refreshed")
+
+    def test_rejected_upload_is_retried_after_refresh(self):
+        server = GarminMockServer().start()
+        self.addCleanup(server.stop)
+        self.manager.save(_client(3600), self.session_dir)
+        client = GarminClient("user@example.com", "pw", "COM", session_dir=self.tmp.name,
+                              sessions=self.manager)
+        self.assertTrue(client.login())
+
+        # The mock rejects an upload without a token with 401
+        url = server.url + UPLOAD_PATH
+        client.upload_target = mock.Mock(side_effect=[
+            (url, {}), (url, {"Authorization": "Bearer refreshed"})])
+        self.assertEqual(client.upload_fit_bytes(b"fit", "weight.fit"), "SUCCESS")
+        self.assertEqual(self.refresh.call_count, 1)
+        self.assertEqual(server.requests[(UPLOAD_PATH, 401)], 1)
+        self.assertEqual(server.uploads, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the Prometheus metrics registry.
+"""
+
+import unittest
+import sys
+import tempfile
+import urllib.request
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.metrics import LAST_SUCCESS, MetricsRegistry, SYNC_RUNS, record_sync_run
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge_render(self):
+        runs = self.registry.counter("sync_runs_total", "Sync runs", ("user", "result"))
+        runs.inc(user="alice", result="success")
+        runs.inc(2, user="alice", result="success")
+        duration = self.registry.gauge("sync_duration_seconds", "Duration", ("user",))
+        duration.set(1.5, user='a"b\\c')
+
+        text = self.registry.render()
+        self.assertIn("# TYPE sync_runs_total counter", text)
+        self.assertIn('sync_runs_total{user="alice",result="success"} 3', text)
+        self.assertIn('sync_duration_seconds{user="a\\"b\\\\c"} 1.5', text)
+        self.assertEqual(runs.get(user="alice", result="success"), 3)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram("latency_seconds", "Latency", ("service",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value, service="garmin")
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{service="garmin",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{service="garmin",le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{service="garmin",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{service="garmin"} 3', text)
+        self.assertIn('latency_seconds_sum{service="garmin"} 5.55', text)
+
+    def test_record_sync_run(self):
+        record_sync_run("metrics-test", False, 1.0)
+        self.assertEqual(LAST_SUCCESS.get(user="metrics-test"), 0)
+        record_sync_run("metrics-test", True, 2.0)
+        self.assertEqual(SYNC_RUNS.get(user="metrics-test", result="failed"), 1)
+        self.assertEqual(SYNC_RUNS.get(user="metrics-test", result="success"), 1)
+        self.assertGreater(LAST_SUCCESS.get(user="metrics-test"), 0)
+
+    def test_labels_must_match(self):
+        counter = self.registry.counter("chunks_total", "Chunks", ("user", "status"))
+        with self.assertRaises(ValueError):
+            counter.inc(user="alice")
+        with self.assertRaises(ValueError):
+            self.registry.gauge("chunks_total", "Chunks", ("user", "status"))
+        self.assertIs(self.registry.counter("chunks_total", "Chunks", ("user", "status")), counter)
+
+    def test_write_textfile(self):
+        self.registry.counter("fetched_total", "Fetched", ("user",)).inc(10, user="alice")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "collector" / "weight_sync.prom"
+            self.registry.write_textfile(path)
+            self.assertIn('fetched_total{user="alice"} 10', path.read_text(encoding="utf-8"))
+            self.assertEqual([p.name for p in path.parent.iterdir()], ["weight_sync.prom"])
+
+    def test_http_endpoint(self):
+        self.registry.counter("fetched_total", "Fetched", ("user",)).inc(user="alice")
+        server = self.registry.start_http_server(0, addr="127.0.0.1")
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode("utf-8")
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            self.assertIn('fetched_total{user="alice"} 1', body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
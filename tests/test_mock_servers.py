@@ -0,0 +1,73 @@
+"""
+Tests for the mock Xiaomi / Garmin servers used by benchmarks/load_sync.py.
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add src and benchmarks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from mock_servers import Behavior, GarminMockServer, MOCK_SSECURITY, XiaomiMockServer
+from garmin.client import GarminClient
+from utils.retry import RetryPolicy
+from xiaomi.client import XiaomiClient, XiaomiRequestError, unmarshal_fitness_data
+
+
+class TestXiaomiMockServer(unittest.TestCase):
+
+    def _client(self, server, retry_policy=None):
+        client = XiaomiClient(retry_policy=retry_policy)
+        client.ACCOUNT_URL = client.API_URL = server.url
+        client.set_credentials("7", MOCK_SSECURITY, "pass")
+        client.login_from_token()
+        return client
+
+    def test_fitness_paging_and_legacy_api(self):
+        with XiaomiMockServer(records=250, page_size=100) as server:
+            client = self._client(server)
+
+            items = client.get_fitness_data_by_time()
+            self.assertEqual(len(unmarshal_fitness_data(items)), 250)
+            self.assertEqual(server.requests[("/app/v1/data/get_fitness_data_by_time", 200)], 3)
+            self.assertIsNone(client.fitness_next_key)
+
+            weights = client.get_model_weights("yunmai.scales.ms103")
+            self.assertEqual(len(weights), 250)
+            self.assertEqual(len({w.Timestamp for w in weights}), 250)
+
+            since = int(weights[-1].Timestamp * 1000) + 1
+            self.assertEqual(len(client.get_model_weights("yunmai.scales.ms103", since=since)), 249)
+
+    def test_injected_errors_are_retried(self):
+        behavior = Behavior(throttle_rate=1.0, retry_after=0)
+        with XiaomiMockServer(records=10, behavior=behavior) as server:
+            client = self._client(server, RetryPolicy(max_attempts=2, base_delay=0, jitter=0))
+            with self.assertRaises(XiaomiRequestError) as ctx:
+                client.get_fitness_data_by_time()
+            self.assertEqual(ctx.exception.status_code, 429)
+            self.assertEqual(client.retry_count, 1)
+
+
+class TestGarminMockServer(unittest.TestCase):
+
+    def test_upload_then_duplicate(self):
+        with GarminMockServer() as server:
+            client = GarminClient("user@example.com", "mock", session_dir="/nonexistent")
+            client.CONNECTAPI_URL = server.url
+            client._client.oauth2_token = "Bearer mock"
+
+            self.assertEqual(client.upload_fit_bytes(b"fit-1", "a.fit"), "SUCCESS")
+            self.assertEqual(client.upload_fit_bytes(b"fit-1", "b.fit"), "DUPLICATE")
+            self.assertEqual(client.upload_fit_bytes(b"fit-2", "c.fit"), "SUCCESS")
+            self.assertEqual(server.uploads, 2)
+
+            server.behavior.throttle_rate = 1.0
+            self.assertEqual(client.upload_fit_bytes(b"fit-3", "d.fit"), "ERROR_429")
+            self.assertEqual(server.requests[("/upload-service/upload", 429)], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for SyncOrchestrator.sync_users with a stubbed per-user sync.
+"""
+
+import json
+import unittest
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.models import SyncProgress
+from core.sync_service import SyncOrchestrator
+
+
+def _progress(username, stage, **details):
+    return SyncProgress(stage=stage, current=100, total=100, message=stage,
+                        timestamp="00:00:00", username=username, details=details)
+
+
+class TestSyncUsers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config = Path(self.tmp.name) / "users.json"
+        config.write_text(json.dumps({
+            "users": [{"username": f"user{i}", "password": ""} for i in range(4)],
+            "settings": {"data_dir": self.tmp.name},
+        }))
+        self.orchestrator = SyncOrchestrator(str(config))
+
+    def tearDown(self):
+        self.orchestrator.weight_store.close()
+        self.orchestrator.upload_ledger.close()
+        self.tmp.cleanup()
+
+    def test_results_are_aggregated_in_order(self):
+        def fake_sync(username, chunk_size, input_callback, full, archive_fit):
+            yield _progress(username, "fetching", total_weights=10)
+            if username == "user2":
+                raise RuntimeError("boom")
+            failed = 1 if username == "user1" else 0
+            yield _progress(username, "completed", success=3, failed=failed, duplicate=1, retries=2)
+
+        self.orchestrator._sync_user_batched = fake_sync
+        progress = []
+        results = self.orchestrator.sync_users(max_workers=3, progress_callback=progress.append)
+
+        self.assertEqual([r.username for r in results], ["user0", "user1", "user2", "user3"])
+        self.assertEqual([r.success for r in results], [True, False, False, True])
+        self.assertEqual(results[0].total_records, 10)
+        self.assertEqual((results[0].uploaded_chunks, results[0].duplicate_chunks, results[0].retries), (3, 1, 2))
+        self.assertEqual(results[1].failed_chunks, 1)
+        self.assertEqual(results[2].error_message, "boom")
+        self.assertEqual(len(progress), 7)
+
+    def test_stop_is_not_cleared_by_later_users(self):
+        started = threading.Barrier(2)
+        seen = {}
+
+        def fake_sync(username, chunk_size, input_callback, full, archive_fit):
+            if username in ("user0", "user1"):
+                started.wait()
+                if username == "user0":
+                    self.orchestrator.stop_sync()
+                started.wait()
+            else:
+                # Users picked up after stop() must still see the stop request
+                seen[username] = self.orchestrator._should_stop
+            yield _progress(username, "completed")
+
+        self.orchestrator._sync_user_batched = fake_sync
+        self.orchestrator.sync_users(max_workers=2)
+
+        self.assertEqual(seen, {"user2": True, "user3": True})
+
+    def test_warm_xiaomi_client_follows_token_changes(self):
+        orchestrator = self.orchestrator
+        orchestrator.keep_sessions_warm()
+        client = object()
+        user = orchestrator.config_mgr.get_user("user0")
+        orchestrator._put_warm_session("xiaomi", "user0", orchestrator._xiaomi_fingerprint(user), client)
+
+        fingerprint = orchestrator._xiaomi_fingerprint(orchestrator.config_mgr.get_user("user0"))
+        self.assertIs(orchestrator._get_warm_session("xiaomi", "user0", fingerprint), client)
+
+        # A new login writes another token to users.json
+        orchestrator.config_mgr.update_user_token(
+            "user0", {"userId": "1", "passToken": "new", "ssecurity": "s"})
+        fingerprint = orchestrator._xiaomi_fingerprint(orchestrator.config_mgr.get_user("user0"))
+        self.assertIsNone(orchestrator._get_warm_session("xiaomi", "user0", fingerprint))
+
+
+if __name__ == "__main__":
+    unittest.main()
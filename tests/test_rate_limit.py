@@ -0,0 +1,75 @@
+"""
+Tests for the token-bucket rate limiter and the per-service limiter.
+"""
+
+import unittest
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.rate_limit import RateLimiter, ServiceLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_then_paced(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        waits = [limiter._reserve() for _ in range(5)]
+
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        # Each further caller queues one token interval behind the previous one
+        for expected, wait in zip([0.1, 0.2, 0.3], waits[2:]):
+            self.assertAlmostEqual(wait, expected, delta=0.01)
+
+    def test_unlimited(self):
+        limiter = RateLimiter(rate=0)
+        self.assertEqual([limiter.acquire() for _ in range(100)], [0.0] * 100)
+
+    def test_acquire_sleeps(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class TestServiceLimiter(unittest.TestCase):
+
+    def test_concurrency_cap(self):
+        limiter = ServiceLimiter("test", max_concurrency=2)
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def work():
+            with limiter:
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(limiter.get_stats()["requests"], 8)
+
+    def test_slot_released_on_error(self):
+        limiter = ServiceLimiter("test", max_concurrency=1)
+        with self.assertRaises(RuntimeError):
+            with limiter:
+                raise RuntimeError("boom")
+        with limiter:
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Tests for the RC4-drop1024 implementations.
+"""
+
+import unittest
+import sys
+import hashlib
+import os
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from xiaomi.rc4 import rc4_drop1024, rc4_drop1024_py
+
+
+def reference_rc4_drop1024(key, data):
+    """The original per-byte implementation from XiaomiClient._rc4_encrypt"""
+    S = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + S[i] + key[i % len(key)]) % 256
+        S[i], S[j] = S[j], S[i]
+
+    i = j = 0
+    for _ in range(1024):
+        i = (i + 1) % 256
+        j = (j + S[i]) % 256
+        S[i], S[j] = S[j], S[i]
+
+    out = []
+    for char in data:
+        i = (i + 1) % 256
+        j = (j + S[i]) % 256
+        S[i], S[j] = S[j], S[i]
+        out.append(char ^ S[(S[i] + S[j]) % 256])
+    return bytes(out)
+
+
+class TestRC4(unittest.TestCase):
+    """Optimized implementations must match the original byte for byte."""
+
+    def setUp(self):
+        self.key = hashlib.sha256(b"ssecurity" + b"nonce").digest()
+        self.data = os.urandom(4096)
+
+    def test_matches_reference(self):
+        expected = reference_rc4_drop1024(self.key, self.data)
+        self.assertEqual(rc4_drop1024(self.key, self.data), expected)
+        self.assertEqual(rc4_drop1024_py(self.key, self.data), expected)
+
+    def test_unsupported_key_size_uses_fallback(self):
+        key = b"odd-size-key"
+        self.assertEqual(rc4_drop1024(key, self.data), reference_rc4_drop1024(key, self.data))
+
+    def test_round_trip_and_str_input(self):
+        encrypted = rc4_drop1024(self.key, "体重 data")
+        self.assertEqual(rc4_drop1024(self.key, encrypted).decode('utf-8'), "体重 data")
+
+    def test_empty_and_memoryview(self):
+        self.assertEqual(rc4_drop1024(self.key, b""), b"")
+        self.assertEqual(rc4_drop1024_py(self.key, b""), b"")
+        self.assertEqual(
+            rc4_drop1024(self.key, memoryview(self.data)),
+            rc4_drop1024(self.key, self.data)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Tests for the retry policy and Xiaomi paging retries.
+"""
+
+import unittest
+import sys
+import json
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.retry import RetryPolicy, parse_retry_after
+from xiaomi.client import XiaomiAPIError, XiaomiClient, XiaomiRequestError, is_retryable_error
+
+
+def no_sleep_policy(sleeps, max_attempts=3):
+    return RetryPolicy(max_attempts=max_attempts, base_delay=1.0, jitter=0, sleep=sleeps.append)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Backoff timing and retry decisions."""
+
+    def test_exponential_backoff_with_cap(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=0)
+        self.assertEqual([policy.backoff(n) for n in range(1, 5)], [1.0, 2.0, 4.0, 5.0])
+
+    def test_jitter_only_shortens(self):
+        policy = RetryPolicy(base_delay=2.0, jitter=0.5)
+        for _ in range(20):
+            self.assertTrue(1.0 <= policy.backoff(1) <= 2.0)
+
+    def test_retry_after_is_honored(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=60.0, jitter=0)
+        self.assertEqual(policy.backoff(1, retry_after=10), 10)
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_retries_until_success(self):
+        sleeps = []
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise XiaomiRequestError(503, "busy")
+            return "ok"
+
+        result = no_sleep_policy(sleeps).call(flaky, lambda e: True)
+        self.assertEqual(result, "ok")
+        self.assertEqual(sleeps, [1.0, 2.0])
+
+    def test_gives_up_and_raises(self):
+        sleeps = []
+
+        def failing():
+            raise XiaomiRequestError(429, "throttled", retry_after=3)
+
+        with self.assertRaises(XiaomiRequestError):
+            no_sleep_policy(sleeps).call(failing, lambda e: True)
+        self.assertEqual(sleeps, [3, 3])
+
+    def test_non_retryable_raises_immediately(self):
+        sleeps = []
+        with self.assertRaises(ValueError):
+            no_sleep_policy(sleeps).call(lambda: int("x"), lambda e: False)
+        self.assertEqual(sleeps, [])
+
+
+class TestXiaomiPagingRetry(unittest.TestCase):
+    """Paging resumes from the failed page and never returns partial data."""
+
+    def setUp(self):
+        self.sleeps = []
+        self.client = XiaomiClient(retry_policy=no_sleep_policy(self.sleeps))
+        self.requests = []
+
+    def _serve(self, responses):
+        def fake_request(api_url, params):
+            self.requests.append(json.loads(params).get("next_key"))
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self.client.request = fake_request
+
+    @staticmethod
+    def _page(items, next_key=None):
+        return {"code": 0, "result": {
+            "data_list": items, "has_more": bool(next_key), "next_key": next_key}}
+
+    def test_resumes_from_same_next_key(self):
+        self._serve([
+            self._page([1], "k1"),
+            XiaomiRequestError(429, "throttled"),
+            self._page([2]),
+        ])
+
+        data = self.client.get_fitness_data_by_time(start_time=1, end_time=2)
+
+        self.assertEqual(data, [1, 2])
+        self.assertEqual(self.requests, [None, "k1", "k1"])
+        self.assertEqual(self.client.retry_count, 1)
+        self.assertIsNone(self.client.fitness_next_key)
+
+    def test_raises_instead_of_partial_result(self):
+        self._serve([self._page([1], "k1")] + [XiaomiRequestError(503, "down")] * 3)
+
+        with self.assertRaises(XiaomiRequestError):
+            self.client.get_fitness_data_by_time(start_time=1, end_time=2)
+        self.assertEqual(self.client.fitness_next_key, "k1")
+
+    def test_api_error_is_not_retried(self):
+        self._serve([{"code": 1, "message": "bad"}])
+
+        with self.assertRaises(XiaomiAPIError):
+            self.client.get_fitness_data_by_time(start_time=1, end_time=2)
+        self.assertEqual(self.client.retry_count, 0)
+
+    def test_throttle_code_in_body_is_retried(self):
+        throttled = {"code": 429, "message": "too many requests"}
+        with self.assertRaises(XiaomiAPIError) as ctx:
+            self.client._decode_response(200, json.dumps(throttled), None, b"nonce")
+        self.assertTrue(is_retryable_error(ctx.exception))
+
+        self.client.user_id = "1"
+        self._serve([{"code": 0, "result": {"resp": json.dumps({"code": 503})}}, {"code": 0, "result": {}}])
+        self.assertEqual(self.client.get_model_weights("yunmai.scales.ms103"), [])
+        self.assertEqual(self.client.retry_count, 1)
+
+
+class TestModelApiFallback(unittest.TestCase):
+    """The device API falls back to the health API unless a transient error ran out of retries."""
+
+    def _pages(self, error):
+        from core.sync_service import SyncOrchestrator
+
+        client = XiaomiClient()
+
+        def model_pages(model, since=None):
+            raise error
+            yield
+
+        client.iter_model_weight_pages = model_pages
+        client.iter_fitness_data_pages = lambda **kwargs: iter([[]])
+        return list(SyncOrchestrator._iter_weight_pages(None, client, "model", None))
+
+    def test_permanent_errors_fall_back(self):
+        for error in (XiaomiRequestError(403, "forbidden"), XiaomiAPIError("unsupported", code=-1)):
+            self.assertEqual(self._pages(error), [[]])
+
+    def test_exhausted_transient_errors_propagate(self):
+        for error in (XiaomiRequestError(503, "down"), XiaomiAPIError("throttled", code=429)):
+            with self.assertRaises(type(error)):
+                self._pages(error)
+
+
+if __name__ == '__main__':
+    unittest.main()
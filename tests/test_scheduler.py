@@ -0,0 +1,116 @@
+"""
+Tests for the daemon-mode scheduler and config change detection.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.config_manager import EnhancedConfigManager
+from core.models import SyncResult, UserModel
+from core.scheduler import FAILURE_RETRY_MINUTES, SyncScheduler
+
+
+class FakeConfig:
+    def __init__(self, users):
+        self.users = users
+        self.changed = False
+
+    def reload_if_changed(self):
+        changed, self.changed = self.changed, False
+        return changed
+
+
+class FakeOrchestrator:
+    def __init__(self, users, failing=()):
+        self.config_mgr = FakeConfig(users)
+        self.failing = set(failing)
+        self.synced = []
+        self.dropped = []
+
+    def list_users(self):
+        return list(self.config_mgr.users)
+
+    def sync_users(self, usernames, **kwargs):
+        self.synced.append(sorted(usernames))
+        return [SyncResult(username=name, success=name not in self.failing) for name in usernames]
+
+    def drop_sessions(self, username=None):
+        self.dropped.append(username)
+
+
+class TestSyncScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.users = [UserModel("alice", "pw"), UserModel("bob", "pw", sync_interval=60)]
+        self.orchestrator = FakeOrchestrator(self.users, failing={"alice"})
+        self.scheduler = SyncScheduler(
+            self.orchestrator, interval=24 * 60, jitter=0, clock=lambda: self.now)
+
+    def test_users_run_on_their_own_interval(self):
+        self.scheduler.run_pending()
+        self.assertEqual(self.orchestrator.synced, [["alice", "bob"]])
+
+        # alice failed: retried early, with her session dropped
+        self.assertEqual(self.orchestrator.dropped, ["alice"])
+        self.assertEqual(self.scheduler.next_run("alice"), FAILURE_RETRY_MINUTES * 60)
+        self.assertEqual(self.scheduler.next_run("bob"), 3600)
+
+        self.now = 1800
+        self.assertEqual(self.scheduler.run_pending()[0].username, "alice")
+        self.now = 3599
+        self.assertEqual(self.scheduler.run_pending(), [])
+        self.now = 3600
+        self.scheduler.run_pending()
+        self.assertEqual(self.orchestrator.synced[-1], ["alice", "bob"])
+
+    def test_config_reload_adds_and_removes_users(self):
+        self.scheduler.run_pending()
+        self.orchestrator.config_mgr.users = [self.users[1], UserModel("carol", "pw")]
+        self.orchestrator.config_mgr.changed = True
+
+        self.now = 10
+        self.scheduler.run_pending()
+        self.assertEqual(self.orchestrator.synced[-1], ["carol"])
+        self.assertIsNone(self.scheduler.next_run("alice"))
+        self.assertIn("alice", self.orchestrator.dropped)
+
+    def test_jitter_delays_next_run(self):
+        scheduler = SyncScheduler(
+            FakeOrchestrator(self.users), interval=10, jitter=5, clock=lambda: self.now)
+        scheduler.run_pending()
+        self.assertTrue(600 <= scheduler.next_run("alice") <= 900)
+
+
+class TestConfigReload(unittest.TestCase):
+
+    def test_reload_only_after_external_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "users.json"
+            path.write_text(json.dumps({"users": [{"username": "alice", "password": "pw"}]}))
+            config = EnhancedConfigManager(str(path))
+
+            # Own writes do not count as changes
+            config.update_last_sync("alice")
+            self.assertFalse(config.reload_if_changed())
+
+            data = json.loads(path.read_text())
+            data["users"].append({"username": "bob", "password": "pw", "sync_interval": 30})
+            path.write_text(json.dumps(data))
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+            self.assertTrue(config.reload_if_changed())
+            self.assertEqual(config.get_user("bob").sync_interval, 30)
+            self.assertFalse(config.reload_if_changed())
+
+
+if __name__ == '__main__':
+    unittest.main()
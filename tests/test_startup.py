@@ -0,0 +1,46 @@
+"""
+Tests that the CLI entry point does not load heavy optional modules at import time.
+"""
+
+import unittest
+import subprocess
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+
+class TestLazyImports(unittest.TestCase):
+    """garth, fit_tool and curlify are imported only when they are used."""
+
+    def _loaded_after(self, code):
+        script = code + "; import sys; print(' '.join(sorted(sys.modules)))"
+        result = subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR,
+                                capture_output=True, text=True, check=True)
+        return set(result.stdout.split())
+
+    def test_main_import_is_light(self):
+        loaded = self._loaded_after("import main")
+        for module in ("garth", "fit_tool", "curlify", "pydantic", "core.sync_service"):
+            self.assertNotIn(module, loaded)
+
+    def test_core_exports_load_on_access(self):
+        loaded = self._loaded_after("import core.sync_state")
+        self.assertNotIn("core.sync_service", loaded)
+
+        loaded = self._loaded_after("from core import SyncOrchestrator")
+        self.assertIn("core.sync_service", loaded)
+
+    def test_fit_tool_loaded_for_fallback_build(self):
+        loaded = self._loaded_after(
+            "from garmin.fit_generator import build_weight_fit_bytes; "
+            "build_weight_fit_bytes([{'Timestamp': 1704880245, 'Weight': 70.5}], use_fit_tool=True)"
+        )
+        self.assertIn("fit_tool", loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
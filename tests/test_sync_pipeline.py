@@ -0,0 +1,118 @@
+"""
+Unit tests for the fetch → generate → upload sync pipeline.
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.sync_pipeline import SyncPipeline
+
+
+def make_pages(total, page_size):
+    records = [{'Timestamp': 1000 + i, 'Weight': 70.0 + i % 5} for i in range(total)]
+    return [records[i:i + page_size] for i in range(0, total, page_size)]
+
+
+def drain(pipeline):
+    chunks = []
+    while True:
+        item = pipeline.next_chunk(timeout=2)
+        if item is None or item is SyncPipeline.DONE:
+            return chunks
+        chunks.append(item)
+
+
+class TestSyncPipeline(unittest.TestCase):
+    """Test chunking, selection and error propagation."""
+
+    def test_pages_are_regrouped_into_chunks(self):
+        """Pages of 20 records become chunks of chunk_size in order."""
+        pages = make_pages(105, 20)
+        stored = []
+        pipeline = SyncPipeline(
+            fetch_pages=lambda: iter(pages),
+            select=lambda records: records,
+            build_fit=lambda idx, chunk: f"fit-{idx}",
+            chunk_size=50,
+            on_page=stored.extend
+        )
+        pipeline.start()
+        chunks = drain(pipeline)
+        pipeline.stop()
+
+        self.assertEqual([len(c.records) for c in chunks], [50, 50, 5])
+        self.assertEqual([c.fit for c in chunks], ["fit-1", "fit-2", "fit-3"])
+        self.assertEqual(chunks[0].records[0]['Timestamp'], 1000)
+        self.assertEqual(len(stored), 105)
+        self.assertEqual(pipeline.fetched_records, 105)
+        self.assertEqual(pipeline.pages, 6)
+        self.assertEqual(pipeline.latest_record['Timestamp'], 1104)
+        self.assertIsNone(pipeline.error)
+
+    def test_select_drops_records(self):
+        """Only selected records are counted as pending and chunked."""
+        pipeline = SyncPipeline(
+            fetch_pages=lambda: iter(make_pages(40, 20)),
+            select=lambda records: [r for r in records if r['Timestamp'] % 2 == 0],
+            build_fit=lambda idx, chunk: idx,
+            chunk_size=100
+        )
+        pipeline.start()
+        chunks = drain(pipeline)
+        pipeline.stop()
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(len(chunks[0].records), 20)
+        self.assertEqual(pipeline.pending_records, 20)
+
+    def test_build_failure_is_reported_per_chunk(self):
+        """A chunk whose FIT cannot be built carries an error, others continue."""
+        def build_fit(idx, chunk):
+            if idx == 1:
+                raise ValueError("boom")
+            return idx
+
+        pipeline = SyncPipeline(
+            fetch_pages=lambda: iter(make_pages(20, 10)),
+            select=lambda records: records,
+            build_fit=build_fit,
+            chunk_size=10
+        )
+        pipeline.start()
+        chunks = drain(pipeline)
+        pipeline.stop()
+
+        self.assertIsNone(chunks[0].fit)
+        self.assertEqual(chunks[0].error, "boom")
+        self.assertEqual(chunks[1].fit, 2)
+
+    def test_fetch_error_is_exposed(self):
+        """An exception while fetching ends the pipeline and is kept in .error.
+
+        The incomplete trailing chunk is not submitted.
+        """
+        def fetch_pages():
+            yield make_pages(10, 10)[0]
+            raise RuntimeError("network down")
+
+        pipeline = SyncPipeline(
+            fetch_pages=fetch_pages,
+            select=lambda records: records,
+            build_fit=lambda idx, chunk: idx,
+            chunk_size=100
+        )
+        pipeline.start()
+        chunks = drain(pipeline)
+        pipeline.stop()
+
+        self.assertEqual(chunks, [])
+        self.assertEqual(pipeline.fetched_records, 10)
+        self.assertIsInstance(pipeline.error, RuntimeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Tests for the incremental sync cursor: persistence, when it advances and how
+it is passed to the Xiaomi API.
+"""
+
+import base64
+import json
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add src and benchmarks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from mock_servers import GarminMockServer, MOCK_SSECURITY, XiaomiMockServer
+from core import sync_service
+from core.sync_service import SyncOrchestrator
+from core.sync_state import SyncStateManager
+from garmin.client import GarminClient
+from xiaomi.client import XiaomiAPIError, XiaomiClient, XiaomiClientBase
+
+
+class TestSyncStateManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_file = Path(self.tmp.name) / "sync_state.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cursor_persists_and_only_moves_forward(self):
+        state = SyncStateManager(str(self.state_file))
+        self.assertIsNone(state.get_cursor("alice"))
+
+        state.update_cursor("alice", [{"Timestamp": 100.5}, {"Timestamp": 200.25}])
+        cursor = SyncStateManager(str(self.state_file)).get_cursor("alice")
+        self.assertEqual((cursor["time"], cursor["create_time"], cursor["next_key"]), (200, 200250, None))
+
+        state.update_cursor("alice", [{"Timestamp": 150}])
+        self.assertEqual(state.get_cursor("alice")["time"], 200)
+
+    def test_next_key_holds_the_time(self):
+        state = SyncStateManager(str(self.state_file))
+        state.update_cursor("alice", [{"Timestamp": 100}])
+        state.update_cursor("alice", [{"Timestamp": 300}], next_key="k2")
+
+        cursor = SyncStateManager(str(self.state_file)).get_cursor("alice")
+        self.assertEqual((cursor["time"], cursor["next_key"]), (100, "k2"))
+
+    def test_reset_and_corrupt_file(self):
+        state = SyncStateManager(str(self.state_file))
+        state.update_cursor("alice", [{"Timestamp": 100}])
+        state.reset_cursor("alice")
+        self.assertIsNone(SyncStateManager(str(self.state_file)).get_cursor("alice"))
+
+        self.state_file.write_text("{not json")
+        self.assertIsNone(SyncStateManager(str(self.state_file)).get_cursor("alice"))
+
+
+class TestCursorRequests(unittest.TestCase):
+    """The cursor becomes since / start_time / next_key of the Xiaomi calls."""
+
+    def test_cursor_is_passed_to_both_apis(self):
+        calls = {}
+        client = XiaomiClient()
+
+        def model_pages(model, since=None):
+            calls["since"] = since
+            raise XiaomiAPIError("unsupported model", code=-1)
+            yield
+
+        def fitness_pages(**kwargs):
+            calls.update(kwargs)
+            return iter([[]])
+
+        client.iter_model_weight_pages = model_pages
+        client.iter_fitness_data_pages = fitness_pages
+        cursor = {"time": 200, "create_time": 200250, "next_key": "k2"}
+        list(SyncOrchestrator._iter_weight_pages(None, client, "model", cursor))
+
+        self.assertEqual(calls, {"since": 200250, "key": "weight", "start_time": 201, "next_key": "k2"})
+
+
+class MockLoginGarminClient(GarminClient):
+
+    def _login_impl(self, mfa_provider):
+        self._client.oauth2_token = f"Bearer mock-{self.email}"
+        return True
+
+
+class TestCursorAdvance(unittest.TestCase):
+    """End to end against the mock servers: the cursor only advances after a clean upload."""
+
+    RECORDS = 30
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.xiaomi = XiaomiMockServer(records=self.RECORDS).start()
+        self.garmin = GarminMockServer().start()
+        self.addCleanup(self.xiaomi.stop)
+        self.addCleanup(self.garmin.stop)
+        for patcher in (
+            mock.patch.object(XiaomiClientBase, "ACCOUNT_URL", self.xiaomi.url),
+            mock.patch.object(XiaomiClientBase, "API_URL", self.xiaomi.url),
+            mock.patch.object(GarminClient, "CONNECTAPI_URL", self.garmin.url),
+            mock.patch.object(sync_service, "GarminClient", MockLoginGarminClient),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        config = Path(self.tmp.name) / "users.json"
+        config.write_text(json.dumps({
+            "users": [{
+                "username": "alice",
+                "password": "",
+                "token": {"userId": "1", "passToken": "p",
+                          "ssecurity": base64.b64encode(MOCK_SSECURITY).decode()},
+                "garmin": {"email": "alice@example.com", "password": "mock", "domain": "COM"},
+            }],
+            "settings": {"data_dir": self.tmp.name},
+        }))
+        self.orchestrator = SyncOrchestrator(str(config))
+
+    def tearDown(self):
+        self.orchestrator.weight_store.close()
+        self.orchestrator.upload_ledger.close()
+        self.tmp.cleanup()
+
+    def _sync(self, full=False):
+        return self.orchestrator.sync_users(["alice"], max_workers=1, full=full)[0]
+
+    def test_failed_upload_keeps_cursor(self):
+        self.garmin.created_status = 400
+        result = self._sync()
+        self.assertEqual((result.total_records, result.failed_chunks), (self.RECORDS, 1))
+        self.assertIsNone(self.orchestrator.state_mgr.get_cursor("alice"))
+
+        self.garmin.created_status = 202
+        self.assertEqual(self._sync().total_records, self.RECORDS)
+        self.assertIsNotNone(self.orchestrator.state_mgr.get_cursor("alice"))
+
+        # Incremental run fetches nothing; --full ignores the cursor
+        self.assertEqual(self._sync().total_records, 0)
+        self.assertEqual(self._sync(full=True).total_records, self.RECORDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Tests for the per-stage timing helpers.
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.timing import StageTimer, format_timings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStageTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.timer = StageTimer(clock=self.clock)
+
+    def test_spans_are_aggregated_per_stage(self):
+        for seconds, size in ((0.5, 100), (1.5, 300)):
+            with self.timer.span("garmin_upload", records=10, bytes_out=size):
+                self.clock.now += seconds
+
+        with self.assertRaises(RuntimeError):
+            with self.timer.span("xiaomi_login"):
+                self.clock.now += 0.25
+                raise RuntimeError("login failed")
+
+        summary = self.timer.summary()
+        self.assertEqual(list(summary), ["garmin_upload", "xiaomi_login"])
+        self.assertEqual(summary["garmin_upload"], {
+            "count": 2, "seconds": 2.0, "max_seconds": 1.5,
+            "records": 20, "bytes_in": 0, "bytes_out": 400,
+        })
+        self.assertEqual(summary["xiaomi_login"]["seconds"], 0.25)
+        self.assertEqual(self.timer.elapsed(), 2.25)
+
+    def test_timed_iter_times_each_item(self):
+        def pages():
+            for page in ([1, 2], [3]):
+                self.clock.now += 1
+                yield page
+            self.clock.now += 0.5
+
+        def measure(span, page):
+            span.records = len(page) if page else 0
+
+        self.assertEqual(list(self.timer.timed_iter("xiaomi_page", pages(), measure)), [[1, 2], [3]])
+        stage = self.timer.summary()["xiaomi_page"]
+        self.assertEqual((stage["count"], stage["seconds"], stage["records"]), (3, 2.5, 3))
+
+    def test_format_timings(self):
+        with self.timer.span("fit_build", records=500, bytes_out=2048):
+            self.clock.now += 0.1
+        self.assertEqual(format_timings(self.timer.summary()),
+                         ["fit_build: 1 次, 0.10s, 500 条记录, 收 0B / 发 2.0KB"])
+
+
+if __name__ == '__main__':
+    unittest.main()
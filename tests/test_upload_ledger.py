@@ -0,0 +1,67 @@
+"""
+Unit tests for the upload ledger.
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.upload_ledger import UploadLedger, record_hash
+
+
+def make_weight(ts, weight):
+    return {'Date': '2026-01-11 10:30:45', 'Timestamp': ts, 'Weight': weight, 'BMI': 23.8}
+
+
+class TestUploadLedger(unittest.TestCase):
+    """Test that only records not yet accepted by Garmin are returned."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.ledger = UploadLedger(str(Path(self.tmp_dir.name) / "weights.db"))
+
+    def tearDown(self):
+        self.ledger.close()
+        self.tmp_dir.cleanup()
+
+    def test_uploaded_records_are_skipped(self):
+        """Marked records are filtered out, new ones are kept in order."""
+        weights = [make_weight(1000, 70.0), make_weight(2000, 71.0)]
+        self.assertEqual(self.ledger.filter_new('alice', weights), weights)
+
+        self.ledger.mark_uploaded('alice', weights[:1])
+        self.assertEqual(self.ledger.filter_new('alice', weights), weights[1:])
+        self.assertEqual(self.ledger.count('alice'), 1)
+
+    def test_ledger_is_per_user(self):
+        """Records uploaded for one user do not affect another."""
+        weights = [make_weight(1000, 70.0)]
+        self.ledger.mark_uploaded('alice', weights)
+        self.assertEqual(self.ledger.filter_new('bob', weights), weights)
+
+    def test_changed_content_is_uploaded_again(self):
+        """A corrected measurement with the same timestamp is re-uploaded."""
+        self.ledger.mark_uploaded('alice', [make_weight(1000, 70.0)])
+        corrected = [make_weight(1000, 70.4)]
+        self.assertEqual(self.ledger.filter_new('alice', corrected), corrected)
+
+    def test_hash_ignores_non_fit_fields(self):
+        """Fields not written to the FIT file do not change the hash."""
+        a = make_weight(1000, 70.0)
+        b = dict(a, Date='other', Source=1)
+        self.assertEqual(record_hash(a), record_hash(b))
+
+    def test_reset(self):
+        """Reset forgets all uploads for the user."""
+        weights = [make_weight(1000, 70.0)]
+        self.ledger.mark_uploaded('alice', weights)
+        self.ledger.reset('alice')
+        self.assertEqual(self.ledger.filter_new('alice', weights), weights)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the shared Garmin upload session pool.
+"""
+
+import unittest
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from garmin.client import configure_upload_pool, get_upload_connection_stats, get_upload_session
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        if self.close_connection:
+            # Like real servers, confirm "Connection: close" so the client
+            # does not return the socket to its pool.
+            self.send_header("Connection", "close")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestUploadPool(unittest.TestCase):
+    """Uploads to the same domain reuse pooled connections."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/upload"
+
+    def tearDown(self):
+        configure_upload_pool()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _upload(self, domain, times):
+        session = get_upload_session(domain)
+        for _ in range(times):
+            response = session.post(self.url, files={'file': ('a.fit', b'data')})
+            self.assertEqual(response.status_code, 202)
+
+    def _stats(self, domain):
+        return next(s for s in get_upload_connection_stats() if s["domain"] == domain)
+
+    def test_session_shared_per_domain(self):
+        configure_upload_pool()
+        self.assertIs(get_upload_session("garmin.cn"), get_upload_session("garmin.cn"))
+        self.assertIsNot(get_upload_session("garmin.cn"), get_upload_session("garmin.com"))
+
+    def test_keep_alive_reuses_connection(self):
+        configure_upload_pool(pool_size=2)
+        self._upload("garmin.cn", 3)
+
+        stats = self._stats("garmin.cn")
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], 2)
+
+    def test_without_keep_alive(self):
+        configure_upload_pool(keep_alive=False)
+        self._upload("garmin.cn", 3)
+
+        stats = self._stats("garmin.cn")
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the columnar WeightBatch and the vectorized filter path.
+"""
+
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from garmin import weight_batch
+from garmin.filter import apply_filter, evaluate_condition
+from garmin.weight_batch import WeightBatch
+from xiaomi.models import WeightRecord
+
+
+def _records():
+    return [
+        {'Timestamp': 1, 'Weight': 70.5, 'BodyFat': 15.2, 'VisceralFat': 5},
+        WeightRecord(Timestamp=2, Weight=82.0, BodyFat=24.0, VisceralFat=9),
+        {'Timestamp': 3, 'Weight': None, 'BodyFat': 18.0},
+        WeightRecord(Timestamp=4, Weight=64.9),
+        {'Timestamp': 5, 'Weight': 'n/a', 'BodyFat': float('nan')},
+        {'Timestamp': 6, 'Weight': '70.5', 'BodyFat': 20},
+    ]
+
+
+CONDITIONS = [
+    {'field': 'Weight', 'operator': 'eq', 'value': 70.5},
+    {'field': 'Weight', 'operator': 'ne', 'value': 70.5},
+    {'field': 'Weight', 'operator': 'gt', 'value': 65},
+    {'field': 'Weight', 'operator': 'gte', 'value': 82},
+    {'field': 'BodyFat', 'operator': 'lt', 'value': 20},
+    {'field': 'BodyFat', 'operator': 'lte', 'value': 20},
+    {'field': 'VisceralFat', 'operator': 'between', 'value': [5, 8]},
+    {'field': 'BodyFat', 'operator': 'between', 'value': [10]},
+    {'field': 'Weight', 'operator': 'like', 'value': 70},
+    {'field': 'Weight', 'operator': 'gt', 'value': 'heavy'},
+    {'field': 'Height', 'operator': 'gt', 'value': 170},
+]
+
+
+def _expected(records, conditions, logic):
+    def passes(record, condition):
+        try:
+            return evaluate_condition(record, condition)
+        except ValueError:
+            return False
+
+    combine = all if logic == "and" else any
+    return [r for r in records if combine(passes(r, c) for c in conditions)]
+
+
+class TestVectorizedFilter(unittest.TestCase):
+    """apply_filter must select exactly what evaluate_condition would."""
+
+    def assert_matches_per_record(self):
+        records = _records()
+        for condition in CONDITIONS:
+            config = {'enabled': True, 'conditions': [condition]}
+            with self.subTest(condition=condition):
+                self.assertEqual(apply_filter(records, config), _expected(records, [condition], "and"))
+
+        for logic in ("and", "or"):
+            conditions = [CONDITIONS[2], CONDITIONS[4]]
+            config = {'enabled': True, 'conditions': conditions, 'logic': logic}
+            with self.subTest(logic=logic):
+                self.assertEqual(apply_filter(records, config), _expected(records, conditions, logic))
+
+    def test_numpy_matches_per_record(self):
+        if weight_batch.np is None:
+            self.skipTest("numpy not installed")
+        self.assert_matches_per_record()
+
+    def test_pure_python_matches_per_record(self):
+        with mock.patch.object(weight_batch, "np", None):
+            self.assert_matches_per_record()
+
+    def test_keeps_original_objects_in_order(self):
+        records = _records()
+        config = {'enabled': True, 'conditions': [{'field': 'Weight', 'operator': 'gt', 'value': 0}]}
+        result = apply_filter(records, config)
+        self.assertEqual([r.get('Timestamp') for r in result], [1, 2, 4, 6])
+        self.assertIs(result[1], records[1])
+
+
+class TestWeightBatch(unittest.TestCase):
+
+    def test_missing_values_are_nan(self):
+        batch = WeightBatch(_records(), fields=("Weight",))
+        column = [float(x) for x in batch.column("Weight")]
+        self.assertEqual(column[:2], [70.5, 82.0])
+        self.assertNotEqual(column[2], column[2])
+        self.assertNotEqual(column[4], column[4])
+        self.assertEqual(len(batch), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the typed WeightRecord and its use through filter, ledger and FIT generation.
+"""
+
+import unittest
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from xiaomi.client import unmarshal_fitness_data, unmarshal_scale_data
+from xiaomi.models import WeightRecord, as_dict
+from garmin.filter import apply_filter
+from garmin.fit_generator import build_weight_fit_bytes
+from core.upload_ledger import record_hash
+from core.weight_store import WeightStore
+
+
+FITNESS_ITEM = {
+    "key": "weight",
+    "time": 1767257602,
+    "sid": "sid-1",
+    "zone_offset": 28800,
+    "value": json.dumps({
+        "weight": 70.5, "bmi": 22.4, "body_fat_rate": 18.3, "muscle_rate": 50,
+        "visceral_fat": 8, "basal_metabolism": 1580,
+    }),
+}
+
+
+class TestWeightRecord(unittest.TestCase):
+    """Records replace per-measurement dicts end to end."""
+
+    def test_unmarshal_fitness_data(self):
+        record = unmarshal_fitness_data([FITNESS_ITEM])[0]
+
+        self.assertIsInstance(record, WeightRecord)
+        self.assertEqual(record.Weight, 70.5)
+        self.assertAlmostEqual(record.MuscleMass, 35.25)
+        self.assertEqual(record.get('Sid'), "sid-1")
+        self.assertIsNone(record.get('ZoneName'))
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_unmarshal_scale_data(self):
+        items = [{
+            "fromSource": 3,
+            "createTime": 1767257602000,
+            "data": json.dumps({"weight": "70.1", "bmi": 22, "bodyResData": json.dumps({"bfp": 18})}),
+        }]
+        records, last_create_time = unmarshal_scale_data(items)
+
+        self.assertEqual(last_create_time, 1767257602000)
+        self.assertEqual(records[0].Timestamp, 1767257602.0)
+        self.assertEqual(records[0].Weight, 70.1)
+        self.assertEqual(records[0].BodyFat, 18.0)
+        self.assertEqual(records[0].Source, 3)
+
+    def test_dict_access_and_round_trip(self):
+        record = unmarshal_fitness_data([FITNESS_ITEM])[0]
+        data = record.to_dict()
+
+        self.assertEqual(data['Date'], record.Date)
+        self.assertNotIn('ZoneName', data)
+        self.assertEqual(record['Weight'], 70.5)
+        self.assertIn('Weight', record)
+        self.assertNotIn('ZoneName', record)
+        with self.assertRaises(KeyError):
+            record['Unknown']
+        self.assertEqual(WeightRecord.from_dict(data), record)
+        self.assertIs(as_dict(data), data)
+
+    def test_record_and_dict_behave_the_same(self):
+        record = unmarshal_fitness_data([FITNESS_ITEM])[0]
+        data = record.to_dict()
+        filter_config = {
+            "enabled": True,
+            "conditions": [{"field": "Weight", "operator": "gt", "value": 70}],
+        }
+
+        self.assertEqual(apply_filter([record], filter_config), [record])
+        self.assertEqual(record_hash(record), record_hash(data))
+        self.assertEqual(len(build_weight_fit_bytes([record])), len(build_weight_fit_bytes([data])))
+
+    def test_store_serializes_records(self):
+        record = unmarshal_fitness_data([FITNESS_ITEM])[0]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = WeightStore(str(Path(temp_dir) / "weights.db"))
+            try:
+                self.assertEqual(store.upsert("user", [record]), 1)
+                self.assertEqual(store.upsert("user", [record.to_dict()]), 0)
+                stored = next(store.iter_weights("user"))
+            finally:
+                store.close()
+        self.assertEqual(stored, record)
+
+
+if __name__ == '__main__':
+    unittest.main()
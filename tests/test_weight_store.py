@@ -0,0 +1,102 @@
+"""
+Unit tests for the local weight store.
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.weight_store import WeightStore
+from xiaomi.models import WeightRecord
+
+
+def make_weight(ts, weight):
+    return {'Date': '2026-01-11 10:30:45', 'Timestamp': ts, 'Weight': weight, 'BMI': 23.8}
+
+
+class TestWeightStore(unittest.TestCase):
+    """Test WeightStore upsert and range queries."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = WeightStore(str(Path(self.tmp_dir.name) / "weights.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_upsert_only_counts_delta(self):
+        """Re-writing identical records changes nothing."""
+        weights = [make_weight(1000, 70.0), make_weight(2000, 71.0)]
+        self.assertEqual(self.store.upsert('alice', weights), 2)
+        self.assertEqual(self.store.upsert('alice', weights), 0)
+
+        weights.append(make_weight(3000, 72.0))
+        self.assertEqual(self.store.upsert('alice', weights), 1)
+        self.assertEqual(self.store.count('alice'), 3)
+
+    def test_upsert_updates_changed_record(self):
+        """A record with the same timestamp but new values is updated."""
+        self.store.upsert('alice', [make_weight(1000, 70.0)])
+        self.assertEqual(self.store.upsert('alice', [make_weight(1000, 70.5)]), 1)
+        records = list(self.store.iter_weights('alice'))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['Weight'], 70.5)
+
+    def test_records_without_timestamp_are_skipped(self):
+        """Records without Timestamp cannot be keyed and are ignored."""
+        self.assertEqual(self.store.upsert('alice', [{'Weight': 70.0}]), 0)
+        self.assertEqual(self.store.count('alice'), 0)
+
+    def test_range_query(self):
+        """Range queries are inclusive and ordered."""
+        self.store.upsert('alice', [make_weight(ts, 70.0) for ts in (1000, 2000, 3000, 4000)])
+        self.store.upsert('bob', [make_weight(2500, 80.0)])
+
+        records = list(self.store.iter_weights('alice', start=2000, end=3000))
+        self.assertEqual([r['Timestamp'] for r in records], [3000, 2000])
+
+        records = list(self.store.iter_weights('alice', newest_first=False, limit=2))
+        self.assertEqual([r['Timestamp'] for r in records], [1000, 2000])
+
+        # Rows are read in batches and returned as WeightRecord
+        records = list(self.store.iter_weights('alice', batch_size=3))
+        self.assertEqual([r.Timestamp for r in records], [4000, 3000, 2000, 1000])
+        self.assertIsInstance(records[0], WeightRecord)
+        self.assertEqual(self.store.latest_timestamp('alice'), 4000)
+
+    def test_statistics(self):
+        """Statistics cover the whole stored history."""
+        self.store.upsert('alice', [make_weight(1000, 70.0), make_weight(2000, 72.0)])
+        stats = self.store.get_statistics('alice')
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['latest'], 72.0)
+        self.assertAlmostEqual(stats['average'], 71.0)
+        self.assertEqual(stats['min'], 70.0)
+        self.assertEqual(stats['max'], 72.0)
+        self.assertIsNone(self.store.get_statistics('nobody'))
+
+    def test_pending_chunks_from_store(self):
+        """The CLI selects and chunks a stored time range chunk by chunk."""
+        from main import iter_pending_chunks
+
+        self.store.upsert('alice', [make_weight(ts, 70.0 + ts % 2) for ts in range(1000, 1012)])
+        pages = []
+
+        def select(records):
+            pages.append(len(records))
+            return [r for r in records if r['Weight'] == 70.0]
+
+        chunks = list(iter_pending_chunks(
+            self.store.iter_weights('alice', start=1001, end=1010), select, 4))
+        self.assertEqual(pages, [4, 4, 2])
+        self.assertEqual([len(c) for c in chunks], [4, 1])
+        self.assertEqual([r['Timestamp'] for c in chunks for r in c], [1010, 1008, 1006, 1004, 1002])
+
+
+if __name__ == '__main__':
+    unittest.main()
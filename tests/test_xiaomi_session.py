@@ -0,0 +1,75 @@
+"""
+Tests for reusing cached Xiaomi login sessions instead of serviceLogin.
+"""
+
+import base64
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src and benchmarks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from mock_servers import MOCK_SSECURITY, XiaomiMockServer
+from xiaomi.client import XiaomiClient
+from xiaomi.session import XiaomiSessionCache
+
+LOGIN = ("/pass/serviceLogin", 200)
+
+
+class TestXiaomiSessionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = XiaomiMockServer(records=30, page_size=100).start()
+        self.addCleanup(self.server.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _client(self, pass_token="pass"):
+        client = XiaomiClient()
+        client.ACCOUNT_URL = client.API_URL = self.server.url
+        client.set_credentials("7", MOCK_SSECURITY, pass_token)
+        return client
+
+    def test_session_reused_across_caches(self):
+        first = XiaomiSessionCache(self.tmp.name)
+        self.assertEqual(first.login(self._client(), "alice")["userId"], "7")
+        self.assertEqual(self.server.requests[LOGIN], 1)
+
+        # A new process reads the session file and skips serviceLogin
+        client = self._client()
+        self.assertIsNone(XiaomiSessionCache(self.tmp.name).login(client, "alice"))
+        self.assertEqual(self.server.requests[LOGIN], 1)
+        self.assertEqual(client.session.cookies.get_dict(), {"userId": "7"})
+        self.assertEqual(len(client.get_fitness_data_by_time()), 30)
+
+        # Another passToken or an expired session logs in again
+        first.login(self._client(pass_token="other"), "alice")
+        XiaomiSessionCache(self.tmp.name, ttl=0).login(self._client(), "alice")
+        self.assertEqual(self.server.requests[LOGIN], 3)
+
+    def test_rejected_session_logs_in_again(self):
+        cache = XiaomiSessionCache(self.tmp.name)
+        cache.login(self._client(), "alice")
+        state = cache.get("alice", cache._sessions["alice"]["fingerprint"])
+        state["ssecurity"] = base64.b64encode(b"stale").decode()
+
+        tokens = []
+        client = self._client()
+        self.assertIsNone(cache.login(client, "alice", on_token=tokens.append))
+        self.assertEqual(len(client.get_fitness_data_by_time()), 30)
+
+        self.assertEqual(self.server.requests[("/app/v1/data/get_fitness_data_by_time", 401)], 1)
+        self.assertEqual(self.server.requests[LOGIN], 2)
+        self.assertEqual([t["userId"] for t in tokens], ["7"])
+        saved = json.loads(next(Path(self.tmp.name).iterdir()).read_text())
+        self.assertEqual(base64.b64decode(saved["ssecurity"]), MOCK_SSECURITY)
+
+
+if __name__ == "__main__":
+    unittest.main()